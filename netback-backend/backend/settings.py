@@ -1,3 +1,4 @@
+import json
 from datetime import timedelta
 from pathlib import Path
 from decouple import config
@@ -23,6 +24,75 @@ SECRET_KEY = config("SECRET_KEY")
 ZABBIX_URL = config("ZABBIX_URL", default="")
 ZABBIX_TOKEN = config("ZABBIX_TOKEN", default="")
 ENCRYPTION_KEY_VAULT = config("ENCRYPTION_KEY_VAULT", default="")
+# Descarga de hosts de Zabbix: hostids por petición (0 = una sola petición) y peticiones concurrentes
+ZABBIX_HOST_CHUNK_SIZE = config("ZABBIX_HOST_CHUNK_SIZE", default=500, cast=int)
+ZABBIX_FETCH_WORKERS = config("ZABBIX_FETCH_WORKERS", default=4, cast=int)
+# Minutos entre refrescos de la copia local de hosts de Zabbix (tarea refreshZabbixSnapshot)
+ZABBIX_SNAPSHOT_MINUTES = config("ZABBIX_SNAPSHOT_MINUTES", default=15, cast=int)
+
+# Clasificación de hosts: 0/1 = en el hilo de la petición; >1 = pool de procesos
+CLASSIFIER_WORKERS = config("CLASSIFIER_WORKERS", default=0, cast=int)
+CLASSIFIER_CHUNK_SIZE = config("CLASSIFIER_CHUNK_SIZE", default=500, cast=int)
+# Guardado masivo de hosts clasificados: a partir de este tamaño se usa bulk_create
+BULK_INGEST_THRESHOLD = config("BULK_INGEST_THRESHOLD", default=100, cast=int)
+BULK_INGEST_CHUNK_SIZE = config("BULK_INGEST_CHUNK_SIZE", default=500, cast=int)
+# Vida máxima (s) de la caché de países/sitios/áreas del clasificador en cada proceso
+AREA_CACHE_TTL = config("AREA_CACHE_TTL", default=300, cast=int)
+# Barrido de alcanzabilidad (/api/ping/bulk/): puerto TCP, timeout (s), sondas simultáneas y máximo de IPs
+REACHABILITY_PORT = config("REACHABILITY_PORT", default=22, cast=int)
+REACHABILITY_TIMEOUT = config("REACHABILITY_TIMEOUT", default=2.0, cast=float)
+REACHABILITY_CONCURRENCY = config("REACHABILITY_CONCURRENCY", default=256, cast=int)
+REACHABILITY_MAX_TARGETS = config("REACHABILITY_MAX_TARGETS", default=5000, cast=int)
+# Pre-chequeo de alcanzabilidad al inicio de cada respaldo automático (descarta equipos caídos)
+BACKUP_PREFLIGHT = config("BACKUP_PREFLIGHT", default=True, cast=bool)
+# Planificación del respaldo automático: workers, tope por sitio (0 = sin tope) y clases de
+# prioridad por nombre de DeviceType o de área/sitio, en orden (los no listados van al final)
+BACKUP_WORKERS = config("BACKUP_WORKERS", default=10, cast=int)
+BACKUP_SITE_CONCURRENCY = config("BACKUP_SITE_CONCURRENCY", default=0, cast=int)
+BACKUP_PRIORITY_DEVICE_TYPES = _parse_list(config("BACKUP_PRIORITY_DEVICE_TYPES", default=""))
+BACKUP_PRIORITY_AREAS = _parse_list(config("BACKUP_PRIORITY_AREAS", default=""))
+# Timeouts adaptativos de Netmiko: percentil de las últimas duraciones exitosas x margen, acotado
+BACKUP_TIMING_HISTORY = config("BACKUP_TIMING_HISTORY", default=30, cast=int)
+BACKUP_TIMING_WINDOW = config("BACKUP_TIMING_WINDOW", default=20, cast=int)
+BACKUP_TIMING_MIN_SAMPLES = config("BACKUP_TIMING_MIN_SAMPLES", default=3, cast=int)
+BACKUP_TIMEOUT_PERCENTILE = config("BACKUP_TIMEOUT_PERCENTILE", default=95, cast=float)
+BACKUP_TIMEOUT_FACTOR = config("BACKUP_TIMEOUT_FACTOR", default=2.0, cast=float)
+BACKUP_CONN_TIMEOUT_RANGE = (
+    config("BACKUP_CONN_TIMEOUT_MIN", default=5.0, cast=float),
+    config("BACKUP_CONN_TIMEOUT_MAX", default=60.0, cast=float),
+)
+BACKUP_READ_TIMEOUT_RANGE = (
+    config("BACKUP_READ_TIMEOUT_MIN", default=10.0, cast=float),
+    config("BACKUP_READ_TIMEOUT_MAX", default=600.0, cast=float),
+)
+# Reintentos de errores transitorios dentro de una corrida (backoff exponencial con jitter, en s)
+BACKUP_RETRY_ATTEMPTS = config("BACKUP_RETRY_ATTEMPTS", default=2, cast=int)
+BACKUP_RETRY_BASE_DELAY = config("BACKUP_RETRY_BASE_DELAY", default=2.0, cast=float)
+BACKUP_RETRY_MAX_DELAY = config("BACKUP_RETRY_MAX_DELAY", default=30.0, cast=float)
+# Circuit breaker: tras N errores seguidos el respaldo automático omite el equipo (horas, se duplica por fallo)
+BACKUP_CIRCUIT_THRESHOLD = config("BACKUP_CIRCUIT_THRESHOLD", default=3, cast=int)
+BACKUP_CIRCUIT_BASE_HOURS = config("BACKUP_CIRCUIT_BASE_HOURS", default=24.0, cast=float)
+BACKUP_CIRCUIT_MAX_HOURS = config("BACKUP_CIRCUIT_MAX_HOURS", default=168.0, cast=float)
+# Vía rápida: comparar el comando marcador del fabricante antes de descargar la configuración
+BACKUP_CHANGE_MARKER = config("BACKUP_CHANGE_MARKER", default=False, cast=bool)
+BACKUP_CHANGE_MARKER_MAX_AGE_HOURS = config("BACKUP_CHANGE_MARKER_MAX_AGE_HOURS", default=168.0, cast=float)
+# Filtros extra de líneas volátiles para el checksum: JSON {"netmiko_type" | "*": ["regex", ...]}
+BACKUP_VOLATILE_PATTERNS = config("BACKUP_VOLATILE_PATTERNS", default="{}", cast=json.loads)
+# Módulos que registran parsers de VLANs adicionales (register_vlan_parser), separados por comas
+VLAN_PARSER_PLUGINS = _parse_list(config("VLAN_PARSER_PLUGINS", default=""))
+# Búsqueda en configuraciones: respaldos leídos por bloque y líneas máximas por respaldo
+CONFIG_SEARCH_CHUNK_SIZE = config("CONFIG_SEARCH_CHUNK_SIZE", default=20, cast=int)
+CONFIG_SEARCH_MAX_LINES = config("CONFIG_SEARCH_MAX_LINES", default=200, cast=int)
+# Longitud máxima de la consulta (texto o regex) de la búsqueda en configuraciones
+CONFIG_SEARCH_MAX_PATTERN = config("CONFIG_SEARCH_MAX_PATTERN", default=200, cast=int)
+# Cumplimiento: evaluar tras cada respaldo automático, en bloques de N equipos por tarea de Celery
+COMPLIANCE_AFTER_BACKUP = config("COMPLIANCE_AFTER_BACKUP", default=True, cast=bool)
+COMPLIANCE_CHUNK_SIZE = config("COMPLIANCE_CHUNK_SIZE", default=25, cast=int)
+# Línea de tiempo de cambios: respaldos consecutivos máximos por consulta
+TIMELINE_MAX_BACKUPS = config("TIMELINE_MAX_BACKUPS", default=60, cast=int)
+# Informe "qué cambió desde": 0/1 = diffs en el hilo de la petición; >1 = pool de procesos
+CHANGE_REPORT_WORKERS = config("CHANGE_REPORT_WORKERS", default=0, cast=int)
+CHANGE_REPORT_CHUNK_SIZE = config("CHANGE_REPORT_CHUNK_SIZE", default=20, cast=int)
 
 # SECURITY WARNING: don't run with debug turned on in production!
 # Make DEBUG configurable via environment (default False)
@@ -187,6 +257,17 @@ SIMPLE_JWT = {
     "USER_ID_CLAIM": "user_id",
 }
 
+# Caché: con CACHE_URL (p.ej. redis://netback-redis:6379/1) la caché es compartida
+# entre workers de gunicorn y Celery; sin ella, cada proceso usa memoria local.
+CACHE_URL = config("CACHE_URL", default="")
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+
 # Configuracion de Celery
 CELERY_BROKER_URL = config("CELERY_BROKER_URL")
 CELERY_BROKER_CONNECTION_RETRY = True
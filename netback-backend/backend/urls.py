@@ -7,16 +7,18 @@ from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView)
 
 from core.views import (AreaViewSet, BackupDiffViewSet, BackupViewSet,
-                        ClassificationRuleSetViewSet, CountryViewSet,
+                        ClassificationRuleSetViewSet, ComplianceRuleViewSet, CountryViewSet,
                         DeviceTypeViewSet, ManufacturerViewSet,
                         NetworkDeviceViewSet, SiteViewSet, UserSystemViewSet,
                         VaultCredentialViewSet, HealthCheckView,
-                        bulk_save_classified_hosts, compareBackupsView,
+                        bulk_save_classified_hosts, change_report_view, compareBackupsView,
+                        compliance_results, compliance_run,
                         compareSpecificBackups, executeCommand,
                         from_csv_bulk_view, from_zabbix_bulk_view,
                         get_backup_schedule, get_last_backups,
-                        getBackupHistory, getBackupStatus, ping_device,
-                        update_backup_schedule, zabbix_connectivity_status,
+                        getBackupHistory, getBackupStatus, getDeviceVlans, ping_bulk, ping_device,
+                        search_configs_view, getDeviceTimeline,
+                        update_backup_schedule, vlan_index, zabbix_connectivity_status,
                         backupDeviceView,
                         )
 
@@ -32,6 +34,7 @@ router.register(r"sites", SiteViewSet, basename="sites")
 router.register(r"areas", AreaViewSet, basename="areas")
 router.register(r"manufacturers", ManufacturerViewSet)
 router.register(r"devicetypes", DeviceTypeViewSet)
+router.register(r"compliance/rules", ComplianceRuleViewSet)
 router.register(
     r"classification-rules",
     ClassificationRuleSetViewSet,
@@ -59,6 +62,8 @@ urlpatterns = [
     path(
         "api/networkdevice/<uuid:pk>/status/", getBackupStatus, name="getBackupStatus"
     ),
+    path("api/networkdevice/<uuid:pk>/vlans/", getDeviceVlans, name="getDeviceVlans"),
+    path("api/networkdevice/<uuid:pk>/timeline/", getDeviceTimeline, name="getDeviceTimeline"),
     path(
         "api/networkdevice/bulk/from-zabbix/",
         from_zabbix_bulk_view,
@@ -71,6 +76,8 @@ urlpatterns = [
         name="bulk-save-classified-hosts",
     ),
     path("api/backups/last/", get_last_backups, name="get_last_backups"),
+    path("api/backups/search/", search_configs_view, name="search_configs"),
+    path("api/backups/changes/", change_report_view, name="change_report"),
     path(
         "api/backups/compare/<uuid:backupOldId>/<uuid:backupNewId>/",
         compareSpecificBackups,
@@ -89,5 +96,9 @@ urlpatterns = [
     path("api/users/me/", UserSystemViewSet.as_view({"get": "me"}), name="user-me"),
     path("api/zabbix/status/", zabbix_connectivity_status, name="zabbix_status"),
     path("api/ping/", ping_device, name="ping_device"),
+    path("api/ping/bulk/", ping_bulk, name="ping_bulk"),
+    path("api/vlans/", vlan_index, name="vlan_index"),
+    path("api/compliance/", compliance_results, name="compliance_results"),
+    path("api/compliance/run/", compliance_run, name="compliance_run"),
     path('api/health/', HealthCheckView.as_view(permission_classes=[AllowAny]), name='health-check'),
 ]
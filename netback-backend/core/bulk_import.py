@@ -0,0 +1,227 @@
+"""
+Ingesta masiva de hosts clasificados como NetworkDevice.
+
+Equivale a validar cada host con NetworkDeviceSerializer y guardarlo uno a uno,
+pero con un número de consultas constante por lote:
+
+- las referencias (fabricante, tipo, área, vault) se precargan con un `id__in`;
+- la unicidad de hostname/IP se comprueba con una sola consulta;
+- `customPass` se cifra una vez por valor distinto;
+- los inserts se hacen con `bulk_create` en bloques transaccionales.
+
+Los errores se informan por fila con la misma forma que la vista original:
+`{"index", "hostname", "errors": {campo: [mensajes]}}` o `{"index", "hostname", "error"}`.
+"""
+import ipaddress
+import logging
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from utils.env import get_fernet
+
+from .models import Area, DeviceType, Manufacturer, NetworkDevice, VaultCredential
+
+logger = logging.getLogger(__name__)
+
+REQUIRED = "This field is required."
+NOT_NULL = "This field may not be null."
+NOT_A_STRING = "Not a valid string."
+
+_RELATED = {
+    "manufacturer": (Manufacturer, True),
+    "deviceType": (DeviceType, True),
+    "area": (Area, False),
+    "vaultCredential": (VaultCredential, False),
+}
+
+_MAX_LENGTHS = {"hostname": 50, "model": 100, "customUser": 100, "customPass": 512}
+# Tipos aceptados por cada CharField (como DRF: números se convierten a texto). Una contraseña
+# numérica en JSON pudo perder ceros a la izquierda: se rechaza en lugar de adivinarla
+_STRING_TYPES = {"hostname": (str, int, float), "model": (str, int, float),
+                 "customUser": (str, int, float), "customPass": (str,)}
+
+
+def _as_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _prefetch_related(hosts_data):
+    """Un `id__in` por modelo referenciado: {campo: {uuid: id}}."""
+    found = {}
+    for field, (model, _) in _RELATED.items():
+        ids = {_as_uuid(h.get(field)) for h in hosts_data if h.get(field)}
+        ids.discard(None)
+        found[field] = set(model.objects.filter(id__in=ids).values_list("id", flat=True)) if ids else set()
+    return found
+
+
+def _validate_row(host, related):
+    """Replica las validaciones de NetworkDeviceSerializer. Devuelve (datos, errores)."""
+    errors = {}
+    data = {}
+
+    strings = {}
+    for field, types in _STRING_TYPES.items():
+        value = host.get(field)
+        if value is None:
+            strings[field] = None
+        elif isinstance(value, bool) or not isinstance(value, types):
+            errors[field] = [NOT_A_STRING]
+        else:
+            # CharField de DRF recorta los espacios (trim_whitespace) antes de validar y guardar
+            strings[field] = str(value).strip()
+
+    for field in ("hostname", "ipAddress"):
+        if field in errors:
+            continue
+        value = strings[field] if field in strings else host.get(field)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            errors[field] = [REQUIRED if value is None else "This field may not be blank."]
+
+    for field, max_length in _MAX_LENGTHS.items():
+        value = strings.get(field)
+        if field not in errors and value is not None and len(value) > max_length:
+            errors[field] = [f"Ensure this field has no more than {max_length} characters."]
+
+    if "ipAddress" not in errors:
+        try:
+            ip = ipaddress.ip_address(str(host["ipAddress"]).strip())
+            data["ipAddress"] = str(ip) if ip.version == 6 else str(host["ipAddress"]).strip()
+        except ValueError:
+            errors["ipAddress"] = ["Enter a valid IPv4 or IPv6 address."]
+
+    for field, (_, required) in _RELATED.items():
+        value = host.get(field)
+        if not value:
+            if required:
+                errors[field] = [NOT_NULL if field in host else REQUIRED]
+            data[field] = None
+            continue
+        pk = _as_uuid(value)
+        if pk is None:
+            errors[field] = [f"“{value}” is not a valid UUID."]
+        elif pk not in related[field]:
+            errors[field] = [f'Invalid pk "{value}" - object does not exist.']
+        else:
+            data[field] = pk
+
+    if errors:
+        return None, errors
+
+    vault = data["vaultCredential"]
+    custom_user = strings["customUser"]
+    custom_pass = strings["customPass"]
+    if vault and (custom_user or custom_pass):
+        return None, {"non_field_errors": ["No puedes usar credenciales propias y Vault al mismo tiempo."]}
+    if not vault and not (custom_user and custom_pass):
+        return None, {
+            "non_field_errors": ["Debe especificarse un VaultCredential o ambos customUser y customPass."]
+        }
+
+    data.update(
+        hostname=strings["hostname"],
+        model=strings["model"],
+        customUser=None if vault else custom_user,
+        customPass=None if vault else custom_pass,
+    )
+    return data, None
+
+
+def _check_uniqueness(rows):
+    """Una sola consulta para hostname/IP ya existentes + duplicados dentro del lote."""
+    hostnames = {data["hostname"] for _, data in rows}
+    ips = {data["ipAddress"] for _, data in rows}
+    existing_hosts, existing_ips = set(), set()
+    for hostname, ip in NetworkDevice.objects.filter(
+        Q(hostname__in=hostnames) | Q(ipAddress__in=ips)
+    ).values_list("hostname", "ipAddress"):
+        existing_hosts.add(hostname)
+        existing_ips.add(ip)
+
+    accepted, errors = [], []
+    for idx, data in rows:
+        row_errors = {}
+        if data["hostname"] in existing_hosts:
+            row_errors["hostname"] = ["network device with this hostname already exists."]
+        if data["ipAddress"] in existing_ips:
+            row_errors["ipAddress"] = ["network device with this ipAddress already exists."]
+        if row_errors:
+            errors.append({"index": idx, "hostname": data["hostname"], "errors": row_errors})
+            continue
+        # Las siguientes filas del lote con el mismo hostname/IP chocan con esta
+        existing_hosts.add(data["hostname"])
+        existing_ips.add(data["ipAddress"])
+        accepted.append((idx, data))
+    return accepted, errors
+
+
+def _encrypt_passwords(rows):
+    """Cifra cada customPass distinto una sola vez (el campo no re-cifra tokens Fernet)."""
+    cipher = get_fernet()
+    if not cipher:
+        return
+    tokens = {}
+    for _, data in rows:
+        plain = data.get("customPass")
+        if not plain or plain.startswith("gAAAAA"):
+            continue
+        if plain not in tokens:
+            tokens[plain] = cipher.encrypt(plain.encode()).decode()
+        data["customPass"] = tokens[plain]
+
+
+def _build_device(data):
+    return NetworkDevice(
+        hostname=data["hostname"],
+        ipAddress=data["ipAddress"],
+        model=data["model"],
+        manufacturer_id=data["manufacturer"],
+        deviceType_id=data["deviceType"],
+        area_id=data["area"],
+        vaultCredential_id=data["vaultCredential"],
+        customUser=data["customUser"],
+        customPass=data["customPass"],
+    )
+
+
+def bulk_ingest_hosts(hosts_data, chunk_size=500):
+    """Valida e inserta los hosts en bloque. Devuelve (creados, errores por fila)."""
+    related = _prefetch_related(hosts_data)
+
+    rows, errors = [], []
+    for idx, host in enumerate(hosts_data):
+        data, row_errors = _validate_row(host, related)
+        if row_errors:
+            errors.append({"index": idx, "hostname": host.get("hostname"), "errors": row_errors})
+        else:
+            rows.append((idx, data))
+
+    rows, unique_errors = _check_uniqueness(rows)
+    errors.extend(unique_errors)
+    _encrypt_passwords(rows)
+
+    created = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            with transaction.atomic():
+                NetworkDevice.objects.bulk_create([_build_device(data) for _, data in chunk])
+            created += len(chunk)
+        except IntegrityError:
+            # Otro proceso insertó entre la verificación y el insert: fila a fila
+            logger.warning("bulk_create falló por integridad; reintentando el bloque fila a fila")
+            for idx, data in chunk:
+                try:
+                    with transaction.atomic():
+                        _build_device(data).save()
+                    created += 1
+                except IntegrityError as e:
+                    errors.append({"index": idx, "hostname": data["hostname"], "error": str(e)})
+
+    errors.sort(key=lambda e: e["index"])
+    return created, errors
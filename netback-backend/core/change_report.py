@@ -0,0 +1,263 @@
+"""
+Informe "qué cambió desde" para toda la red.
+
+Una consulta sobre Backup.backupTime (índice backupTime) devuelve, por cada equipo
+con respaldos en [since, until], el último de ese rango y, como base, el último
+anterior a `since`. Los pares ya comparados reutilizan su BackupDiff; el resto se
+compara por bloques de equipos y, con CHANGE_REPORT_WORKERS > 1, el ndiff de las
+secciones cambiadas se reparte en un pool de procesos. La base de datos solo se
+usa en el proceso de la petición: los workers reciben y devuelven listas de líneas.
+
+Los informes se generan de a uno por equipo, así la vista los emite en streaming
+(JSON, NDJSON, HTML o zip) sin esperar al último.
+"""
+import io
+import json
+import multiprocessing
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from django.utils.html import escape
+
+from utils.classification_engine import iter_chunks
+
+from .models import Backup
+from .network_util.backup import get_parsed_vlan
+from .network_util.comparison import (cached_backup_diffs, changed_section_lines, compare_parsed_vlans,
+                                      encode_section_changes, render_backup_diff, render_hunks,
+                                      save_backup_diff)
+
+OUTPUT_FORMATS = ("json", "ndjson", "html", "zip")
+
+
+def changed_devices(since, until=None, filters=None):
+    """
+    Último respaldo en [since, until] de cada equipo que tenga alguno, con `baseline_id`:
+    el último respaldo anterior a `since` (None si el equipo es nuevo). Una sola consulta.
+    """
+    window = Backup.objects.filter(backupTime__gte=since)
+    if until is not None:
+        window = window.filter(backupTime__lte=until)
+    newest = window.filter(device=OuterRef("device")).order_by("-backupTime").values("pk")[:1]
+    baseline = (
+        Backup.objects.filter(device=OuterRef("device"), backupTime__lt=since)
+        .order_by("-backupTime")
+        .values("pk")[:1]
+    )
+    return (
+        window.filter(pk=Subquery(newest), **(filters or {}))
+        .annotate(baseline_id=Subquery(baseline))
+        .select_related("device")
+        .only("id", "backupTime", "device__id", "device__hostname", "device__ipAddress")
+        .order_by("device__hostname", "device_id")
+    )
+
+
+def _encode_pair(job):
+    """Worker: hunks de un par a partir de sus secciones cambiadas. No toca la base de datos."""
+    old_dict, new_dict, changed = job
+    return encode_section_changes(old_dict, new_dict, changed)
+
+
+def _backup_ref(backup):
+    return {"id": str(backup.id), "backupTime": backup.backupTime.isoformat()}
+
+
+def _report(row, baseline=None, backup_diff_id=None, changes=None):
+    device = row.device
+    return {
+        "device": {"id": str(device.id), "hostname": device.hostname, "ipAddress": device.ipAddress},
+        "status": "changed" if baseline is not None else "new",
+        "backupOld": _backup_ref(baseline) if baseline is not None else None,
+        "backupNew": _backup_ref(row),
+        "backupDiffId": backup_diff_id,
+        "changes": changes,
+    }
+
+
+def _report_chunk(rows, pool):
+    """Informes de un bloque de equipos, en el orden de `rows`."""
+    ids = [row.pk for row in rows] + [row.baseline_id for row in rows if row.baseline_id]
+    backups = Backup.objects.select_related("device__manufacturer").in_bulk(ids)
+    cached = cached_backup_diffs(backups.values())
+
+    reports, pending = {}, []
+    for row in rows:
+        if row.baseline_id is None:
+            reports[row.pk] = _report(row)
+            continue
+        old, new = backups[row.baseline_id], backups[row.pk]
+        diff = cached.get((old.pk, new.pk))
+        if diff is not None:
+            diff.backupOld, diff.backupNew = old, new
+            reports[row.pk] = _report(row, old, str(diff.id), render_backup_diff(diff))
+        else:
+            pending.append((row, old, new, changed_section_lines(old, new)))
+
+    jobs = [lines for _, _, _, lines in pending]
+    encoded = pool.map(_encode_pair, jobs) if pool is not None else map(_encode_pair, jobs)
+    for (row, old, new, (old_dict, new_dict, _)), entries in zip(pending, encoded):
+        vlan_info = compare_parsed_vlans(get_parsed_vlan(old), get_parsed_vlan(new))
+        backup_diff_id = str(save_backup_diff(old, new, entries, vlan_info).id)
+        reports[row.pk] = _report(row, old, backup_diff_id, render_hunks(entries, old_dict, new_dict, vlan_info))
+
+    return [reports[row.pk] for row in rows]
+
+
+def iter_change_report(since, until=None, filters=None, workers=None, chunk_size=None):
+    """Genera el informe de cada equipo cambiado en [since, until], ordenado por hostname."""
+    workers = settings.CHANGE_REPORT_WORKERS if workers is None else workers
+    chunk_size = chunk_size or settings.CHANGE_REPORT_CHUNK_SIZE
+    rows = list(changed_devices(since, until, filters))
+    if not rows:
+        return
+
+    pool = nullcontext()
+    if workers and workers > 1 and len(rows) > 1:
+        # fork: los workers heredan Django ya configurado; no consultan la BD
+        pool = ProcessPoolExecutor(
+            max_workers=min(workers, len(rows)), mp_context=multiprocessing.get_context("fork")
+        )
+    with pool as executor:
+        for chunk in iter_chunks(rows, chunk_size):
+            yield from _report_chunk(chunk, executor)
+
+
+# **********************************************************
+# Formatos de salida (generadores para StreamingHttpResponse)
+# **********************************************************
+_SECTION_KINDS = (("added", "añadida"), ("removed", "eliminada"), ("modified", "modificada"))
+
+
+def diff_lines(report):
+    """Texto del diff de un equipo: cabecera por sección seguida de sus líneas ("++ "/"-- ") y puertos por VLAN."""
+    changes = report["changes"]
+    if changes is None:
+        return []
+    lines = []
+    for key, label in _SECTION_KINDS:
+        for section in changes[key]:
+            for title, body in section.items():
+                lines.append(f"## {title} ({label})")
+                lines.extend(body)
+    for vlan, ports in (changes["vlanInfo"].get("ports_vlan") or {}).items():
+        assigned = " ".join(f"+{port}" for port in sorted(ports["assigned"]))
+        removed = " ".join(f"-{port}" for port in sorted(ports["removed"]))
+        lines.append(f"## VLAN {vlan}: {' '.join(filter(None, [assigned, removed]))}")
+    return lines
+
+
+def _summary(report):
+    summary = {key: value for key, value in report.items() if key != "changes"}
+    if report["changes"] is not None:
+        summary["sections"] = {key: len(report["changes"][key]) for key, _ in _SECTION_KINDS}
+    return summary
+
+
+def stream_ndjson(reports):
+    for report in reports:
+        yield json.dumps(report) + "\n"
+
+
+def stream_json(reports, since, until):
+    """{"since", "until", "devices": [...], "errors": [...]}: los equipos se emiten a medida que se generan."""
+    yield json.dumps({"since": since.isoformat(), "until": until.isoformat() if until else None})[:-1]
+    yield ', "devices": ['
+    errors = []
+    first = True
+    for report in reports:
+        if "error" in report:
+            errors.append(report["error"])
+            continue
+        yield ("" if first else ", ") + json.dumps(report)
+        first = False
+    yield f'], "errors": {json.dumps(errors)}}}'
+
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: sans-serif; }} pre {{ background: #f6f8fa; padding: .5em; }}
+.add {{ color: #1a7f37; }} .del {{ color: #cf222e; }} .hdr {{ font-weight: bold; }}
+</style></head><body><h1>{title}</h1>
+"""
+
+
+def _html_line(line):
+    css = "hdr" if line.startswith("## ") else "add" if line.startswith("++ ") else "del" if line.startswith("-- ") else ""
+    return f'<span class="{css}">{escape(line)}</span>' if css else escape(line)
+
+
+def stream_html(reports, since, until):
+    title = f"Cambios desde {since.isoformat()}" + (f" hasta {until.isoformat()}" if until else "")
+    yield _HTML_HEAD.format(title=escape(title))
+    count = 0
+    for report in reports:
+        if "error" in report:
+            yield f'<p class="del">{escape(report["error"])}</p>\n'
+            continue
+        count += 1
+        device = report["device"]
+        old = report["backupOld"]["backupTime"] if report["backupOld"] else "—"
+        yield (
+            f"<section><h2>{escape(device['hostname'])} ({escape(device['ipAddress'] or '')})</h2>"
+            f"<p>{escape(old)} → {escape(report['backupNew']['backupTime'])}</p>\n"
+        )
+        if report["status"] == "new":
+            yield "<p>Equipo sin respaldo anterior: no hay diff.</p></section>\n"
+            continue
+        yield "<pre>" + "\n".join(_html_line(line) for line in diff_lines(report)) + "</pre></section>\n"
+    yield f"<p>{count} equipo(s) con cambios.</p></body></html>\n"
+
+
+class _ZipStream(io.RawIOBase):
+    """Destino sin seek para zipfile: guarda lo escrito hasta que el generador lo entrega."""
+
+    def __init__(self):
+        self.buffer = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def _zip_name(device, used):
+    name = re.sub(r"[^\w.-]", "_", device["hostname"] or device["id"])
+    if name in used:
+        name = f"{name}-{device['id']}"
+    used.add(name)
+    return f"devices/{name}.diff"
+
+
+def stream_zip(reports, since, until):
+    """Un .diff por equipo y report.json con el resumen (sin las líneas) al final."""
+    stream = _ZipStream()
+    summaries, errors, used = [], [], set()
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        for report in reports:
+            if "error" in report:
+                errors.append(report["error"])
+                continue
+            name = _zip_name(report["device"], used)
+            archive.writestr(name, "\n".join(diff_lines(report)) + "\n")
+            summaries.append({**_summary(report), "file": name})
+            yield stream.drain()
+        archive.writestr("report.json", json.dumps({
+            "since": since.isoformat(),
+            "until": until.isoformat() if until else None,
+            "devices": summaries,
+            "errors": errors,
+        }, indent=2))
+    yield stream.drain()
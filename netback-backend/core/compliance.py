@@ -0,0 +1,141 @@
+"""
+Motor de cumplimiento: reglas must-contain / must-not-contain evaluadas sobre el
+último respaldo de cada dispositivo.
+
+Una regla con `section` solo mira los bloques de `section_config` cuyo título
+coincide con esa regex (p. ej. `^line vty` debe contener `transport input ssh`);
+sin `section` se evalúa toda la configuración. Los resultados se guardan en
+ComplianceResult junto con el checksum evaluado, así la siguiente corrida solo
+reevalúa los equipos cuyo respaldo cambió (o las reglas editadas desde entonces).
+"""
+import logging
+import re
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ComplianceResult, ComplianceRule
+from .network_util.backup import latest_backups, section_config
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledRule:
+    def __init__(self, rule):
+        self.rule = rule
+        self.pattern = re.compile(rule.pattern)
+        self.section = re.compile(rule.section) if rule.section else None
+
+    def applies_to(self, device):
+        return self.rule.manufacturer_id is None or self.rule.manufacturer_id == device.manufacturer_id
+
+    def _scopes(self, config, sections):
+        if self.section is None:
+            return [("", config.splitlines())]
+        return [(title, lines) for title, lines in sections if self.section.search(title)]
+
+    def evaluate(self, config, sections):
+        """Devuelve (cumple, detalles). Una regla con sección sin bloques que coincidan no aplica: cumple."""
+        details = []
+        for title, lines in self._scopes(config, sections):
+            found = [line for line in lines if self.pattern.search(line)]
+            if self.rule.kind == "must_not_contain":
+                details.extend({"section": title, "text": line} for line in found)
+            elif not found:
+                details.append({"section": title, "text": None})
+        return not details, details
+
+
+def validate_pattern(value):
+    """ValueError si `value` no es una expresión regular válida."""
+    try:
+        re.compile(value)
+    except re.error as e:
+        raise ValueError(f"Expresión regular inválida: {e}")
+
+
+def compiled_rules():
+    rules = []
+    for rule in ComplianceRule.objects.filter(enabled=True):
+        try:
+            rules.append(CompiledRule(rule))
+        except re.error:
+            # El serializer valida las regex; una regla rota no detiene las demás
+            logger.error(f"❌ Regla de cumplimiento '{rule.name}' con regex inválida, se omite")
+    return rules
+
+
+def stale_device_ids(device_ids=None):
+    """
+    Equipos cuyo último respaldo no tiene resultados vigentes: checksum distinto,
+    regla nueva, editada después de evaluar o que ya no aplica. Tres consultas, sin leer configuraciones.
+    """
+    backups = latest_backups()
+    if device_ids is not None:
+        backups = backups.filter(device_id__in=device_ids)
+    latest = {
+        row["device_id"]: (row["checksum"], row["device__manufacturer_id"])
+        for row in backups.values("device_id", "checksum", "device__manufacturer_id")
+    }
+    rules = {
+        row["id"]: row for row in ComplianceRule.objects.filter(enabled=True).values("id", "updatedAt", "manufacturer_id")
+    }
+
+    def applies(rule, device_id):
+        return rule["manufacturer_id"] in (None, latest[device_id][1])
+
+    stale, current = set(), set()
+    for row in ComplianceResult.objects.filter(device_id__in=latest, rule__enabled=True).values(
+        "device_id", "rule_id", "checksum", "evaluatedAt"
+    ):
+        device_id, rule = row["device_id"], rules.get(row["rule_id"])
+        if (
+            rule is None
+            or not applies(rule, device_id)
+            or row["checksum"] != latest[device_id][0]
+            or row["evaluatedAt"] < rule["updatedAt"]
+        ):
+            stale.add(device_id)
+        else:
+            current.add((device_id, row["rule_id"]))
+
+    for device_id in latest:
+        if any((device_id, rule_id) not in current for rule_id, rule in rules.items() if applies(rule, device_id)):
+            stale.add(device_id)
+    return sorted(stale, key=str)
+
+
+def evaluate_devices(device_ids, rules=None):
+    """Evalúa todas las reglas activas sobre el último respaldo de cada equipo y guarda los resultados."""
+    rules = compiled_rules() if rules is None else rules
+    backups = (
+        latest_backups()
+        .filter(device_id__in=device_ids)
+        .select_related("device")
+        .only("id", "checksum", "runningConfig", "device__id", "device__manufacturer_id")
+    )
+    evaluated = failed = 0
+    for backup in backups.iterator():
+        device = backup.device
+        sections = section_config(backup.runningConfig)
+        now = timezone.now()
+        results = []
+        for compiled in rules:
+            if not compiled.applies_to(device):
+                continue
+            passed, details = compiled.evaluate(backup.runningConfig, sections)
+            failed += not passed
+            results.append(ComplianceResult(
+                rule=compiled.rule, device=device, backup=backup, checksum=backup.checksum,
+                passed=passed, details=details, evaluatedAt=now,
+            ))
+        with transaction.atomic():
+            ComplianceResult.objects.filter(device=device).delete()
+            ComplianceResult.objects.bulk_create(results)
+        evaluated += 1
+    return {"devices": evaluated, "failed": failed}
+
+
+def prune_disabled_results():
+    """Los resultados de reglas desactivadas no cuentan en el tablero."""
+    return ComplianceResult.objects.filter(rule__enabled=False).delete()[0]
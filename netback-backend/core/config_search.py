@@ -0,0 +1,124 @@
+"""
+Búsqueda de texto y expresiones regulares en las configuraciones respaldadas.
+
+La base de datos descarta los respaldos que no contienen el patrón (LIKE / `~`
+en PostgreSQL, acelerados por el índice trigram que crea
+`manage.py create_config_search_index`); solo los candidatos llegan a Python,
+por bloques, para extraer las líneas que coinciden. Así "¿qué equipos tienen
+`snmp-server community public`?" no carga la configuración de toda la red.
+
+Las regex se validan con `re`. Solo las del subconjunto común con PostgreSQL
+(ver `portable_regex`) se envían a la base de datos; el resto (grupos con nombre,
+lookarounds, flags en línea, `\b`...) se filtra únicamente en Python.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Backup
+from .network_util.backup import latest_backups
+
+
+# Construcciones de `re` que PostgreSQL no admite o interpreta distinto: "(?" salvo "(?:"
+# (grupos con nombre, lookarounds, flags en línea), \b y \B (retroceso y "\" en PostgreSQL),
+# cuantificadores posesivos, "{,n}", repeticiones {m,n} mayores que PG_MAX_REPETITION y clases
+# "[:...:]". Las demás secuencias escapadas se saltan.
+_PYTHON_ONLY = re.compile(r"\\[bB]|\\.|\(\?(?!:)|[*+?}]\+|\{,|\[:|\{(\d+)(?:,(\d*))?\}(\+?)")
+# PostgreSQL rechaza repeticiones {m,n} por encima de este límite ("invalid repetition count(s)")
+PG_MAX_REPETITION = 255
+
+
+def _portable_token(match):
+    token = match.group()
+    if token.startswith("{"):
+        minimum, maximum, possessive = match.groups()
+        return not possessive and all(int(b) <= PG_MAX_REPETITION for b in (minimum, maximum) if b)
+    return token.startswith("\\") and token not in ("\\b", "\\B")
+
+
+def portable_regex(query):
+    """True si la regex tiene el mismo significado en `re` y en las regex de PostgreSQL."""
+    return all(_portable_token(match) for match in _PYTHON_ONLY.finditer(query))
+
+
+def compile_query(query, regex=False, ignore_case=False):
+    """
+    Función línea -> bool. ValueError si la consulta está vacía, supera
+    CONFIG_SEARCH_MAX_PATTERN caracteres o la regex no es válida.
+    """
+    if not query:
+        raise ValueError("La consulta está vacía.")
+    if len(query) > settings.CONFIG_SEARCH_MAX_PATTERN:
+        # Cualquier usuario puede buscar: se acota el costo de una regex recorriendo toda la red
+        raise ValueError(f"La consulta supera los {settings.CONFIG_SEARCH_MAX_PATTERN} caracteres.")
+    if regex:
+        try:
+            pattern = re.compile(query, re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            raise ValueError(f"Expresión regular inválida: {e}")
+        return lambda line: pattern.search(line) is not None
+    if ignore_case:
+        needle = query.casefold()
+        return lambda line: needle in line.casefold()
+    return lambda line: query in line
+
+
+def _db_lookup(query, regex, ignore_case):
+    """Filtro de candidatos sobre runningConfig, evaluado en la base de datos. None: solo se filtra en Python."""
+    if not regex:
+        if not ignore_case:
+            return {"runningConfig__contains": query}
+        # icontains genera UPPER(...) LIKE, que no usa el índice trigram; ~* sí
+        regex, query = True, re.escape(query)
+    if connection.vendor == "sqlite":
+        # SQLite evalúa con `re`: las flags propias al inicio de la consulta se combinan con (?m)
+        query = "(?m)" + query
+    elif not portable_regex(query):
+        return None
+    elif connection.vendor == "postgresql":
+        # (?n): ^ y $ por línea y . sin saltar de línea, como en el filtrado por líneas
+        query = "(?n)" + query
+    return {f"runningConfig__{'iregex' if ignore_case else 'regex'}": query}
+
+
+def candidate_backups(query, regex=False, ignore_case=False, all_backups=False, filters=None):
+    """Respaldos cuya configuración contiene el patrón (solo el último por equipo salvo all_backups)."""
+    backups = Backup.objects.all() if all_backups else latest_backups()
+    lookup = _db_lookup(query, regex, ignore_case)
+    return (
+        backups.filter(**(lookup or {}), **(filters or {}))
+        .select_related("device")
+        .only("id", "backupTime", "runningConfig", "device__id", "device__hostname", "device__ipAddress")
+        .order_by("device__hostname", "-backupTime")
+    )
+
+
+def search_configs(query, regex=False, ignore_case=False, all_backups=False, filters=None, max_lines=None):
+    """
+    Genera un resultado por respaldo con líneas coincidentes:
+    {"device": {...}, "backupId", "backupTime", "matches": [{"line", "text"}], "truncated"}.
+    """
+    matches_line = compile_query(query, regex, ignore_case)
+    max_lines = max_lines or settings.CONFIG_SEARCH_MAX_LINES
+    backups = candidate_backups(query, regex, ignore_case, all_backups, filters)
+
+    for backup in backups.iterator(chunk_size=settings.CONFIG_SEARCH_CHUNK_SIZE):
+        matches, truncated = [], False
+        for number, line in enumerate(backup.runningConfig.splitlines(), start=1):
+            if matches_line(line):
+                if len(matches) == max_lines:
+                    truncated = True
+                    break
+                matches.append({"line": number, "text": line})
+        if not matches:
+            # La base de datos es más permisiva (p. ej. patrones que cruzan líneas)
+            continue
+        device = backup.device
+        yield {
+            "device": {"id": str(device.id), "hostname": device.hostname, "ipAddress": device.ipAddress},
+            "backupId": str(backup.id),
+            "backupTime": backup.backupTime.isoformat(),
+            "matches": matches,
+            "truncated": truncated,
+        }
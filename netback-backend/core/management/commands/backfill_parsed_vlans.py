@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Backup
+from core.network_util.vlan_parser import parse_vlan_brief
+
+
+class Command(BaseCommand):
+    help = "Parsea y guarda las VLANs (Backup.parsedVlan) de los respaldos que aún no las tienen"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--all", action="store_true", help="Volver a parsear todos (p. ej. tras cambiar un parser)"
+        )
+
+    def handle(self, *args, **options):
+        backups = Backup.objects.select_related("device__manufacturer").only(
+            "id", "vlanBrief", "device__manufacturer__name", "device__manufacturer__netmiko_type"
+        )
+        if not options["all"]:
+            backups = backups.filter(parsedVlan__isnull=True)
+
+        pending, updated, unsupported = [], 0, 0
+        for backup in backups.iterator(chunk_size=options["batch_size"]):
+            manufacturer = backup.device.manufacturer
+            parsed = parse_vlan_brief(backup.vlanBrief, manufacturer.name, manufacturer.netmiko_type)
+            if "error" in parsed:
+                unsupported += 1
+                continue
+            backup.parsedVlan = parsed
+            pending.append(backup)
+            if len(pending) >= options["batch_size"]:
+                Backup.objects.bulk_update(pending, ["parsedVlan"])
+                updated += len(pending)
+                pending = []
+
+        if pending:
+            Backup.objects.bulk_update(pending, ["parsedVlan"])
+            updated += len(pending)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"VLANs guardadas: {updated} | sin parser para el fabricante: {unsupported}"
+        ))
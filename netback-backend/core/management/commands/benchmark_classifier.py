@@ -0,0 +1,86 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from utils.rule_matcher import SOURCES, CompiledRuleSet, match_rules_linear
+
+FIELDS = ["country", "site", "area", "model", "deviceType", "manufacturer"]
+
+
+def _word(rng, size):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(size))
+
+
+def synthetic_rules(rng, rules_per_field):
+    rules = {}
+    for field in FIELDS:
+        rules[field] = [
+            {
+                "value": _word(rng, rng.randint(3, 6)),
+                "assign": f"{field}-{i}",
+                "searchIn": rng.sample(SOURCES, rng.randint(1, 2)),
+            }
+            for i in range(rules_per_field)
+        ]
+    return rules
+
+
+def synthetic_sources(rng, rules, hosts):
+    values = [r["value"] for field_rules in rules.values() for r in field_rules]
+    for _ in range(hosts):
+        # Cada host contiene algunos valores de reglas mezclados con ruido
+        picks = rng.sample(values, min(4, len(values)))
+        yield {
+            "hostname": f"{_word(rng, 4)}-{picks[0]}-{_word(rng, 3)}{rng.randint(1, 99)}",
+            "tags": picks[1] if rng.random() < 0.5 else "",
+            "groups": [f"grp-{p}" for p in picks[2:]] + [_word(rng, 8)],
+            "model": _word(rng, 6),
+        }
+
+
+class Command(BaseCommand):
+    help = "Mide la clasificación de hosts (reglas compiladas vs recorrido lineal) sobre datos sintéticos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hosts", type=int, default=20000, help="Cantidad de hosts sintéticos")
+        parser.add_argument("--rules", type=int, default=100, help="Reglas por campo")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--skip-linear", action="store_true", help="No ejecutar la implementación lineal (lenta)"
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        rules = synthetic_rules(rng, options["rules"])
+        hosts = list(synthetic_sources(rng, rules, options["hosts"]))
+        self.stdout.write(
+            f"Hosts: {len(hosts)} | reglas: {options['rules']} x {len(FIELDS)} campos"
+        )
+
+        start = time.perf_counter()
+        matcher = CompiledRuleSet(rules)
+        compile_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compiled = [matcher.match(h) for h in hosts]
+        compiled_time = time.perf_counter() - start
+        self.stdout.write(f"Compilación: {compile_time * 1000:.1f} ms")
+        self.stdout.write(f"Compilado:   {compiled_time:.3f} s")
+
+        if options["skip_linear"]:
+            return
+
+        start = time.perf_counter()
+        linear = [match_rules_linear(rules, h) for h in hosts]
+        linear_time = time.perf_counter() - start
+        self.stdout.write(f"Lineal:      {linear_time:.3f} s")
+
+        if compiled != linear:
+            mismatches = sum(1 for a, b in zip(compiled, linear) if a != b)
+            self.stdout.write(self.style.ERROR(f"❌ {mismatches} hosts con resultado distinto"))
+            return
+
+        speedup = linear_time / compiled_time if compiled_time else float("inf")
+        self.stdout.write(self.style.SUCCESS(f"✅ Resultados idénticos ({speedup:.1f}x más rápido)"))
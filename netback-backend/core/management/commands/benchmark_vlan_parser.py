@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.network_util.vlan_parser import get_vlan_parser
+
+
+def synthetic_cisco(vlans, ports_per_vlan):
+    lines = [
+        "VLAN Name                             Status    Ports",
+        "---- -------------------------------- --------- -------------------------------",
+    ]
+    for vlan in range(1, vlans + 1):
+        ports = [f"Gi{vlan % 8 + 1}/0/{i % 48 + 1}" for i in range(ports_per_vlan)]
+        rows = [", ".join(ports[i:i + 3]) for i in range(0, len(ports), 3)] or [""]
+        lines.append(f"{vlan:<4} {'VLAN' + str(vlan):<32} active    {rows[0]}")
+        lines.extend(f"{'':48}{row}" for row in rows[1:])
+    return "\n".join(lines)
+
+
+def synthetic_huawei(vlans, ports_per_vlan):
+    lines = ["VID  Type    Ports", "-" * 80]
+    for vlan in range(1, vlans + 1):
+        ports = [f"GE{vlan % 8}/0/{i % 48 + 1}(U)" for i in range(ports_per_vlan)]
+        rows = ["     ".join(ports[i:i + 4]) for i in range(0, len(ports), 4)] or [""]
+        lines.append(f"{vlan:<4} common  UT:{rows[0]}")
+        lines.extend(f"{'':16}{row}" for row in rows[1:])
+    lines += ["", "VID  Status  Property      MAC-LRN Statistics Description", "-" * 80]
+    lines.extend(f"{vlan:<4} enable  default       enable  disable    VLAN {vlan:04d}" for vlan in range(1, vlans + 1))
+    return "\n".join(lines)
+
+
+GENERATORS = {"cisco_ios": synthetic_cisco, "huawei": synthetic_huawei}
+
+
+class Command(BaseCommand):
+    help = "Mide los parsers de VLANs registrados sobre salidas sintéticas grandes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--vlans", type=int, default=1000, help="VLANs por salida")
+        parser.add_argument("--ports", type=int, default=12, help="Puertos por VLAN")
+        parser.add_argument("--repeat", type=int, default=20, help="Veces que se parsea cada salida")
+
+    def handle(self, *args, **options):
+        for netmiko_type, generate in GENERATORS.items():
+            text = generate(options["vlans"], options["ports"])
+            parser = get_vlan_parser(None, netmiko_type)
+
+            start = time.perf_counter()
+            for _ in range(options["repeat"]):
+                parsed = parser(text)
+            elapsed = (time.perf_counter() - start) / options["repeat"]
+
+            lines = text.count("\n") + 1
+            found = len(parsed["vlans"])
+            status = self.style.SUCCESS("✅") if found == options["vlans"] else self.style.ERROR("❌")
+            self.stdout.write(
+                f"{status} {netmiko_type:<10} {lines} líneas | {elapsed * 1000:.2f} ms por salida"
+                f" | {lines / elapsed:,.0f} líneas/s | {found} VLANs"
+            )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import BackupDiff
+from core.network_util.comparison import HUNKS_VERSION, diff_hunks, render_section_changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Convierte los BackupDiff guardados en formato legado (changes + structured_changes) "
+        "al formato compacto de hunks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--dry-run", action="store_true", help="Solo informar, sin escribir")
+
+    def handle(self, *args, **options):
+        pending = (
+            BackupDiff.objects.filter(hunks__isnull=True, structured_changes__isnull=False)
+            .select_related("backupOld", "backupNew")
+            .order_by("createdAt")
+        )
+        totals = {"converted": 0, "kept": 0}
+        batch = []
+        for diff in pending.iterator(chunk_size=options["batch_size"]):
+            stored = diff.structured_changes
+            entries, old_dict, new_dict = diff_hunks(diff.backupOld, diff.backupNew)
+            rendered = render_section_changes(entries, old_dict, new_dict)
+            # Solo se convierte si el formato compacto reproduce exactamente lo guardado
+            if rendered != tuple(stored.get(key, []) for key in ("added", "removed", "modified")):
+                totals["kept"] += 1
+                continue
+            diff.hunks = {"version": HUNKS_VERSION, "sections": entries, "vlanInfo": stored.get("vlanInfo", {})}
+            diff.changes = ""
+            diff.structured_changes = None
+            batch.append(diff)
+            totals["converted"] += 1
+            if len(batch) >= options["batch_size"]:
+                self.save(batch, options["dry_run"])
+                batch = []
+        self.save(batch, options["dry_run"])
+
+        prefix = "[dry-run] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}BackupDiff: {totals['converted']} convertidos, "
+            f"{totals['kept']} conservados en formato legado (no coinciden con los respaldos)"
+        ))
+
+    def save(self, batch, dry_run):
+        if batch and not dry_run:
+            with transaction.atomic():
+                BackupDiff.objects.bulk_update(batch, ["hunks", "changes", "structured_changes"])
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import Backup
+
+INDEX_NAME = "core_backup_runningconfig_trgm"
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea (si no existe) el índice trigram de PostgreSQL sobre Backup.runningConfig que "
+        "acelera la búsqueda de configuraciones (LIKE y expresiones regulares)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--drop", action="store_true", help="Eliminar el índice en lugar de crearlo")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            self.stdout.write(self.style.WARNING(
+                f"Base de datos '{connection.vendor}': el índice trigram solo existe en PostgreSQL; "
+                "la búsqueda funciona igual, recorriendo la tabla."
+            ))
+            return
+
+        table = connection.ops.quote_name(Backup._meta.db_table)
+        column = connection.ops.quote_name(Backup._meta.get_field("runningConfig").column)
+        with connection.cursor() as cursor:
+            if options["drop"]:
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+                self.stdout.write(self.style.SUCCESS(f"Índice {INDEX_NAME} eliminado"))
+                return
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            # CONCURRENTLY: no bloquea la escritura de respaldos mientras se construye
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+                f"ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Índice {INDEX_NAME} listo"))
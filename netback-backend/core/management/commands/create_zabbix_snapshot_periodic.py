@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_celery_beat.models import IntervalSchedule, PeriodicTask
+
+
+class Command(BaseCommand):
+    help = "Crea o actualiza el IntervalSchedule + PeriodicTask para core.tasks.refreshZabbixSnapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--minutes",
+            type=int,
+            default=settings.ZABBIX_SNAPSHOT_MINUTES,
+            help="Minutos entre refrescos (por defecto ZABBIX_SNAPSHOT_MINUTES)",
+        )
+        parser.add_argument(
+            "--name",
+            type=str,
+            default="refreshZabbixSnapshot",
+            help="Nombre del PeriodicTask (por defecto 'refreshZabbixSnapshot')",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Mostrar qué se crearía sin aplicarlo"
+        )
+
+    def handle(self, *args, **options):
+        minutes = options["minutes"]
+        name = options["name"]
+        # Sin Zabbix configurado la tarea queda creada pero deshabilitada
+        enabled = bool(settings.ZABBIX_URL and settings.ZABBIX_TOKEN) and minutes > 0
+
+        self.stdout.write(f"Creando/actualizando IntervalSchedule cada {minutes} minutos")
+
+        if options["dry_run"]:
+            self.stdout.write("dry-run: IntervalSchedule y PeriodicTask no fueron modificados")
+            return
+
+        schedule, _ = IntervalSchedule.objects.get_or_create(
+            every=max(minutes, 1), period=IntervalSchedule.MINUTES
+        )
+        pt, created = PeriodicTask.objects.update_or_create(
+            name=name,
+            defaults={
+                "task": "core.tasks.refreshZabbixSnapshot",
+                "interval": schedule,
+                "crontab": None,
+                "enabled": enabled,
+            },
+        )
+
+        self.stdout.write(
+            f"PeriodicTask '{name}' {'creado' if created else 'actualizado'} (enabled={pt.enabled})"
+        )
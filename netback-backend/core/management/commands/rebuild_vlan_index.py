@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.vlan_index import rebuild_vlan_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de VLANs/puertos (VlanMembership) desde el último respaldo de cada equipo"
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        devices, rows = rebuild_vlan_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice de VLANs: {devices} equipos, {rows} filas ({time.perf_counter() - start:.1f} s)"
+        ))
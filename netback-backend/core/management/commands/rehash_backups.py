@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Backup, NetworkDevice
+from core.network_util.normalization import backup_checksum
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula el checksum de los respaldos existentes sobre la configuración normalizada "
+        "(ignorando líneas volátiles)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--device", help="Hostname de un solo dispositivo")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true", help="Solo informar, sin escribir")
+        parser.add_argument(
+            "--delete-duplicates",
+            action="store_true",
+            help="Eliminar los respaldos que, normalizados, repiten uno anterior del mismo equipo",
+        )
+
+    def handle(self, *args, **options):
+        devices = NetworkDevice.objects.select_related("manufacturer").order_by("hostname")
+        if options["device"]:
+            devices = devices.filter(hostname=options["device"])
+
+        totals = {"updated": 0, "duplicates": 0, "deleted": 0}
+        for device in devices.iterator():
+            result = self.rehash_device(device, options)
+            for key in totals:
+                totals[key] += result[key]
+            if result["updated"] or result["duplicates"]:
+                self.stdout.write(
+                    f"{device.hostname}: {result['updated']} recalculados, {result['duplicates']} duplicados"
+                )
+
+        prefix = "[dry-run] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Checksums recalculados: {totals['updated']} | duplicados: {totals['duplicates']}"
+            f" | eliminados: {totals['deleted']}"
+        ))
+
+    def rehash_device(self, device, options):
+        vendor = device.manufacturer.netmiko_type
+        rows = (
+            Backup.objects.filter(device=device)
+            .order_by("backupTime")
+            .values_list("id", "checksum", "runningConfig", "vlanBrief")
+            .iterator(chunk_size=options["batch_size"])
+        )
+        # checksum normalizado -> [(id, checksum actual)] en orden cronológico
+        groups = {}
+        for pk, current, running_config, vlan_brief in rows:
+            groups.setdefault(backup_checksum(running_config, vlan_brief, vendor), []).append((pk, current))
+
+        to_update, duplicates = [], []
+        for checksum, members in groups.items():
+            # Se conserva el que ya tiene el checksum nuevo (evita choques con unique_together) o el más antiguo
+            keeper = next((m for m in members if m[1] == checksum), members[0])
+            duplicates.extend(pk for pk, _ in members if pk != keeper[0])
+            if keeper[1] != checksum:
+                to_update.append(Backup(id=keeper[0], checksum=checksum))
+
+        deleted = 0
+        if not options["dry_run"]:
+            with transaction.atomic():
+                if options["delete_duplicates"] and duplicates:
+                    Backup.objects.filter(id__in=duplicates).delete()
+                    deleted = len(duplicates)
+                Backup.objects.bulk_update(to_update, ["checksum"], batch_size=options["batch_size"])
+
+        return {"updated": len(to_update), "duplicates": len(duplicates), "deleted": deleted}
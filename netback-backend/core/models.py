@@ -202,6 +202,12 @@ class Manufacturer(models.Model):
         choices=[(t, t) for t in SUPPORTED_NETMIKO_TYPES],
         help_text="Tipo de dispositivo compatible con Netmiko",
     )
+    get_change_marker = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        help_text="Comando barato cuya salida cambia cuando cambia la configuración (opcional)",
+    )
 
     def clean(self):
         if self.netmiko_type and self.netmiko_type not in SUPPORTED_NETMIKO_TYPES:
@@ -286,10 +292,19 @@ class Backup(models.Model):
     runningConfig = models.TextField()
     vlanBrief = models.TextField()
     checksum = models.CharField(max_length=64)
+    # VLANs parseadas de vlanBrief al ingerir: {"vlans": {...}, "ports_vlan": {...}}
+    parsedVlan = models.JSONField(null=True, blank=True)
+    # Hash de cada sección de runningConfig ({título: hash}): las comparaciones solo recorren las que difieren
+    sectionHashes = models.JSONField(null=True, blank=True)
 
     class Meta:
         # El checksum debe ser único por dispositivo, no globalmente
         unique_together = ("device", "checksum")
+        # backupTime: "qué cambió desde" en toda la red; (device, -backupTime): último respaldo de cada equipo
+        indexes = [
+            models.Index(fields=["backupTime"]),
+            models.Index(fields=["device", "-backupTime"]),
+        ]
 
     def __str__(self):
         return f"Backup {self.device.hostname} - {self.backupTime}"
@@ -304,8 +319,11 @@ class BackupDiff(models.Model):
     backupNew = models.ForeignKey(
         "Backup", related_name="new_backup", on_delete=models.CASCADE
     )
-    changes = models.TextField()
+    # Formatos legados: las filas nuevas solo guardan hunks (ver compact_backup_diffs)
+    changes = models.TextField(blank=True, default="")
     structured_changes = models.JSONField(null=True, blank=True)
+    # Tramos del diff que apuntan a las líneas de ambos respaldos (network_util.comparison)
+    hunks = models.JSONField(null=True, blank=True)
     createdAt = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -362,6 +380,32 @@ class ClassificationRuleSet(models.Model):
         return self.name
 
 
+class ZabbixSyncState(models.Model):
+    """Marca de agua de la última sincronización con Zabbix (reloj de Zabbix)."""
+
+    name = models.CharField(max_length=50, unique=True)
+    lastSync = models.DateTimeField(null=True, blank=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.lastSync}"
+
+
+class ZabbixHostSnapshot(models.Model):
+    """Copia local de los hosts procesados de Zabbix, refrescada por Celery."""
+
+    hostid = models.CharField(max_length=20, unique=True)
+    hostname = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, blank=True, default="")
+    ip = models.CharField(max_length=64, blank=True, default="")
+    groups = models.JSONField(default=list)
+    tags = models.CharField(max_length=255, null=True, blank=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.hostname} ({self.hostid})"
+
+
 # **********************************************************
 # 📊 Seguimiento de estados de respaldo por dispositivo
 # **********************************************************
@@ -382,6 +426,101 @@ class BackupStatusTracker(models.Model):
     last_status = models.CharField(
         max_length=30, choices=STATUS_CHOICES, default="error"
     )
+    # Circuit breaker: el respaldo automático omite el equipo hasta esta fecha
+    circuit_open_until = models.DateTimeField(null=True, blank=True)
+    # Vía rápida: hash de la salida del comando marcador tras la última descarga completa
+    change_marker = models.CharField(max_length=64, null=True, blank=True)
+    change_marker_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Tracker for {self.device.hostname}"
+
+
+class VlanMembership(models.Model):
+    """Índice de VLANs/puertos del último respaldo de cada dispositivo (una fila por puerto)."""
+
+    device = models.ForeignKey(
+        "NetworkDevice", on_delete=models.CASCADE, related_name="vlan_memberships"
+    )
+    backup = models.ForeignKey("Backup", on_delete=models.CASCADE, related_name="vlan_memberships")
+    vlanId = models.PositiveIntegerField(db_index=True)
+    vlanName = models.CharField(max_length=128, blank=True, default="")
+    # Vacío = la VLAN existe en el equipo pero sin puertos asignados
+    port = models.CharField(max_length=64, blank=True, default="", db_index=True)
+
+    class Meta:
+        unique_together = ("device", "vlanId", "port")
+
+    def __str__(self):
+        return f"{self.device.hostname} VLAN {self.vlanId} {self.port}".rstrip()
+
+
+class BackupTiming(models.Model):
+    """Duraciones de cada intento de respaldo (serie corta por dispositivo)."""
+
+    device = models.ForeignKey(
+        "NetworkDevice", on_delete=models.CASCADE, related_name="backup_timings"
+    )
+    createdAt = models.DateTimeField(auto_now_add=True, db_index=True)
+    success = models.BooleanField(default=True)
+    connectSeconds = models.FloatField(null=True, blank=True)
+    commandSeconds = models.FloatField(null=True, blank=True)
+    totalSeconds = models.FloatField()
+
+    class Meta:
+        indexes = [models.Index(fields=["device", "-createdAt"])]
+
+    def __str__(self):
+        return f"{self.device.hostname} {self.totalSeconds:.1f}s ({self.createdAt})"
+
+
+# **********************************************************
+# ✅ Cumplimiento de configuración
+# **********************************************************
+class ComplianceRule(models.Model):
+    KIND_CHOICES = [
+        ("must_contain", "Debe contener"),
+        ("must_not_contain", "No debe contener"),
+    ]
+    SEVERITY_CHOICES = [("low", "Baja"), ("medium", "Media"), ("high", "Alta")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=100, unique=True)
+    description = models.TextField(blank=True, default="")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Regex evaluada línea a línea
+    pattern = models.TextField()
+    # Regex sobre el título de sección (section_config); vacío = toda la configuración
+    section = models.CharField(max_length=255, blank=True, default="")
+    # Vacío = aplica a todos los fabricantes
+    manufacturer = models.ForeignKey(Manufacturer, on_delete=models.CASCADE, null=True, blank=True)
+    severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES, default="medium")
+    enabled = models.BooleanField(default=True)
+    createdAt = models.DateTimeField(auto_now_add=True)
+    # Editar una regla invalida sus resultados (se reevalúa en la siguiente corrida)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ComplianceResult(models.Model):
+    """Resultado de una regla sobre el último respaldo de un dispositivo."""
+
+    rule = models.ForeignKey(ComplianceRule, on_delete=models.CASCADE, related_name="results")
+    device = models.ForeignKey(
+        "NetworkDevice", on_delete=models.CASCADE, related_name="compliance_results"
+    )
+    backup = models.ForeignKey("Backup", on_delete=models.CASCADE, related_name="compliance_results")
+    # Checksum del respaldo evaluado: si no cambia, no se vuelve a evaluar
+    checksum = models.CharField(max_length=64)
+    passed = models.BooleanField(db_index=True)
+    # Líneas o secciones que incumplen: [{"section", "text"}]
+    details = models.JSONField(default=list, blank=True)
+    evaluatedAt = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("rule", "device")
+
+    def __str__(self):
+        return f"{self.rule.name} @ {self.device.hostname}: {'OK' if self.passed else 'FALLA'}"
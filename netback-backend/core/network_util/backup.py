@@ -1,12 +1,22 @@
 import hashlib
+import logging
+import time
 
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
 from django.utils import timezone
 from netmiko import ConnectHandler
 
-from core.models import Backup, BackupStatusTracker
+from core.models import Backup, BackupStatusTracker, NetworkDevice
 
+from .change_marker import marker_command, marker_digest, marker_unchanged, remember_marker
+from .normalization import backup_checksum
+from .resilience import backoff_delay, circuit_open_for, is_transient_error
+from .timeouts import adaptive_timeouts, record_timing
 from .vlan_parser import parse_vlan_brief
 
+logger = logging.getLogger(__name__)
+
 
 def section_config(config):
     """Divide la configuración en bloques estructurados basados en títulos de secciones."""
@@ -29,8 +39,81 @@ def section_config(config):
     return sections
 
 
-def backupDevice(device):
+def section_hashes(config):
+    """{título: hash} de cada sección. Como en la comparación, si un título se repite gana el último bloque."""
+    return {
+        title: hashlib.blake2b("\n".join(lines).encode(), digest_size=8).hexdigest()
+        for title, lines in section_config(config)
+    }
+
+
+def sections_by_title(config, titles):
+    """Líneas de las secciones pedidas, sin construir las demás (mismo criterio que section_config)."""
+    wanted = set(titles)
+    found = {}
+    current = None
+    for line in config.splitlines():
+        if not line.strip():
+            continue
+        if not line.startswith(" "):
+            current = line.strip()
+            if current in wanted:
+                # Un título repetido reemplaza al anterior, igual que el dict de la comparación
+                found[current] = []
+        if current in wanted:
+            found[current].append(line)
+    return found
+
+
+def get_section_hashes(backup):
+    """Hashes de secciones del respaldo. Los de respaldos anteriores a la columna se calculan y guardan aquí."""
+    if backup.sectionHashes is None:
+        backup.sectionHashes = section_hashes(backup.runningConfig)
+        Backup.objects.filter(pk=backup.pk).update(sectionHashes=backup.sectionHashes)
+    return backup.sectionHashes
+
+
+def latest_backups():
+    """Último respaldo de cada dispositivo, como queryset (una subconsulta, sin recorrer equipos)."""
+    newest = Backup.objects.filter(device=OuterRef("pk")).order_by("-backupTime").values("pk")[:1]
+    latest_ids = (
+        NetworkDevice.objects.annotate(latest=Subquery(newest))
+        .exclude(latest=None)
+        .values("latest")
+    )
+    return Backup.objects.filter(pk__in=latest_ids)
+
+
+def get_parsed_vlan(backup):
+    """VLANs parseadas del respaldo. Las de respaldos anteriores a la columna se calculan y guardan aquí."""
+    if backup.parsedVlan is not None:
+        return backup.parsedVlan
+    manufacturer = backup.device.manufacturer
+    parsed = parse_vlan_brief(backup.vlanBrief, manufacturer.name, manufacturer.netmiko_type)
+    if "error" not in parsed:
+        # Fabricante sin parser: no se guarda, así un plugin posterior puede resolverlo
+        Backup.objects.filter(pk=backup.pk).update(parsedVlan=parsed)
+        backup.parsedVlan = parsed
+    return parsed
+
+
+def mark_backup_error(device):
+    """Registra un intento fallido en el tracker del dispositivo."""
+    tracker, _ = BackupStatusTracker.objects.get_or_create(device=device)
+    tracker.success_count = 0
+    tracker.no_change_count = 0
+    tracker.error_count += 1
+    tracker.last_status = "error"
+    open_for = circuit_open_for(tracker.error_count)
+    if open_for:
+        tracker.circuit_open_until = timezone.now() + open_for
+    tracker.save()
+    return tracker
+
+
+def backupDevice(device, use_change_marker=True):
     commands = device.get_commands()
+    marker_cmd = marker_command(device) if use_change_marker else None
     results = {}
 
     connection = {
@@ -40,50 +123,105 @@ def backupDevice(device):
         "password": device.customPass or device.vaultCredential.get_plain_password(),
     }
 
+    # Timeouts aprendidos del historial del equipo (vacío = valores por defecto de Netmiko)
+    timeouts = adaptive_timeouts(device)
+    if "conn_timeout" in timeouts:
+        connection["conn_timeout"] = timeouts["conn_timeout"]
+    read = {"read_timeout": timeouts["read_timeout"]} if "read_timeout" in timeouts else {}
+
     # Obtener o crear el tracker
     tracker, _ = BackupStatusTracker.objects.get_or_create(device=device)
 
+    timed = False
+    attempt = 0
     try:
-        with ConnectHandler(**connection) as net_connect:
-            results["runningConfig"] = net_connect.send_command(
-                commands["runningConfig"]
-            )
-            results["vlanBrief"] = net_connect.send_command(commands["vlanBrief"])
-
-        parsed_vlan = parse_vlan_brief(results["vlanBrief"], device.manufacturer.name)
+        while True:
+            started = time.monotonic()
+            connect_seconds = command_seconds = None
+            digest = None
+            results.clear()
+            try:
+                with ConnectHandler(**connection) as net_connect:
+                    connected = time.monotonic()
+                    connect_seconds = connected - started
+                    if marker_cmd:
+                        digest = marker_digest(net_connect.send_command(marker_cmd, **read))
+                        if marker_unchanged(device, tracker, digest):
+                            break
+                    results["runningConfig"] = net_connect.send_command(
+                        commands["runningConfig"], **read
+                    )
+                    command_seconds = time.monotonic() - connected
+                    results["vlanBrief"] = net_connect.send_command(commands["vlanBrief"], **read)
+                break
+            except Exception as e:
+                # Reintentar dentro de la corrida solo los errores transitorios
+                if attempt >= settings.BACKUP_RETRY_ATTEMPTS or not is_transient_error(e):
+                    raise
+                delay = backoff_delay(attempt)
+                attempt += 1
+                logger.warning(
+                    f"🔁 {device.hostname}: {type(e).__name__} ({e}); reintento {attempt} en {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+        if not results:
+            # Marcador sin cambios: no se descargó nada. No se registra la duración
+            # para no sesgar a la baja los timeouts de la descarga completa.
+            tracker.success_count = 0
+            tracker.error_count = 0
+            tracker.no_change_count += 1
+            tracker.last_status = "unchanged"
+            tracker.circuit_open_until = None
+            tracker.save()
+            return {"success": True, "message": "No Changes (change marker). Backup not fetched."}
 
-        data_hash = f'{results["runningConfig"]}{results["vlanBrief"]}'
+        record_timing(device, True, connect_seconds, command_seconds, time.monotonic() - started)
+        timed = True
 
-        checksum = hashlib.sha256(data_hash.encode()).hexdigest()
+        # Checksum sobre el contenido canónico: las líneas volátiles no generan respaldos nuevos
+        checksum = backup_checksum(
+            results["runningConfig"], results["vlanBrief"], device.manufacturer.netmiko_type
+        )
 
         if Backup.objects.filter(device=device, checksum=checksum).exists():
             tracker.success_count = 0
             tracker.error_count = 0
             tracker.no_change_count += 1
             tracker.last_status = "unchanged"
+            tracker.circuit_open_until = None
+            if marker_cmd:
+                remember_marker(tracker, digest)
             tracker.save()
             return {"success": True, "message": "No Changes. Backup not created."}
 
+        # Se parsea una sola vez al ingerir; comparaciones y consultas leen parsedVlan
+        parsed_vlan = parse_vlan_brief(
+            results["vlanBrief"], device.manufacturer.name, device.manufacturer.netmiko_type
+        )
         backup = Backup.objects.create(
             device=device,
             backupTime=timezone.now(),
             runningConfig=results["runningConfig"],
             vlanBrief=results["vlanBrief"],
             checksum=checksum,
+            parsedVlan=None if "error" in parsed_vlan else parsed_vlan,
+            sectionHashes=section_hashes(results["runningConfig"]),
         )
 
         tracker.no_change_count = 0
         tracker.error_count = 0
         tracker.success_count += 1
         tracker.last_status = "success"
+        tracker.circuit_open_until = None
+        if marker_cmd:
+            remember_marker(tracker, digest)
         tracker.save()
 
         return {"success": True, "backupId": backup.id, "parsed_vlan": parsed_vlan}
 
     except Exception as e:
-        tracker.success_count = 0
-        tracker.no_change_count = 0
-        tracker.error_count += 1
-        tracker.last_status = "error"
-        tracker.save()
+        if not timed:
+            record_timing(device, False, connect_seconds, command_seconds, time.monotonic() - started)
+        mark_backup_error(device)
         return {"success": False, "error": str(e)}
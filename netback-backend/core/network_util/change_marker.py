@@ -0,0 +1,60 @@
+"""
+Vía rápida de detección de cambios.
+
+Si el fabricante define `get_change_marker` (p. ej. en Cisco
+`show running-config | include Last configuration change`, o un contador /
+hash de configuración que el equipo reporte) y BACKUP_CHANGE_MARKER está
+activo, el respaldo ejecuta primero ese comando barato. Si su salida coincide
+con la registrada en el tracker tras la última descarga completa, el equipo se
+marca `unchanged` sin transferir la configuración.
+
+La marca solo se acepta durante BACKUP_CHANGE_MARKER_MAX_AGE_HOURS desde la
+última descarga completa: pasado ese tiempo se vuelve a descargar todo, lo que
+acota el daño de un marcador que no refleje algún cambio (p. ej. VLANs en
+vlan.dat que no tocan la running-config).
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import Backup
+
+# Salidas típicas de un comando no soportado: nunca sirven como marcador
+_ERROR_HINTS = ("% invalid", "% unknown", "% incomplete", "unrecognized command", "error:")
+
+
+def marker_command(device):
+    """Comando marcador del fabricante, o None si la vía rápida no aplica."""
+    if not settings.BACKUP_CHANGE_MARKER:
+        return None
+    return (device.manufacturer.get_change_marker or "").strip() or None
+
+
+def marker_digest(output):
+    """sha256 de la salida del marcador, o None si la salida no es utilizable."""
+    text = (output or "").strip()
+    if not text:
+        return None
+    lowered = text.lower()
+    if any(hint in lowered for hint in _ERROR_HINTS):
+        return None
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def marker_unchanged(device, tracker, digest, at=None):
+    """True si el marcador coincide con el registrado y aún no caducó."""
+    if not digest or tracker.change_marker != digest or not tracker.change_marker_at:
+        return False
+    max_age = timedelta(hours=settings.BACKUP_CHANGE_MARKER_MAX_AGE_HOURS)
+    if (at or timezone.now()) - tracker.change_marker_at > max_age:
+        return False
+    # Sin un respaldo guardado no hay con qué quedarse
+    return Backup.objects.filter(device=device).exists()
+
+
+def remember_marker(tracker, digest):
+    """Guarda en el tracker el marcador verificado por una descarga completa (sin save)."""
+    tracker.change_marker = digest
+    tracker.change_marker_at = timezone.now() if digest else None
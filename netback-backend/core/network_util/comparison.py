@@ -3,18 +3,23 @@ from typing import Any, Dict
 
 from core.models import Backup, BackupDiff
 
-from .backup import section_config
+from .backup import get_parsed_vlan, get_section_hashes, sections_by_title
 from .vlan_parser import parse_vlan_brief
 
 
-def compare_vlan_briefs(old_vlan_brief, new_vlan_brief, manufacturer) -> Dict[str, Any]:
+def compare_vlan_briefs(old_vlan_brief, new_vlan_brief, manufacturer, netmiko_type=None) -> Dict[str, Any]:
 
-    old_parsed = parse_vlan_brief(old_vlan_brief, manufacturer)
-    new_parsed = parse_vlan_brief(new_vlan_brief, manufacturer)
+    old_parsed = parse_vlan_brief(old_vlan_brief, manufacturer, netmiko_type)
+    new_parsed = parse_vlan_brief(new_vlan_brief, manufacturer, netmiko_type)
 
     if not isinstance(old_parsed, dict) or not isinstance(new_parsed, dict):
         return {"error": f"Error en parsing VLANs para {manufacturer}"}
 
+    return compare_parsed_vlans(old_parsed, new_parsed)
+
+
+def compare_parsed_vlans(old_parsed, new_parsed) -> Dict[str, Any]:
+    """Puertos asignados/retirados por VLAN entre dos resultados ya parseados."""
     old_vlan_ports = old_parsed.get("ports_vlan", {})
     new_vlans = new_parsed.get("vlans", {})
     new_vlan_ports = new_parsed.get("ports_vlan", {})
@@ -34,75 +39,162 @@ def compare_vlan_briefs(old_vlan_brief, new_vlan_brief, manufacturer) -> Dict[st
     return {"vlans": new_vlans, "ports_vlan": ports_vlan}
 
 
-def generate_backup_diff(backupOld, backupNew):
-    old_config = backupOld.runningConfig
-    new_config = backupNew.runningConfig
-    old_vlan_brief = backupOld.vlanBrief
-    new_vlan_brief = backupNew.vlanBrief
-
-    manufacturer = backupOld.device.manufacturer.name
-    vlan_info = compare_vlan_briefs(old_vlan_brief, new_vlan_brief, manufacturer)
-    if "error" in vlan_info:
-        return {"success": False, "error": vlan_info["error"]}
-
-    old_sections = section_config(old_config)
-    new_sections = section_config(new_config)
+# Formato compacto de BackupDiff.hunks (versión 1). Cada sección es:
+#   ["+", título]            añadida: sus líneas están en el respaldo nuevo
+#   ["-", título]            eliminada: sus líneas están en el respaldo viejo
+#   ["~", título, tramos]    modificada; tramos del ndiff sobre las líneas de la sección:
+#       [" ", i, n] comunes (viejo), ["-", i, n] del viejo, ["+", j, n] del nuevo, ["?", texto] pista de ndiff
+# El formato legado (added/removed/modified con líneas "++ "/"-- ") se reconstruye con render_section_changes.
+HUNKS_VERSION = 1
 
-    added_sections, removed_sections, modified_sections = [], [], []
-    old_dict = {sec[0]: sec[1] for sec in old_sections}
-    new_dict = {sec[0]: sec[1] for sec in new_sections}
-    all_section_names = sorted(set(old_dict.keys()).union(set(new_dict.keys())))
 
-    for section in all_section_names:
+def _ndiff_runs(old_content, new_content):
+    runs = []
+    i = j = 0
+    for line in difflib.ndiff(old_content, new_content):
+        tag = line[0]
+        if tag == "?":
+            runs.append(["?", line[2:]])
+            continue
+        start = j if tag == "+" else i
+        last = runs[-1] if runs else None
+        if last and last[0] == tag and last[1] + last[2] == start:
+            last[2] += 1
+        else:
+            runs.append([tag, start, 1])
+        if tag in " -":
+            i += 1
+        if tag in " +":
+            j += 1
+    return runs
+
+
+def encode_section_changes(old_dict, new_dict, section_names):
+    """Secciones cambiadas entre dos {título: líneas}, en el formato compacto de hunks."""
+    entries = []
+    for section in sorted(section_names):
         old_content = old_dict.get(section, [])
         new_content = new_dict.get(section, [])
-
         if not old_content:
-            added_sections.append({section: ["++ " + line for line in new_content]})
-            continue
+            entries.append(["+", section])
+        elif not new_content:
+            entries.append(["-", section])
+        else:
+            runs = _ndiff_runs(old_content, new_content)
+            if any(run[0] in "+-" for run in runs):
+                entries.append(["~", section, runs])
+    return entries
+
+
+def render_section_changes(entries, old_dict, new_dict):
+    """Listas added/removed/modified del formato legado a partir de los hunks y las líneas de cada sección."""
+    added_sections, removed_sections, modified_sections = [], [], []
+    for entry in entries:
+        kind, section = entry[0], entry[1]
+        if kind == "+":
+            added_sections.append({section: ["++ " + line for line in new_dict.get(section, [])]})
+        elif kind == "-":
+            removed_sections.append({section: ["-- " + line for line in old_dict.get(section, [])]})
+        else:
+            old_content, new_content = old_dict.get(section, []), new_dict.get(section, [])
+            formatted_diff = []
+            for run in entry[2]:
+                tag = run[0]
+                if tag == "?":
+                    formatted_diff.append(run[1])
+                elif tag == "+":
+                    formatted_diff.extend("++ " + line for line in new_content[run[1]:run[1] + run[2]])
+                elif tag == "-":
+                    formatted_diff.extend("-- " + line for line in old_content[run[1]:run[1] + run[2]])
+                else:
+                    formatted_diff.extend(old_content[run[1]:run[1] + run[2]])
+            modified_sections.append({section: formatted_diff})
+    return added_sections, removed_sections, modified_sections
 
-        if not new_content:
-            removed_sections.append({section: ["-- " + line for line in old_content]})
-            continue
 
-        diff = list(difflib.ndiff(old_content, new_content))
-        formatted_diff = []
-        for line in diff:
-            if line.startswith("- "):
-                formatted_diff.append(f"-- {line[2:]}")
-            elif line.startswith("+ "):
-                formatted_diff.append(f"++ {line[2:]}")
-            else:
-                formatted_diff.append(line[2:])
-        if any(
-            line.startswith("--") or line.startswith("++") for line in formatted_diff
-        ):
-            modified_sections.append({section: formatted_diff})
+def section_changes(old_dict, new_dict, section_names):
+    """Secciones añadidas, eliminadas y modificadas (diff por líneas) entre dos {título: líneas}."""
+    return render_section_changes(encode_section_changes(old_dict, new_dict, section_names), old_dict, new_dict)
+
+
+def _structured(added, removed, modified, vlan_info):
+    return {"added": added, "removed": removed, "modified": modified, "vlanInfo": vlan_info}
+
+
+def changed_section_lines(backupOld, backupNew):
+    """({título: líneas} viejo, {título: líneas} nuevo, títulos) de las secciones cuyo hash cambió."""
+    old_hashes = get_section_hashes(backupOld)
+    new_hashes = get_section_hashes(backupNew)
+    changed = [
+        name for name in set(old_hashes) | set(new_hashes) if old_hashes.get(name) != new_hashes.get(name)
+    ]
+    old_dict = sections_by_title(backupOld.runningConfig, changed) if changed else {}
+    new_dict = sections_by_title(backupNew.runningConfig, changed) if changed else {}
+    return old_dict, new_dict, changed
+
+
+def diff_hunks(backupOld, backupNew):
+    """(hunks, {título: líneas} viejo, {título: líneas} nuevo) recorriendo solo las secciones cuyo hash cambió."""
+    old_dict, new_dict, changed = changed_section_lines(backupOld, backupNew)
+    return encode_section_changes(old_dict, new_dict, changed), old_dict, new_dict
+
+
+def render_hunks(entries, old_dict, new_dict, vlan_info):
+    """structured_changes en el formato legado a partir de hunks recién calculados."""
+    return _structured(*render_section_changes(entries, old_dict, new_dict), vlan_info)
+
+
+def render_backup_diff(backup_diff):
+    """structured_changes en el formato legado. Las filas anteriores a hunks devuelven lo guardado."""
+    hunks = backup_diff.hunks
+    if hunks is None:
+        return backup_diff.structured_changes
+    entries = hunks["sections"]
+    titles = {entry[1] for entry in entries}
+    old_dict = new_dict = {}
+    if any(entry[0] != "+" for entry in entries):
+        old_dict = sections_by_title(backup_diff.backupOld.runningConfig, titles)
+    if any(entry[0] != "-" for entry in entries):
+        new_dict = sections_by_title(backup_diff.backupNew.runningConfig, titles)
+    return _structured(*render_section_changes(entries, old_dict, new_dict), hunks["vlanInfo"])
+
+
+def cached_backup_diffs(backups):
+    """{(id viejo, id nuevo): BackupDiff} compactos ya guardados entre los respaldos dados, en una consulta."""
+    ids = [backup.pk for backup in backups]
+    diffs = BackupDiff.objects.filter(backupOld__in=ids, backupNew__in=ids, hunks__isnull=False).order_by("createdAt")
+    return {(diff.backupOld_id, diff.backupNew_id): diff for diff in diffs}
+
+
+def save_backup_diff(backupOld, backupNew, entries, vlan_info):
+    """Se guardan solo los tramos; el formato legado se reconstruye al leer (render_backup_diff)."""
+    return BackupDiff.objects.create(
+        device_id=backupOld.device_id,
+        backupOld=backupOld,
+        backupNew=backupNew,
+        hunks={"version": HUNKS_VERSION, "sections": entries, "vlanInfo": vlan_info},
+    )
+
+
+def generate_backup_diff(backupOld, backupNew):
+    # El par ya se comparó: se reutiliza el diff guardado en lugar de recalcularlo
+    cached = cached_backup_diffs([backupOld, backupNew]).get((backupOld.pk, backupNew.pk))
+    if cached is not None:
+        cached.backupOld, cached.backupNew = backupOld, backupNew
+        return {"success": True, "backupDiffId": str(cached.id), "changes": render_backup_diff(cached)}
+
+    # VLANs guardadas al ingerir cada respaldo: no se vuelve a parsear vlanBrief
+    vlan_info = compare_parsed_vlans(get_parsed_vlan(backupOld), get_parsed_vlan(backupNew))
+
+    # Solo se recorren las secciones cuyo hash cambió: el costo depende del cambio, no del tamaño
+    entries, old_dict, new_dict = diff_hunks(backupOld, backupNew)
 
     try:
-        backupDiff = BackupDiff.objects.create(
-            device=backupOld.device,
-            backupOld=backupOld,
-            backupNew=backupNew,
-            changes=str(
-                {
-                    "added": added_sections,
-                    "removed": removed_sections,
-                    "modified": modified_sections,
-                    "vlanInfo": vlan_info,
-                }
-            ),
-            structured_changes={
-                "added": added_sections,
-                "removed": removed_sections,
-                "modified": modified_sections,
-                "vlanInfo": vlan_info,
-            },
-        )
+        backupDiff = save_backup_diff(backupOld, backupNew, entries, vlan_info)
         return {
             "success": True,
             "backupDiffId": str(backupDiff.id),
-            "changes": backupDiff.structured_changes,
+            "changes": render_hunks(entries, old_dict, new_dict, vlan_info),
         }
     except Exception as e:
         return {"success": False, "error": f"Error al crear BackupDiff: {str(e)}"}
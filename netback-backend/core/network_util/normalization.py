@@ -0,0 +1,111 @@
+"""
+Normalización de configuraciones antes de calcular el checksum de respaldo.
+
+Muchas salidas incluyen líneas que cambian sin que cambie la configuración
+(marcas de tiempo de "Last configuration change", `ntp clock-period`, la
+cabecera con la fecha de exportación de RouterOS...). Si entran en el hash,
+cada respaldo parece nuevo. Aquí se eliminan esas líneas con filtros por
+fabricante (clave = `Manufacturer.netmiko_type`) y se unifican finales de
+línea y espacios finales. El contenido guardado no se toca: solo el checksum
+se calcula sobre la forma canónica.
+
+Los filtros propios se añaden con BACKUP_VOLATILE_PATTERNS, un JSON
+`{"netmiko_type" | "*": ["regex", ...]}`. Cada expresión se aplica a líneas
+completas y cada conjunto se compila una sola vez por proceso.
+"""
+import hashlib
+import logging
+import re
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_CISCO_IOS = [
+    r"! Last configuration change at .*",
+    r"! NVRAM config last updated at .*",
+    r"! No configuration change since last restart.*",
+    r"ntp clock-period \d+",
+    r"Building configuration\.\.\.",
+    r"Current configuration ?: ?\d+ bytes",
+]
+
+VOLATILE_PATTERNS = {
+    "cisco_ios": _CISCO_IOS,
+    "cisco_xe": _CISCO_IOS,
+    "cisco_xr": [
+        r"!! Last configuration change at .*",
+        r"Building configuration\.\.\.",
+        # Primera línea de cada comando en IOS-XR: "Mon Jan  6 10:00:00.123 UTC"
+        r"(Mon|Tue|Wed|Thu|Fri|Sat|Sun) \w{3} +\d+ \d\d:\d\d:\d\d(\.\d+)? \S+",
+    ],
+    "cisco_nxos": [
+        r"!Time: .*",
+        r"!Running configuration last done at: .*",
+    ],
+    "cisco_asa": [
+        r": Written by .* at .*",
+        r"ntp clock-period \d+",
+    ],
+    "huawei": [
+        r"!Last configuration was updated at .*",
+        r"!Last configuration was saved at .*",
+    ],
+    "juniper": [
+        r"## Last commit: .*",
+        r"## Last changed: .*",
+    ],
+    "mikrotik_routeros": [
+        r"# .*\d\d:\d\d:\d\d by RouterOS .*",
+    ],
+}
+
+
+def _patterns_for(vendor):
+    if vendor in VOLATILE_PATTERNS:
+        return list(VOLATILE_PATTERNS[vendor])
+    # Fabricante desconocido o autodetect: todos los filtros (son líneas de comentario muy concretas)
+    return [p for patterns in VOLATILE_PATTERNS.values() for p in patterns]
+
+
+@lru_cache(maxsize=None)
+def _compile(vendor, extra):
+    valid = []
+    for pattern in dict.fromkeys(_patterns_for(vendor) + list(extra)):
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            logger.error(f"❌ Patrón volátil inválido {pattern!r} ignorado: {e}")
+            continue
+        valid.append(pattern)
+    if not valid:
+        return None
+    return re.compile(r"^[ \t]*(?:" + "|".join(f"(?:{p})" for p in valid) + r")[ \t]*$\n?", re.MULTILINE)
+
+
+def get_filter(vendor):
+    """Expresión compilada que elimina las líneas volátiles del fabricante (o None)."""
+    extra = settings.BACKUP_VOLATILE_PATTERNS or {}
+    patterns = tuple(extra.get("*", [])) + tuple(extra.get(vendor or "", []))
+    return _compile(vendor or "", patterns)
+
+
+def _canonical_whitespace(text):
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip("\n")
+
+
+def normalize_config(text, vendor=None):
+    """Forma canónica: sin líneas volátiles, finales LF y sin espacios finales."""
+    text = _canonical_whitespace(text)
+    volatile = get_filter(vendor)
+    if volatile is not None:
+        text = volatile.sub("", text)
+    return text.strip("\n")
+
+
+def backup_checksum(running_config, vlan_brief, vendor=None):
+    """sha256 de deduplicación sobre la configuración normalizada y la tabla de VLANs."""
+    canonical = f"{normalize_config(running_config, vendor)}{_canonical_whitespace(vlan_brief)}"
+    return hashlib.sha256(canonical.encode()).hexdigest()
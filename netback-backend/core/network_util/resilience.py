@@ -0,0 +1,59 @@
+"""
+Reintentos y circuit breaker para los respaldos.
+
+- Dentro de una corrida, los errores transitorios (timeouts, conexiones
+  reiniciadas, banner SSH ilegible) se reintentan hasta BACKUP_RETRY_ATTEMPTS
+  veces con backoff exponencial y jitter completo. Los errores de
+  autenticación o de comando no se reintentan.
+- Entre corridas, un equipo con BACKUP_CIRCUIT_THRESHOLD errores seguidos
+  abre su circuito: el respaldo automático lo omite hasta `circuit_open_until`,
+  y cada nuevo fallo al sondearlo duplica la espera (hasta un máximo). Un
+  éxito, también manual, cierra el circuito.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from netmiko.exceptions import (AuthenticationException, NetmikoTimeoutException,
+                                ReadTimeout, SSHException)
+
+TRANSIENT_ERRORS = (
+    NetmikoTimeoutException,
+    ReadTimeout,
+    TimeoutError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+    EOFError,
+)
+
+
+def is_transient_error(exc) -> bool:
+    if isinstance(exc, AuthenticationException):
+        return False
+    # SSHException genérica: banner ilegible, canal cerrado, negociación interrumpida
+    return isinstance(exc, TRANSIENT_ERRORS) or type(exc) is SSHException
+
+
+def backoff_delay(attempt: int) -> float:
+    """Espera antes del reintento `attempt` (0, 1, ...): jitter completo sobre base * 2^attempt."""
+    cap = min(settings.BACKUP_RETRY_MAX_DELAY, settings.BACKUP_RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def circuit_open_for(error_count: int):
+    """Tiempo que el circuito queda abierto tras `error_count` errores seguidos, o None."""
+    threshold = settings.BACKUP_CIRCUIT_THRESHOLD
+    if not threshold or error_count < threshold:
+        return None
+    hours = settings.BACKUP_CIRCUIT_BASE_HOURS * (2 ** (error_count - threshold))
+    return timedelta(hours=min(hours, settings.BACKUP_CIRCUIT_MAX_HOURS))
+
+
+def circuit_is_open(device, at) -> bool:
+    """True si el respaldo automático debe omitir el dispositivo en el instante `at`."""
+    try:
+        tracker = device.backup_tracker
+    except device._meta.model.backup_tracker.RelatedObjectDoesNotExist:
+        return False
+    return bool(tracker.circuit_open_until and tracker.circuit_open_until > at)
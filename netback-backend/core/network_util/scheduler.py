@@ -0,0 +1,134 @@
+"""
+Planificador de respaldos: prioridad, equidad por sitio y orden por duración.
+
+- Clases de prioridad: el índice del DeviceType o del área/sitio en
+  BACKUP_PRIORITY_DEVICE_TYPES / BACKUP_PRIORITY_AREAS (0 = primero); los
+  dispositivos que no aparecen van al final.
+- Dentro de cada clase, los más lentos primero (duración media de BackupTiming):
+  el trabajo largo arranca temprano y la corrida termina antes (LPT).
+- Como máximo BACKUP_SITE_CONCURRENCY respaldos simultáneos por sitio, para
+  que un sitio lento no acapare todos los workers; un worker libre toma el
+  siguiente dispositivo de otro sitio en lugar de esperar.
+"""
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from django.db import connections
+from django.db.models import Avg
+
+from core.models import BackupTiming
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BackupJob:
+    device: object
+    priority: int
+    expected_seconds: float
+    site_id: object
+
+
+def _class_index(names, candidates):
+    """Menor índice de `candidates` (sin mayúsculas) dentro de `names`, o None."""
+    lowered = [n.lower() for n in names]
+    found = [lowered.index(c.lower()) for c in candidates if c and c.lower() in lowered]
+    return min(found) if found else None
+
+
+def device_priority(device, device_types, areas):
+    area = device.area
+    candidates = [area.name, area.site.name] if area else []
+    indexes = [
+        i for i in (
+            _class_index(device_types, [device.deviceType.name]),
+            _class_index(areas, candidates),
+        ) if i is not None
+    ]
+    return min(indexes) if indexes else len(device_types) + len(areas)
+
+
+def expected_durations(devices):
+    """Duración media de los respaldos exitosos guardados, por id de dispositivo."""
+    rows = (
+        BackupTiming.objects.filter(device__in=[d.id for d in devices], success=True)
+        .values("device_id")
+        .annotate(avg=Avg("totalSeconds"))
+    )
+    return {row["device_id"]: row["avg"] for row in rows}
+
+
+def plan_backups(devices, device_types=(), areas=()):
+    """Ordena los dispositivos: prioridad ascendente y, dentro de ella, más lentos primero."""
+    durations = expected_durations(devices)
+    # Sin historial se asume la media conocida: ni se adelanta ni se relega
+    default = sum(durations.values()) / len(durations) if durations else 0.0
+
+    jobs = [
+        BackupJob(
+            device=device,
+            priority=device_priority(device, device_types, areas),
+            expected_seconds=durations.get(device.id, default),
+            site_id=device.area.site_id if device.area else None,
+        )
+        for device in devices
+    ]
+    jobs.sort(key=lambda job: (job.priority, -job.expected_seconds))
+    return jobs
+
+
+class BackupScheduler:
+    """Reparte los trabajos planificados entre `workers` hilos respetando el tope por sitio."""
+
+    def __init__(self, jobs, workers=10, site_cap=0):
+        self.pending = list(jobs)
+        self.workers = max(1, min(workers, len(self.pending) or 1))
+        self.site_cap = site_cap
+        self._running = Counter()
+        self._cond = threading.Condition()
+
+    def _allowed(self, job):
+        return not self.site_cap or job.site_id is None or self._running[job.site_id] < self.site_cap
+
+    def _next_job(self):
+        with self._cond:
+            while self.pending:
+                for index, job in enumerate(self.pending):
+                    if self._allowed(job):
+                        self._running[job.site_id] += 1
+                        return self.pending.pop(index)
+                # Todos los pendientes están en sitios al tope: esperar a que termine uno
+                self._cond.wait()
+            return None
+
+    def _finish(self, job):
+        with self._cond:
+            self._running[job.site_id] -= 1
+            self._cond.notify_all()
+
+    def run(self, fn):
+        """Ejecuta fn(device) para cada trabajo y espera a que terminen todos."""
+
+        def worker():
+            try:
+                while True:
+                    job = self._next_job()
+                    if job is None:
+                        return
+                    try:
+                        fn(job.device)
+                    except Exception:
+                        logger.exception(f"❌ Error no controlado respaldando {job.device}")
+                    finally:
+                        self._finish(job)
+            finally:
+                # Conexiones abiertas por este hilo
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,88 @@
+"""
+Línea de tiempo de cambios de un dispositivo sobre un rango de respaldos.
+
+Se recorren una sola vez los deltas consecutivos (v0→v1, v1→v2, ...). Cada delta
+sale del BackupDiff compacto ya guardado para ese par o, si no existe, se
+calcula por hashes de sección y se guarda para las siguientes consultas. Por
+sección y por línea se acumulan los eventos (añadida / eliminada) y, al final,
+en qué versión se vio por primera y por última vez.
+"""
+from .backup import get_parsed_vlan, sections_by_title
+from .comparison import cached_backup_diffs, compare_parsed_vlans, diff_hunks, save_backup_diff
+
+
+def _delta_entries(old, new, cached):
+    diff = cached.get((old.pk, new.pk))
+    if diff is None:
+        entries, old_dict, new_dict = diff_hunks(old, new)
+        vlan_info = compare_parsed_vlans(get_parsed_vlan(old), get_parsed_vlan(new))
+        save_backup_diff(old, new, entries, vlan_info)
+        return entries, old_dict, new_dict
+    entries = diff.hunks["sections"]
+    titles = {entry[1] for entry in entries}
+    old_dict = sections_by_title(old.runningConfig, titles) if titles else {}
+    new_dict = sections_by_title(new.runningConfig, titles) if titles else {}
+    return entries, old_dict, new_dict
+
+
+def _line_events(entry, old_dict, new_dict):
+    """(texto, cambio) de cada línea añadida o eliminada por una entrada de hunks."""
+    kind, section = entry[0], entry[1]
+    if kind == "+":
+        return [(line, "added") for line in new_dict.get(section, [])]
+    if kind == "-":
+        return [(line, "removed") for line in old_dict.get(section, [])]
+    events = []
+    for run in entry[2]:
+        if run[0] == "+":
+            events.extend((line, "added") for line in new_dict[section][run[1]:run[1] + run[2]])
+        elif run[0] == "-":
+            events.extend((line, "removed") for line in old_dict[section][run[1]:run[1] + run[2]])
+    return events
+
+
+def _seen(events, last_version):
+    """Primera/última versión en que la línea existe. Si el primer evento es una baja, ya estaba en v0."""
+    first = events[0]["version"] if events[0]["change"] == "added" else 0
+    present = events[-1]["change"] == "added"
+    last = last_version if present else events[-1]["version"] - 1
+    return first, last, present
+
+
+def build_timeline(backups):
+    """
+    `backups`: respaldos de un mismo equipo en orden cronológico. Devuelve
+    {"versions": [...], "sections": [...]} con los índices de versión de cada evento.
+    """
+    backups = list(backups)
+    cached = cached_backup_diffs(backups)
+    versions = [
+        {"index": 0, "backupId": str(backups[0].id), "backupTime": backups[0].backupTime, "added": 0, "removed": 0}
+    ] if backups else []
+    sections = {}
+
+    for index in range(1, len(backups)):
+        old, new = backups[index - 1], backups[index]
+        version = {"index": index, "backupId": str(new.id), "backupTime": new.backupTime, "added": 0, "removed": 0}
+        entries, old_dict, new_dict = _delta_entries(old, new, cached)
+        for entry in entries:
+            title = entry[1]
+            section = sections.setdefault(title, {"section": title, "events": [], "lines": {}})
+            change = {"+": "added", "-": "removed"}.get(entry[0], "modified")
+            section["events"].append({"version": index, "change": change})
+            for text, line_change in _line_events(entry, old_dict, new_dict):
+                version[line_change] += 1
+                section["lines"].setdefault(text, []).append({"version": index, "change": line_change})
+        versions.append(version)
+
+    last_version = len(backups) - 1
+    result = []
+    for title in sorted(sections):
+        section = sections[title]
+        lines = []
+        for text, events in section["lines"].items():
+            first, last, present = _seen(events, last_version)
+            lines.append({"text": text, "firstSeen": first, "lastSeen": last, "present": present, "events": events})
+        lines.sort(key=lambda line: line["events"][0]["version"])
+        result.append({"section": title, "events": section["events"], "lines": lines})
+    return {"versions": versions, "sections": result}
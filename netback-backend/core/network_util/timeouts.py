@@ -0,0 +1,81 @@
+"""
+Timeouts de Netmiko por dispositivo a partir de su historial de duraciones.
+
+Cada respaldo guarda en BackupTiming cuánto tardó la conexión y el comando de
+configuración. Con suficientes muestras exitosas recientes se usa el percentil
+configurado multiplicado por un margen, acotado entre un mínimo y un máximo:
+los equipos lentos reciben más tiempo y los rápidos fallan antes cuando están caídos.
+Sin historial se usan los valores por defecto de Netmiko.
+"""
+import math
+
+from django.conf import settings
+
+from core.models import BackupTiming
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano (values no vacío)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _bounded(value, lower, upper):
+    return round(min(max(value, lower), upper), 1)
+
+
+def adaptive_timeouts(device) -> dict:
+    """
+    Devuelve {"conn_timeout", "read_timeout"} para Netmiko, o {} si el dispositivo
+    no tiene suficientes respaldos exitosos entre las últimas BACKUP_TIMING_WINDOW muestras.
+    """
+    recent = list(
+        BackupTiming.objects.filter(device=device)
+        .order_by("-createdAt", "-id")
+        .values_list("success", "connectSeconds", "commandSeconds")[: settings.BACKUP_TIMING_WINDOW]
+    )
+    samples = [(c, cmd) for ok, c, cmd in recent if ok]
+    if len(samples) < settings.BACKUP_TIMING_MIN_SAMPLES:
+        return {}
+
+    pct = settings.BACKUP_TIMEOUT_PERCENTILE
+    factor = settings.BACKUP_TIMEOUT_FACTOR
+    timeouts = {}
+
+    connect = [c for c, _ in samples if c is not None]
+    command = [c for _, c in samples if c is not None]
+    if not recent[0][0]:
+        # Tras un fallo se dan los máximos de conexión y lectura: si el equipo se volvió más
+        # lento que su percentil, nunca volvería a registrar un éxito con el que reajustarse
+        timeouts["conn_timeout"] = settings.BACKUP_CONN_TIMEOUT_RANGE[1]
+        timeouts["read_timeout"] = settings.BACKUP_READ_TIMEOUT_RANGE[1]
+        return timeouts
+
+    if connect:
+        timeouts["conn_timeout"] = _bounded(
+            percentile(connect, pct) * factor, *settings.BACKUP_CONN_TIMEOUT_RANGE
+        )
+    if command:
+        timeouts["read_timeout"] = _bounded(
+            percentile(command, pct) * factor, *settings.BACKUP_READ_TIMEOUT_RANGE
+        )
+    return timeouts
+
+
+def record_timing(device, success, connect_seconds, command_seconds, total_seconds):
+    """Guarda un intento y conserva solo las últimas BACKUP_TIMING_HISTORY muestras."""
+    BackupTiming.objects.create(
+        device=device,
+        success=success,
+        connectSeconds=connect_seconds,
+        commandSeconds=command_seconds,
+        totalSeconds=total_seconds,
+    )
+    stale = list(
+        BackupTiming.objects.filter(device=device)
+        .order_by("-createdAt", "-id")
+        .values_list("id", flat=True)[settings.BACKUP_TIMING_HISTORY:]
+    )
+    if stale:
+        BackupTiming.objects.filter(id__in=stale).delete()
@@ -1,61 +1,147 @@
-import re
+"""
+Parsing de la salida de VLANs de cada fabricante.
+
+Los parsers se registran por `Manufacturer.netmiko_type` con el decorador
+`register_vlan_parser`; los nombres de fabricante que usaba la versión
+anterior ("Cisco", "Huawei", "HP"...) siguen resolviéndose como alias.
+Todas las expresiones se compilan una vez al importar el módulo.
+
+Plugins: cualquier módulo listado en VLAN_PARSER_PLUGINS se importa la primera
+vez que se busca un parser, y puede registrar los suyos:
+
+    from core.network_util.vlan_parser import register_vlan_parser
+
+    @register_vlan_parser("fortinet", names=["Fortinet"])
+    def parse_vlan_fortinet(vlan_brief):
+        return {"vlans": {...}, "ports_vlan": {...}}
+
+Cada parser devuelve `{"vlans": {id: nombre}, "ports_vlan": {id: [puertos]}}`
+con los ids de VLAN como texto.
+"""
 import json
+import logging
 import os
+import re
+import threading
+from importlib import import_module
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_PARSERS = {}  # netmiko_type -> función
+_ALIASES = {}  # nombre de fabricante en minúsculas -> función
+_plugins_loaded = False
+_plugins_lock = threading.Lock()
+
+
+def register_vlan_parser(*netmiko_types, names=()):
+    """Registra una función `parser(vlan_brief) -> dict` para los tipos y alias dados."""
+
+    def decorator(func):
+        for netmiko_type in netmiko_types:
+            _PARSERS[netmiko_type] = func
+        for name in names:
+            _ALIASES[name.lower()] = func
+        return func
+
+    return decorator
+
+
+def _load_plugins():
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    with _plugins_lock:
+        if _plugins_loaded:
+            return
+        for module in getattr(settings, "VLAN_PARSER_PLUGINS", []):
+            try:
+                import_module(module)
+            except ImportError:
+                logger.exception(f"❌ No se pudo cargar el plugin de VLANs {module}")
+        _plugins_loaded = True
+
+
+def get_vlan_parser(manufacturer, netmiko_type=None):
+    """Parser para el tipo Netmiko o, si no hay, para el nombre del fabricante."""
+    _load_plugins()
+    if netmiko_type and netmiko_type in _PARSERS:
+        return _PARSERS[netmiko_type]
+    return _ALIASES.get((manufacturer or "").lower())
 
 
 # 📌 Parsing de VLANs
-def parse_vlan_brief(vlan_brief, manufacturer):
+def parse_vlan_brief(vlan_brief, manufacturer, netmiko_type=None):
     """
-    Parsea la información de VLANs basada en el fabricante.
+    Parsea la información de VLANs basada en el tipo Netmiko o el fabricante.
     """
-    if manufacturer == "Cisco":
-        return parse_vlan_cisco(vlan_brief)
-    elif manufacturer == "Huawei":
-        return parse_vlan_huawei(vlan_brief)
-    elif manufacturer in ["HP", "Dell", "Extreme", "Arista"]:
-        return parse_vlan_generic(vlan_brief)
-    else:
+    parser = get_vlan_parser(manufacturer, netmiko_type)
+    if parser is None:
         return {
             "vlans": {},
             "ports_vlan": {},
-            "error": f"Parsing no soportado para {manufacturer}",
+            "error": f"Parsing no soportado para {netmiko_type or manufacturer}",
         }
+    return parser(vlan_brief or "")
 
 
 # 📌 Parsing para Cisco (show vlan brief)
+_CISCO_ROW = re.compile(r"^(\d+)\s+(\S+)\s+(active)(?:\s+(.*))?$")
+_CISCO_CONTINUATION = re.compile(r"^\s+(\S.*)$")
+
+
+def _cisco_ports(text):
+    return [port.strip() for port in text.replace("+", "").split(",") if port.strip()]
+
+
+@register_vlan_parser(
+    "cisco_ios", "cisco_xe", "cisco_nxos", "cisco_xr", "cisco_asa", names=["Cisco"]
+)
 def parse_vlan_cisco(vlan_brief):
     vlan_dict = {}
     vlan_names = {}
     current_vlan = None
 
-    for line in vlan_brief.splitlines():
-        line = line.strip()
-
-        if (
-            not line
-            or line.startswith("VLAN")
-            or line.startswith("----")
-            or "act/unsup" in line
-        ):
-            continue
-
-        match = re.match(r"^(\d+)\s+(\S+)\s+(active)\s+(.+)?", line)
+    for raw in vlan_brief.splitlines():
+        line = raw.rstrip()
+        match = _CISCO_ROW.match(line)
         if match:
-            vlan_id, vlan_name, status, interfaces = match.groups()
+            vlan_id, vlan_name, _, interfaces = match.groups()
             vlan_names[vlan_id] = vlan_name
-            vlan_dict[vlan_id] = (
-                interfaces.replace("+", "").strip().split(", ") if interfaces else []
-            )
+            vlan_dict[vlan_id] = _cisco_ports(interfaces or "")
             current_vlan = vlan_id
             continue
 
-        if current_vlan and re.match(r"^\s+Gi\d+/\d+/\d+", line):
-            vlan_dict[current_vlan].extend(line.replace("+", "").strip().split(", "))
+        # Puertos que no caben en la fila continúan en líneas sangradas
+        match = _CISCO_CONTINUATION.match(line)
+        if current_vlan and match:
+            vlan_dict[current_vlan].extend(_cisco_ports(match.group(1)))
+            continue
+
+        # Cabeceras, separadores, VLANs act/unsup o el prompt cierran la fila actual
+        current_vlan = None
 
     return {"vlans": vlan_names, "ports_vlan": vlan_dict}
 
 
-# 📌 Parsing para Huawei (display vlan) - VERSIÓN MEJORADA
+# 📌 Parsing para Huawei (display vlan)
+_HUAWEI_PORTS_HEADER = re.compile(r"^VID\s+Type\s+Ports")
+_HUAWEI_DESCRIPTION_HEADER = re.compile(r"^VID\s+Status\s+Property")
+_HUAWEI_PORTS_ROW = re.compile(r"^\s*\*?(\d+)\s+\S+\s+(.*)$")
+_HUAWEI_DESCRIPTION_ROW = re.compile(r"^\s*(\d+)\s+\S+\s+\S+\s+\S+\s+\S+\s+(.*?)\s*$")
+
+
+def _huawei_port(port):
+    """Quita el modo y el estado del puerto: UT:XGE0/0/1(U) -> XGE0/0/1."""
+    if port[:3] in ("UT:", "TG:"):
+        port = port[3:]
+    if port[-3:] in ("(U)", "(D)"):
+        port = port[:-3]
+    return port
+
+
+@register_vlan_parser("huawei", names=["Huawei"])
 def parse_vlan_huawei(vlan_brief):
     """
     Parsea la salida de 'display vlan' de Huawei que presenta la información
@@ -63,68 +149,192 @@ def parse_vlan_huawei(vlan_brief):
     """
     ports_by_vlan = {}
     names_by_vlan = {}
-    lines = vlan_brief.splitlines()
-
-    in_ports_table = False
-    in_description_table = False
+    table = None
     current_vlan_id = None
 
-    for line in lines:
-        if "VID  Type    Ports" in line:
-            in_ports_table = True
-            in_description_table = False
+    for line in vlan_brief.splitlines():
+        if _HUAWEI_PORTS_HEADER.match(line):
+            table = "ports"
             continue
-        if "VID  Status  Property" in line:
-            in_ports_table = False
-            in_description_table = True
+        if _HUAWEI_DESCRIPTION_HEADER.match(line):
+            table = "description"
             continue
 
-        if in_ports_table:
-            match = re.match(r"^\s*(\*?\d+)\s+\w+\s+(.*)", line)
+        if table == "ports":
+            match = _HUAWEI_PORTS_ROW.match(line)
             if match:
                 current_vlan_id, ports_str = match.groups()
-                current_vlan_id = current_vlan_id.replace('*', '')
-                ports_by_vlan[current_vlan_id] = ports_str.strip().split()
+                ports_by_vlan[current_vlan_id] = ports_str.split()
             elif current_vlan_id and line.startswith("                "):
-                ports_by_vlan.setdefault(current_vlan_id, []).extend(line.strip().split())
+                ports_by_vlan[current_vlan_id].extend(line.split())
+            elif not line.strip():
+                current_vlan_id = None
 
-        if in_description_table:
-            match = re.match(r"^\s*(\d+)\s+.*\s+(\S+)$", line)
+        elif table == "description":
+            match = _HUAWEI_DESCRIPTION_ROW.match(line)
             if match:
                 vlan_id, description = match.groups()
-                names_by_vlan[vlan_id] = description
-
-    cleaned_ports = {}
-    for vlan_id, ports in ports_by_vlan.items():
-        cleaned_list = [re.sub(r"^(UT:|TG:)", "", port).strip() for port in ports]
-        cleaned_list = [re.sub(r"\([UD]\)$", "", port).strip() for port in cleaned_list]
-        cleaned_ports[vlan_id] = cleaned_list
+                if description:
+                    names_by_vlan[vlan_id] = description
 
-    final_vlans = {}
-    for vlan_id in cleaned_ports:
-        final_vlans[vlan_id] = names_by_vlan.get(vlan_id, f"VLAN_{vlan_id}")
+    cleaned_ports = {
+        vlan_id: [_huawei_port(port) for port in ports]
+        for vlan_id, ports in ports_by_vlan.items()
+    }
+    final_vlans = {vlan_id: names_by_vlan.get(vlan_id, f"VLAN_{vlan_id}") for vlan_id in cleaned_ports}
 
     return {"vlans": final_vlans, "ports_vlan": cleaned_ports}
 
 
+# 📌 Parsing para Juniper (show vlans, con y sin ELS)
+_JUNIPER_PORT = re.compile(r"[a-z]{2,}-\d+/\d+/\d+(?:\.\d+)?|ae\d+(?:\.\d+)?|irb(?:\.\d+)?", re.IGNORECASE)
+_JUNIPER_ELS_ROW = re.compile(r"^(\S+)\s+(\S+)\s+(\d+|NA)\s*(.*)$")
+_JUNIPER_LEGACY_ROW = re.compile(r"^(\S+)\s+(\d+)?\s*(.*)$")
+
+
+def _juniper_ports(text):
+    return _JUNIPER_PORT.findall(text)
+
+
+@register_vlan_parser("juniper", "juniper_junos", names=["Juniper"])
+def parse_vlan_juniper(vlan_brief):
+    vlan_names = {}
+    vlan_dict = {}
+    current_vlan = None
+    els = None
+
+    for line in vlan_brief.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith(("{", "Routing instance", "Name ", "Name\t")):
+            if stripped.startswith("Routing instance"):
+                els = True
+            elif stripped.startswith("Name"):
+                els = False
+            continue
+        if els is None:
+            continue
+
+        if not line[0].isspace():
+            match = (_JUNIPER_ELS_ROW if els else _JUNIPER_LEGACY_ROW).match(stripped)
+            current_vlan = None
+            if not match:
+                continue
+            if els:
+                _, name, tag, rest = match.groups()
+            else:
+                name, tag, rest = match.groups()
+            # Sin tag (p. ej. "default" en equipos sin ELS) no hay id con el que indexar
+            if not tag or tag == "NA":
+                continue
+            vlan_names[tag] = name
+            vlan_dict[tag] = _juniper_ports(rest)
+            current_vlan = tag
+        elif current_vlan:
+            vlan_dict[current_vlan].extend(_juniper_ports(stripped))
+
+    return {"vlans": vlan_names, "ports_vlan": vlan_dict}
+
+
+# 📌 Parsing para MikroTik (/interface bridge vlan print, tabla o terse)
+_MIKROTIK_TERSE_FIELD = re.compile(r'([\w-]+)=("[^"]*"|\S*)')
+_MIKROTIK_TERSE_FLAGS = re.compile(r"^\s*\d+\s+([A-Z]*)\s")
+_MIKROTIK_HEADER = re.compile(r"\bVLAN-IDS\b")
+_MIKROTIK_COLUMN = re.compile(r"\S+")
+_MIKROTIK_MAX_RANGE = 4094
+
+
+def _mikrotik_vlan_ids(text):
+    ids = []
+    for part in text.replace(" ", ",").split(","):
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        if not start.isdigit():
+            continue
+        if end.isdigit() and 0 < int(end) - int(start) < _MIKROTIK_MAX_RANGE:
+            ids.extend(str(i) for i in range(int(start), int(end) + 1))
+        else:
+            ids.append(start)
+    return ids
+
+
+def _mikrotik_add(vlan_dict, vlan_ids, ports):
+    for vlan_id in vlan_ids:
+        current = vlan_dict.setdefault(vlan_id, [])
+        current.extend(p for p in ports if p and p not in current)
+
+
+@register_vlan_parser("mikrotik_routeros", names=["MikroTik", "Mikrotik"])
+def parse_vlan_mikrotik(vlan_brief):
+    vlan_dict = {}
+    columns = None
+    row_ids, row_ports = [], []
+    disabled = False
+
+    for line in vlan_brief.splitlines():
+        if "vlan-ids=" in line:
+            flags = _MIKROTIK_TERSE_FLAGS.match(line)
+            if flags and "X" in flags.group(1):
+                continue  # Entrada deshabilitada
+            fields = {key: value.strip('"') for key, value in _MIKROTIK_TERSE_FIELD.findall(line)}
+            ports = []
+            for key in ("current-tagged", "current-untagged"):
+                ports.extend(fields.get(key, "").split(","))
+            if not any(ports):
+                ports = fields.get("tagged", "").split(",") + fields.get("untagged", "").split(",")
+            _mikrotik_add(vlan_dict, _mikrotik_vlan_ids(fields["vlan-ids"]), ports)
+            continue
+
+        if _MIKROTIK_HEADER.search(line) and not line.lstrip().startswith("Columns"):
+            columns = [(m.group(), m.start()) for m in _MIKROTIK_COLUMN.finditer(line)]
+            continue
+        if not columns or not line.strip():
+            continue
+
+        # Cada columna va desde su cabecera hasta la siguiente
+        cells = {}
+        for index, (name, start) in enumerate(columns):
+            end = columns[index + 1][1] if index + 1 < len(columns) else None
+            cells[name] = line[start if index else 0:end].strip()
+
+        if cells.get("#") and cells["#"].split()[0].isdigit():
+            row_ids, row_ports = [], []
+            disabled = "X" in "".join(cells["#"].split()[1:])
+        if disabled:
+            continue
+        # Las listas de VLANs y de puertos largas continúan en las líneas siguientes
+        row_ids += _mikrotik_vlan_ids(cells.get("VLAN-IDS", ""))
+        for name in ("CURRENT-TAGGED", "CURRENT-UNTAGGED", "TAGGED", "UNTAGGED"):
+            row_ports += cells.get(name, "").split(",")
+        _mikrotik_add(vlan_dict, row_ids, row_ports)
+
+    # RouterOS no asigna nombre a las VLANs del bridge
+    vlan_names = {vlan_id: f"VLAN_{vlan_id}" for vlan_id in vlan_dict}
+    return {"vlans": vlan_names, "ports_vlan": vlan_dict}
+
+
 # 📌 Parsing genérico para HP, Dell, Extreme y Arista
+_GENERIC_ROW = re.compile(r"^(\d+)\s+(\S+)")
+_GENERIC_CONTINUATION = re.compile(r"^\s+(eth\d+/\d+)")
+
+
+@register_vlan_parser("hp_procurve", "arista_eos", names=["HP", "Dell", "Extreme", "Arista"])
 def parse_vlan_generic(vlan_brief):
     vlan_dict = {}
     vlan_names = {}
-    lines = vlan_brief.splitlines()
     current_vlan = None
 
-    for line in lines:
-        line = line.strip()
-        match = re.match(r"^(\d+)\s+(\S+)", line)
+    for line in vlan_brief.splitlines():
+        match = _GENERIC_ROW.match(line.strip())
         if match:
             vlan_id, vlan_name = match.groups()
             vlan_names[vlan_id] = vlan_name
             vlan_dict[vlan_id] = []
             current_vlan = vlan_id
             continue
-        if current_vlan and re.match(r"^\s+(eth\d+/\d+)", line):
-            vlan_dict[current_vlan].append(line.strip())
+        match = _GENERIC_CONTINUATION.match(line)
+        if current_vlan and match:
+            vlan_dict[current_vlan].append(match.group(1))
 
     return {"vlans": vlan_names, "ports_vlan": vlan_dict}
 
@@ -0,0 +1,15 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Permite negociar `Accept: application/x-ndjson`: una línea JSON por elemento."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        items = data if isinstance(data, list) else [data]
+        return "".join(json.dumps(item) + "\n" for item in items).encode()
@@ -1,8 +1,10 @@
 from django.contrib.auth.hashers import make_password
 from rest_framework import serializers
 
+from .compliance import validate_pattern
+from .network_util.comparison import render_backup_diff
 from .models import (Area, Backup, BackupDiff, BackupStatusTracker,
-                     ClassificationRuleSet, Country, DeviceType, Manufacturer,
+                     ClassificationRuleSet, ComplianceRule, Country, DeviceType, Manufacturer,
                      NetworkDevice, Site, UserSystem, VaultCredential, SUPPORTED_NETMIKO_TYPES)
 
 
@@ -72,6 +74,14 @@ class BackupDiffSerializer(serializers.ModelSerializer):
             "createdAt",
         ]
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.hunks is not None:
+            # Formato compacto: se entrega en la forma legada, reconstruida desde los respaldos
+            data["structured_changes"] = render_backup_diff(instance)
+            data["changes"] = str(data["structured_changes"])
+        return data
+
 
 # **********************************************************
 # Contador de Intentos de Backups
@@ -85,6 +95,8 @@ class BackupStatusTrackerSerializer(serializers.ModelSerializer):
             "error_count",
             "last_status",
             "last_attempt_time",
+            "circuit_open_until",
+            "change_marker_at",
         ]
 
 
@@ -132,7 +144,7 @@ class NetworkDeviceSerializer(serializers.ModelSerializer):
 class ManufacturerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Manufacturer
-        fields = ["id", "name", "get_running_config", "get_vlan_info", "netmiko_type"]
+        fields = ["id", "name", "get_running_config", "get_vlan_info", "get_change_marker", "netmiko_type"]
 
     def validate_netmiko_type(self, value):
         if value and value not in SUPPORTED_NETMIKO_TYPES:
@@ -190,3 +202,29 @@ class ClassificationRuleSetSerializer(serializers.ModelSerializer):
     class Meta:
         model = ClassificationRuleSet
         fields = ["id", "name", "rules", "vaultCredential", "createdAt"]
+
+
+# **********************************************************
+# ✅ Serializador de Reglas de Cumplimiento
+# **********************************************************
+class ComplianceRuleSerializer(serializers.ModelSerializer):
+    manufacturer_name = serializers.CharField(source="manufacturer.name", read_only=True, default=None)
+
+    class Meta:
+        model = ComplianceRule
+        fields = [
+            "id", "name", "description", "kind", "pattern", "section", "manufacturer",
+            "manufacturer_name", "severity", "enabled", "createdAt", "updatedAt",
+        ]
+
+    def validate_pattern(self, value):
+        try:
+            validate_pattern(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def validate_section(self, value):
+        if value:
+            self.validate_pattern(value)
+        return value
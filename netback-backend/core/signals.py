@@ -5,7 +5,10 @@ from django.utils import timezone
 
 from django_celery_beat.models import CrontabSchedule, PeriodicTask
 
-from .models import BackupSchedule
+from utils.classification_engine import invalidate_area_cache
+
+from .models import Area, Backup, BackupSchedule, Country, NetworkDevice, Site
+from .vlan_index import index_backup, reindex_device
 import logging
 
 logger = logging.getLogger(__name__)
@@ -52,3 +55,44 @@ def remove_autobackup_schedule(sender, instance, **kwargs):
         pt.save()
     except PeriodicTask.DoesNotExist:
         pass
+
+
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Area)
+def invalidate_location_cache(sender, **kwargs):
+    """La jerarquía País/Sitio/Área cambió: el clasificador debe recargarla."""
+    invalidate_area_cache()
+
+
+@receiver(post_save, sender=Backup)
+def index_backup_vlans(sender, instance, created, **kwargs):
+    """Respaldo nuevo: actualiza el índice de VLANs del equipo si es el más reciente."""
+    if not created:
+        return
+    try:
+        newer = Backup.objects.filter(
+            device_id=instance.device_id, backupTime__gt=instance.backupTime
+        ).exists()
+        if not newer:
+            index_backup(instance)
+    except Exception:
+        # El índice es derivado: un fallo aquí no debe impedir guardar el respaldo
+        logger.exception(f"No se pudo indexar las VLANs del respaldo {instance.pk}")
+
+
+@receiver(post_delete, sender=Backup)
+def reindex_after_backup_delete(sender, instance, **kwargs):
+    """Si se borra el respaldo indexado, el índice pasa al anterior."""
+    try:
+        newer = Backup.objects.filter(
+            device_id=instance.device_id, backupTime__gt=instance.backupTime
+        ).exists()
+        if newer or not NetworkDevice.objects.filter(pk=instance.device_id).exists():
+            return
+        reindex_device(instance.device_id)
+    except Exception:
+        logger.exception(f"No se pudo reindexar las VLANs del equipo {instance.device_id}")
@@ -1,11 +1,17 @@
 import logging
-from concurrent.futures import ThreadPoolExecutor
 
-from celery import shared_task
+from celery import group, shared_task
+from django.conf import settings
 from django.utils.timezone import localtime, now
 
+from utils.reachability import sweep
+
+from .compliance import evaluate_devices, prune_disabled_results, stale_device_ids
 from .models import BackupSchedule, BackupStatus, NetworkDevice
-from .network_util.backup import backupDevice
+from .network_util.backup import backupDevice, latest_backups, mark_backup_error
+from .network_util.resilience import circuit_is_open
+from .network_util.scheduler import BackupScheduler, plan_backups
+from .zabbix_snapshot import refresh_zabbix_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -23,23 +29,116 @@ def autoBackup():
     try:
         resultado = execute_backup_process()
         logger.info(f"📂 Resultado de los backups: {resultado}")
-        return {"message": "Backups ejecutados.", "result": resultado}
     except Exception as e:
         logger.exception("❌ Error ejecutando backups automáticos")
         return {"error": str(e)}
 
+    if settings.COMPLIANCE_AFTER_BACKUP:
+        try:
+            evaluateCompliance.delay()
+        except Exception:
+            logger.exception("❌ No se pudo encolar la evaluación de cumplimiento")
+    return {"message": "Backups ejecutados.", "result": resultado}
+
+
+@shared_task
+def refreshZabbixSnapshot(full=False):
+    """Refresca la copia local de hosts de Zabbix (programada desde django-celery-beat)"""
+    try:
+        return refresh_zabbix_snapshot(full=full)
+    except ValueError as e:
+        logger.warning(f"⚠ No se pudo refrescar el snapshot de Zabbix: {e}")
+        return {"error": str(e)}
+
+
+@shared_task
+def evaluateCompliance(device_ids=None, force=False):
+    """
+    Reparte entre los workers la evaluación de cumplimiento de los equipos cuyo
+    último respaldo cambió (o de todos con force) en bloques de COMPLIANCE_CHUNK_SIZE.
+    """
+    prune_disabled_results()
+    if force:
+        backups = latest_backups()
+        if device_ids is not None:
+            backups = backups.filter(device_id__in=device_ids)
+        pending = list(backups.values_list("device_id", flat=True))
+    else:
+        pending = stale_device_ids(device_ids)
+    if not pending:
+        logger.info("✅ Cumplimiento al día: ningún equipo cambió")
+        return {"pending": 0, "chunks": 0}
+
+    size = max(1, settings.COMPLIANCE_CHUNK_SIZE)
+    chunks = [[str(d) for d in pending[i:i + size]] for i in range(0, len(pending), size)]
+    group(evaluateComplianceChunk.s(chunk) for chunk in chunks).apply_async()
+    logger.info(f"🧾 Cumplimiento: {len(pending)} equipos en {len(chunks)} bloques")
+    return {"pending": len(pending), "chunks": len(chunks)}
+
+
+@shared_task
+def evaluateComplianceChunk(device_ids):
+    return evaluate_devices(device_ids)
+
+
+def preflight_reachability(devices):
+    """
+    Sondea todos los dispositivos a la vez (TCP al puerto SSH + ICMP) antes de
+    abrir sesiones SSH. Devuelve (alcanzables, [(dispositivo, resultado), ...] no alcanzables).
+    """
+    results = sweep(
+        [device.ipAddress for device in devices],
+        port=settings.REACHABILITY_PORT,
+        timeout=settings.REACHABILITY_TIMEOUT,
+        concurrency=settings.REACHABILITY_CONCURRENCY,
+    )
+    reachable, unreachable = [], []
+    for device, result in zip(devices, results):
+        if result["reachable"]:
+            reachable.append(device)
+        else:
+            unreachable.append((device, result))
+    return reachable, unreachable
+
 
 def execute_backup_process():
     """Ejecuta los respaldos en todos los dispositivos"""
 
     logger.info("🚀 Ejecutando backups en dispositivos")
 
-    devices = NetworkDevice.objects.all()
+    devices = list(
+        NetworkDevice.objects.select_related(
+            "manufacturer", "vaultCredential", "deviceType", "area__site", "backup_tracker"
+        ).all()
+    )
 
     if not devices:
         logger.warning("⚠ No hay dispositivos registrados para respaldar")
         return {"error": "No hay dispositivos para respaldar"}
 
+    # Circuit breaker: equipos que fallan corrida tras corrida se sondean con menos frecuencia
+    started_at = now()
+    skipped = [d for d in devices if circuit_is_open(d, started_at)]
+    if skipped:
+        for device in skipped:
+            logger.info(
+                f"⏸ {device.hostname} omitido: circuito abierto hasta {device.backup_tracker.circuit_open_until}"
+            )
+        devices = [d for d in devices if not circuit_is_open(d, started_at)]
+
+    unreachable = []
+    if settings.BACKUP_PREFLIGHT:
+        # Los equipos caídos se descartan aquí en vez de esperar el timeout de Netmiko
+        devices, unreachable = preflight_reachability(devices)
+        for device, result in unreachable:
+            logger.warning(f"📴 {device.hostname} ({device.ipAddress}) no alcanzable: {result['error']}")
+            BackupStatus.objects.create(
+                device=device,
+                status="failed",
+                message=f"Device unreachable (pre-flight check: {result['error']}).",
+            )
+            mark_backup_error(device)
+
     def backup_wrapper(device):
         logger.info(f"🔹 Iniciando backup para {device.hostname} ({device.ipAddress})")
 
@@ -56,10 +155,19 @@ def execute_backup_process():
 
         logger.info(f"✔ Backup finalizado para {device.hostname}: {result}")
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        executor.map(backup_wrapper, devices)
+    # Prioridad por tipo/área, más lentos primero y tope de concurrencia por sitio
+    jobs = plan_backups(
+        devices,
+        device_types=settings.BACKUP_PRIORITY_DEVICE_TYPES,
+        areas=settings.BACKUP_PRIORITY_AREAS,
+    )
+    BackupScheduler(
+        jobs, workers=settings.BACKUP_WORKERS, site_cap=settings.BACKUP_SITE_CONCURRENCY
+    ).run(backup_wrapper)
 
     return {
         "success": True,
         "message": f"Backups completed for {len(devices)} devices.",
+        "unreachable": len(unreachable),
+        "skipped": len(skipped),
     }
@@ -7,7 +7,19 @@ named `tests`.
 
 __all__ = [
     "test_autobackup_schedule",
+    "test_backup_diff",
+    "test_backup_process",
+    "test_bulk_import",
+    "test_change_report",
+    "test_classification_engine",
+    "test_compliance",
+    "test_config_search",
     "test_endpoints_signals",
     "test_models_crud",
+    "test_normalization",
     "test_ping",
+    "test_vlan_index",
+    "test_vlan_parser",
+    "test_zabbix_snapshot",
+    "test_zabbix_sync",
 ]
@@ -0,0 +1,218 @@
+import difflib
+import json
+import random
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Backup, BackupDiff, DeviceType, Manufacturer, NetworkDevice, UserSystem
+from core.network_util.backup import backupDevice, section_config, section_hashes
+from core.network_util.comparison import compareBackups, generate_backup_diff, section_changes
+from core.network_util.timeline import build_timeline
+from core.serializers import BackupDiffSerializer
+from core.views import getDeviceTimeline
+
+
+def _config(interfaces, extra=""):
+	blocks = [f"interface Gi1/0/{i}\n description port {i}\n switchport access vlan {v}" for i, v in interfaces]
+	return "hostname sw1\n!\n" + "\n!\n".join(blocks) + "\n!\n" + extra + "end"
+
+
+def _full_diff(old_config, new_config):
+	"""Referencia: diff de todas las secciones de ambas configuraciones."""
+	old_dict = dict(section_config(old_config))
+	new_dict = dict(section_config(new_config))
+	return section_changes(old_dict, new_dict, set(old_dict) | set(new_dict))
+
+
+class SectionHashDiffTests(TestCase):
+	def setUp(self):
+		m = Manufacturer.objects.create(name="Cisco", get_running_config="r", get_vlan_info="v", netmiko_type="cisco_ios")
+		dt = DeviceType.objects.create(name="Switch")
+		self.device = NetworkDevice.objects.create(
+			hostname="sw1", ipAddress="10.0.0.1", manufacturer=m, deviceType=dt, customUser="u", customPass="p"
+		)
+
+	def _pair(self, old_config, new_config):
+		old = Backup.objects.create(device=self.device, runningConfig=old_config, vlanBrief="", checksum="old")
+		new = Backup.objects.create(device=self.device, runningConfig=new_config, vlanBrief="", checksum="new")
+		return old, new
+
+	def test_only_sections_with_different_hashes_are_diffed(self):
+		interfaces = [(i, 10) for i in range(2000)]
+		changed = list(interfaces)
+		changed[1500] = (1500, 20)
+		old, new = self._pair(_config(interfaces), _config(changed))
+
+		with patch("core.network_util.comparison.difflib.ndiff", wraps=difflib.ndiff) as ndiff:
+			result = generate_backup_diff(old, new)
+
+		self.assertEqual(ndiff.call_count, 1)
+		self.assertEqual([list(s) for s in result["changes"]["modified"]], [["interface Gi1/0/1500"]])
+		self.assertEqual(
+			(result["changes"]["added"], result["changes"]["removed"], result["changes"]["modified"]),
+			_full_diff(old.runningConfig, new.runningConfig),
+		)
+
+	def test_matches_full_diff_on_random_edits(self):
+		rng = random.Random(47)
+		for _ in range(20):
+			interfaces = [(i, rng.randint(1, 5)) for i in range(30)]
+			edited = [(i, rng.randint(1, 5)) if rng.random() < 0.2 else (i, v) for i, v in interfaces]
+			edited = [item for item in edited if rng.random() > 0.1] + [(100 + n, 1) for n in range(rng.randint(0, 2))]
+			# Títulos repetidos y líneas indentadas antes de la primera sección
+			extra = rng.choice(["", "banner motd x\n banner motd y\n", " orphan\n"])
+			old_config, new_config = " lead\n" + _config(interfaces), _config(edited, extra)
+
+			Backup.objects.all().delete()
+			old, new = self._pair(old_config, new_config)
+			changes = generate_backup_diff(old, new)["changes"]
+
+			added, removed, modified = _full_diff(old_config, new_config)
+			self.assertEqual((changes["added"], changes["removed"], changes["modified"]), (added, removed, modified))
+
+	@patch("core.network_util.backup.ConnectHandler")
+	def test_hashes_stored_at_ingest_and_filled_for_legacy_backups(self, mock_handler):
+		conn = MagicMock()
+		conn.send_command.side_effect = ["hostname sw1\ninterface Gi1\n shutdown", ""]
+		mock_handler.return_value.__enter__.return_value = conn
+		backupDevice(self.device)
+
+		stored = Backup.objects.get()
+		self.assertEqual(stored.sectionHashes, section_hashes(stored.runningConfig))
+		self.assertEqual(set(stored.sectionHashes), {"hostname sw1", "interface Gi1"})
+
+		legacy = Backup.objects.create(device=self.device, runningConfig="hostname sw1\ninterface Gi1", vlanBrief="", checksum="x")
+		Backup.objects.filter(pk=legacy.pk).update(backupTime=stored.backupTime.replace(year=stored.backupTime.year + 1))
+		result = compareBackups(self.device)
+
+		self.assertEqual(result["changes"]["modified"], [{"interface Gi1": ["interface Gi1", "--  shutdown"]}])
+		self.assertIsNotNone(Backup.objects.get(pk=legacy.pk).sectionHashes)
+
+
+class CompactBackupDiffTests(TestCase):
+	def setUp(self):
+		m = Manufacturer.objects.create(name="Cisco", get_running_config="r", get_vlan_info="v", netmiko_type="cisco_ios")
+		dt = DeviceType.objects.create(name="Switch")
+		self.device = NetworkDevice.objects.create(
+			hostname="sw1", ipAddress="10.0.0.1", manufacturer=m, deviceType=dt, customUser="u", customPass="p"
+		)
+		interfaces = [(i, 10) for i in range(200)]
+		edited = [(i, 20 if i % 50 == 0 else v) for i, v in interfaces if i != 7] + [(300, 1)]
+		self.old = Backup.objects.create(device=self.device, runningConfig=_config(interfaces), vlanBrief="", checksum="o")
+		self.new = Backup.objects.create(device=self.device, runningConfig=_config(edited), vlanBrief="", checksum="n")
+
+	def test_diff_is_stored_once_and_rendered_in_legacy_shape(self):
+		result = generate_backup_diff(self.old, self.new)
+		diff = BackupDiff.objects.select_related("backupOld", "backupNew").get(pk=result["backupDiffId"])
+
+		self.assertEqual((diff.changes, diff.structured_changes), ("", None))
+		legacy_size = len(str(result["changes"])) + len(json.dumps(result["changes"]))
+		self.assertLess(len(json.dumps(diff.hunks)), legacy_size / 2)
+
+		data = BackupDiffSerializer(diff).data
+		self.assertEqual(data["structured_changes"], result["changes"])
+		self.assertEqual(data["changes"], str(result["changes"]))
+		self.assertEqual(len(result["changes"]["modified"]), 4)
+		self.assertEqual(list(result["changes"]["added"][0]), ["interface Gi1/0/300"])
+		self.assertEqual(list(result["changes"]["removed"][0]), ["interface Gi1/0/7"])
+
+	def test_backfill_converts_legacy_rows_it_can_reproduce(self):
+		legacy = generate_backup_diff(self.old, self.new)["changes"]
+		BackupDiff.objects.all().delete()
+		convertible = BackupDiff.objects.create(
+			device=self.device, backupOld=self.old, backupNew=self.new,
+			changes=str(legacy), structured_changes=legacy,
+		)
+		# Fila creada con otra versión del algoritmo: se conserva tal cual
+		foreign = {**legacy, "modified": []}
+		kept = BackupDiff.objects.create(
+			device=self.device, backupOld=self.old, backupNew=self.new,
+			changes=str(foreign), structured_changes=foreign,
+		)
+		before = BackupDiffSerializer(BackupDiff.objects.get(pk=convertible.pk)).data
+
+		out = StringIO()
+		call_command("compact_backup_diffs", stdout=out)
+
+		self.assertIn("1 convertidos, 1 conservados", out.getvalue())
+		convertible.refresh_from_db()
+		self.assertEqual((convertible.changes, convertible.structured_changes), ("", None))
+		self.assertEqual(BackupDiffSerializer(convertible).data, before)
+		kept.refresh_from_db()
+		self.assertIsNone(kept.hunks)
+		self.assertEqual(BackupDiffSerializer(kept).data["structured_changes"], foreign)
+
+
+class TimelineTests(TestCase):
+	def setUp(self):
+		m = Manufacturer.objects.create(name="Cisco", get_running_config="r", get_vlan_info="v", netmiko_type="cisco_ios")
+		dt = DeviceType.objects.create(name="Switch")
+		self.device = NetworkDevice.objects.create(
+			hostname="sw1", ipAddress="10.0.0.1", manufacturer=m, deviceType=dt, customUser="u", customPass="p"
+		)
+		configs = [
+			_config([(1, 10), (2, 10)]),
+			_config([(1, 20), (2, 10)]),
+			_config([(1, 20), (2, 10), (9, 30)]),
+			_config([(1, 10), (2, 10), (9, 30)]),
+		]
+		start = timezone.now() - timedelta(days=30)
+		self.backups = []
+		for day, config in enumerate(configs):
+			backup = Backup.objects.create(device=self.device, runningConfig=config, vlanBrief="", checksum=str(day))
+			Backup.objects.filter(pk=backup.pk).update(backupTime=start + timedelta(days=day * 7))
+			backup.refresh_from_db()
+			self.backups.append(backup)
+
+	def test_timeline_tracks_first_and_last_seen_per_line(self):
+		timeline = build_timeline(self.backups)
+
+		self.assertEqual([(v["added"], v["removed"]) for v in timeline["versions"]], [(0, 0), (1, 1), (3, 0), (1, 1)])
+		by_section = {s["section"]: s for s in timeline["sections"]}
+		self.assertEqual(list(by_section), ["interface Gi1/0/1", "interface Gi1/0/9"])
+		self.assertEqual(
+			[(e["version"], e["change"]) for e in by_section["interface Gi1/0/1"]["events"]],
+			[(1, "modified"), (3, "modified")],
+		)
+		lines = {line["text"]: line for line in by_section["interface Gi1/0/1"]["lines"]}
+		old_vlan, new_vlan = lines[" switchport access vlan 10"], lines[" switchport access vlan 20"]
+		self.assertEqual((old_vlan["firstSeen"], old_vlan["lastSeen"], old_vlan["present"]), (0, 3, True))
+		self.assertEqual([e["change"] for e in old_vlan["events"]], ["removed", "added"])
+		self.assertEqual((new_vlan["firstSeen"], new_vlan["lastSeen"], new_vlan["present"]), (1, 2, False))
+		self.assertEqual(by_section["interface Gi1/0/9"]["events"], [{"version": 2, "change": "added"}])
+
+	def test_reuses_cached_pairwise_diffs(self):
+		generate_backup_diff(self.backups[0], self.backups[1])
+
+		build_timeline(self.backups)
+		self.assertEqual(BackupDiff.objects.count(), 3)
+
+		with patch("core.network_util.comparison.difflib.ndiff") as ndiff:
+			again = build_timeline(self.backups)
+			ndiff.assert_not_called()
+		self.assertEqual(BackupDiff.objects.count(), 3)
+		self.assertEqual(again, build_timeline(self.backups))
+
+	def test_endpoint_filters_range(self):
+		user = UserSystem.objects.create_user(username="v", email="v@a", password="p")
+		factory = APIRequestFactory()
+
+		def get(pk, **params):
+			req = factory.get(f"/api/networkdevice/{pk}/timeline/", params)
+			force_authenticate(req, user=user)
+			return getDeviceTimeline(req, pk=pk)
+
+		self.assertEqual(len(get(self.device.id).data["versions"]), 4)
+		since = (self.backups[1].backupTime - timedelta(hours=1)).isoformat()
+		data = get(self.device.id, since=since).data
+		self.assertEqual([v["backupId"] for v in data["versions"]], [str(b.id) for b in self.backups[1:]])
+		self.assertEqual(len(get(self.device.id, limit="2").data["versions"]), 2)
+		self.assertEqual(get(self.device.id, since="ayer").status_code, 400)
+		self.assertEqual(get("00000000-0000-0000-0000-000000000000").status_code, 404)
@@ -0,0 +1,407 @@
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from netmiko.exceptions import NetmikoAuthenticationException, NetmikoTimeoutException
+
+from core.models import (
+	Area, Backup, BackupStatus, BackupStatusTracker, BackupTiming, Country, DeviceType, Manufacturer,
+	NetworkDevice, Site
+)
+from core.network_util.backup import backupDevice, mark_backup_error
+from core.network_util.resilience import backoff_delay
+from core.network_util.scheduler import BackupJob, BackupScheduler, plan_backups
+from core.network_util.timeouts import adaptive_timeouts, percentile, record_timing
+from core.tasks import execute_backup_process
+
+
+def _device(i=0, **extra):
+	m, _ = Manufacturer.objects.get_or_create(name="M", defaults={"get_running_config": "r", "get_vlan_info": "v"})
+	dt, _ = DeviceType.objects.get_or_create(name="DT")
+	return NetworkDevice.objects.create(
+		hostname=f"dev{i}", ipAddress=f"10.0.0.{i + 1}", manufacturer=m, deviceType=dt,
+		customUser="u", customPass="p", **extra,
+	)
+
+
+# Un solo worker: SQLite en memoria bloquea la tabla ante escrituras concurrentes de varios hilos
+@override_settings(BACKUP_WORKERS=1)
+class BackupPreflightTests(TransactionTestCase):
+	# Los respaldos corren en hilos con su propia conexión: los datos deben estar confirmados
+	def setUp(self):
+		m = Manufacturer.objects.create(name="M", get_running_config="r", get_vlan_info="v")
+		dt = DeviceType.objects.create(name="DT")
+		self.devices = [
+			NetworkDevice.objects.create(
+				hostname=f"dev{i}", ipAddress=f"10.0.0.{i + 1}", manufacturer=m, deviceType=dt,
+				customUser="u", customPass="p",
+			)
+			for i in range(4)
+		]
+
+	@staticmethod
+	def _sweep(ips, **kwargs):
+		# Solo responden las IPs impares
+		return [
+			{"ip": ip, "reachable": int(ip.rsplit(".", 1)[1]) % 2 == 1, "raw_output": "", "stats": {}, "error": "timeout"}
+			for ip in ips
+		]
+
+	@patch("core.tasks.backupDevice", return_value={"success": True})
+	@patch("core.tasks.sweep")
+	def test_unreachable_devices_fail_fast_without_ssh(self, mock_sweep, mock_backup):
+		mock_sweep.side_effect = self._sweep
+
+		result = execute_backup_process()
+
+		self.assertEqual(result["unreachable"], 2)
+		self.assertEqual(mock_sweep.call_count, 1)
+		attempted = sorted(call.args[0].hostname for call in mock_backup.call_args_list)
+		self.assertEqual(attempted, ["dev0", "dev2"])
+
+		down = self.devices[1]
+		status = BackupStatus.objects.get(device=down)
+		self.assertEqual(status.status, "failed")
+		self.assertIn("unreachable", status.message)
+		tracker = BackupStatusTracker.objects.get(device=down)
+		self.assertEqual((tracker.last_status, tracker.error_count), ("error", 1))
+
+	@patch("core.tasks.backupDevice", return_value={"success": True})
+	@patch("core.tasks.sweep")
+	def test_open_circuit_devices_are_skipped(self, mock_sweep, mock_backup):
+		mock_sweep.side_effect = lambda ips, **kw: [
+			{"ip": ip, "reachable": True, "raw_output": "", "stats": {}, "error": None} for ip in ips
+		]
+		BackupStatusTracker.objects.create(
+			device=self.devices[0], error_count=3, circuit_open_until=timezone.now() + timedelta(hours=1)
+		)
+		BackupStatusTracker.objects.create(
+			device=self.devices[1], error_count=3, circuit_open_until=timezone.now() - timedelta(minutes=1)
+		)
+
+		result = execute_backup_process()
+
+		self.assertEqual(result["skipped"], 1)
+		attempted = sorted(call.args[0].hostname for call in mock_backup.call_args_list)
+		self.assertEqual(attempted, ["dev1", "dev2", "dev3"])
+
+	@override_settings(BACKUP_PREFLIGHT=False)
+	@patch("core.tasks.backupDevice", return_value={"success": True})
+	@patch("core.tasks.sweep")
+	def test_preflight_can_be_disabled(self, mock_sweep, mock_backup):
+		result = execute_backup_process()
+
+		mock_sweep.assert_not_called()
+		self.assertEqual(mock_backup.call_count, 4)
+		self.assertEqual(result["unreachable"], 0)
+
+
+@override_settings(
+	BACKUP_TIMING_MIN_SAMPLES=3, BACKUP_TIMEOUT_PERCENTILE=95, BACKUP_TIMEOUT_FACTOR=2.0,
+	BACKUP_CONN_TIMEOUT_RANGE=(5.0, 60.0), BACKUP_READ_TIMEOUT_RANGE=(10.0, 600.0),
+)
+class AdaptiveTimeoutTests(TestCase):
+	def setUp(self):
+		self.device = _device()
+
+	def test_percentile_nearest_rank(self):
+		self.assertEqual(percentile([5, 1, 3, 2, 4], 50), 3)
+		self.assertEqual(percentile(list(range(1, 101)), 95), 95)
+		self.assertEqual(percentile([7], 95), 7)
+
+	def test_no_history_keeps_netmiko_defaults(self):
+		record_timing(self.device, True, 1.0, 2.0, 3.0)
+		self.assertEqual(adaptive_timeouts(self.device), {})
+
+	def test_timeouts_follow_percentile_within_bounds(self):
+		for connect, command in [(1.0, 40.0), (1.5, 60.0), (4.0, 90.0), (1.2, 50.0)]:
+			record_timing(self.device, True, connect, command, connect + command)
+
+		self.assertEqual(adaptive_timeouts(self.device), {"conn_timeout": 8.0, "read_timeout": 180.0})
+
+		fast = _device(1)
+		for _ in range(3):
+			record_timing(fast, True, 0.2, 0.5, 0.7)
+		self.assertEqual(adaptive_timeouts(fast), {"conn_timeout": 5.0, "read_timeout": 10.0})
+
+	def test_last_failure_lifts_timeouts_to_maximum(self):
+		for _ in range(3):
+			record_timing(self.device, True, 1.0, 20.0, 21.0)
+		record_timing(self.device, False, 1.0, None, 41.0)
+
+		self.assertEqual(adaptive_timeouts(self.device), {"conn_timeout": 60.0, "read_timeout": 600.0})
+
+	def test_connect_failure_can_relearn_slower_connect_time(self):
+		for _ in range(3):
+			record_timing(self.device, True, 1.0, 20.0, 21.0)
+		# El equipo ahora tarda 12 s en conectar: el percentil aprendido (5 s) lo corta siempre
+		record_timing(self.device, False, None, None, 5.0)
+		self.assertEqual(adaptive_timeouts(self.device)["conn_timeout"], 60.0)
+
+		for _ in range(3):
+			record_timing(self.device, True, 12.0, 20.0, 32.0)
+		self.assertEqual(adaptive_timeouts(self.device)["conn_timeout"], 24.0)
+
+	@override_settings(BACKUP_TIMING_HISTORY=5)
+	def test_history_is_pruned_per_device(self):
+		other = _device(1)
+		record_timing(other, True, 1.0, 1.0, 2.0)
+		for i in range(8):
+			record_timing(self.device, True, 1.0, float(i), 1.0 + i)
+
+		kept = list(BackupTiming.objects.filter(device=self.device).values_list("commandSeconds", flat=True))
+		self.assertEqual(sorted(kept), [3.0, 4.0, 5.0, 6.0, 7.0])
+		self.assertEqual(BackupTiming.objects.filter(device=other).count(), 1)
+
+	@patch("core.network_util.backup.ConnectHandler")
+	def test_backup_uses_learned_timeouts_and_records_duration(self, mock_handler):
+		for _ in range(3):
+			record_timing(self.device, True, 2.0, 30.0, 32.0)
+		conn = MagicMock()
+		conn.send_command.side_effect = ["hostname dev0", "1 default active"]
+		mock_handler.return_value.__enter__.return_value = conn
+
+		result = backupDevice(self.device)
+
+		self.assertTrue(result["success"])
+		self.assertEqual(mock_handler.call_args.kwargs["conn_timeout"], 5.0)
+		self.assertEqual(conn.send_command.call_args.kwargs["read_timeout"], 60.0)
+		self.assertEqual(BackupTiming.objects.filter(device=self.device).count(), 4)
+
+
+class BackupPlanTests(TestCase):
+	def setUp(self):
+		c = Country.objects.create(name="PE")
+		self.lima = Site.objects.create(name="Lima", country=c)
+		self.cusco = Site.objects.create(name="Cusco", country=c)
+		self.core = DeviceType.objects.create(name="Core")
+		self.access = DeviceType.objects.create(name="Access")
+
+	def _dev(self, name, device_type, site, seconds=None):
+		m, _ = Manufacturer.objects.get_or_create(name="M", defaults={"get_running_config": "r", "get_vlan_info": "v"})
+		device = NetworkDevice.objects.create(
+			hostname=name, ipAddress=f"10.9.0.{int(name[1:])}", manufacturer=m, deviceType=device_type,
+			area=Area.objects.create(name=f"area-{name}", site=site), customUser="u", customPass="p",
+		)
+		if seconds is not None:
+			record_timing(device, True, 1.0, seconds, seconds)
+		return device
+
+	def test_priority_classes_then_longest_first(self):
+		devices = [
+			self._dev("d1", self.access, self.lima, seconds=10),
+			self._dev("d2", self.core, self.cusco, seconds=5),
+			self._dev("d3", self.access, self.cusco, seconds=90),
+			self._dev("d4", self.core, self.lima, seconds=60),
+			self._dev("d5", self.access, self.lima),  # sin historial: media conocida (41.25)
+		]
+
+		jobs = plan_backups(devices, device_types=["core"], areas=[])
+
+		self.assertEqual([j.device.hostname for j in jobs], ["d4", "d2", "d3", "d5", "d1"])
+		self.assertEqual([j.priority for j in jobs], [0, 0, 1, 1, 1])
+
+	def test_area_or_site_names_define_classes(self):
+		devices = [
+			self._dev("d1", self.access, self.lima),
+			self._dev("d2", self.access, self.cusco),
+			self._dev("d3", self.core, self.lima),
+		]
+
+		jobs = plan_backups(devices, device_types=["Access", "Core"], areas=["Cusco"])
+
+		by_host = {j.device.hostname: j.priority for j in jobs}
+		self.assertEqual(by_host, {"d1": 0, "d2": 0, "d3": 1})
+		# "Cusco" es la clase 0 de áreas: gana sobre el índice de su tipo
+		self.assertEqual(plan_backups(devices[1:2], device_types=["Core", "Access"], areas=["Cusco"])[0].priority, 0)
+
+
+class BackupSchedulerTests(SimpleTestCase):
+	def test_site_cap_limits_concurrency_and_runs_everything(self):
+		jobs = [BackupJob(device=f"{site}-{i}", priority=0, expected_seconds=0, site_id=site)
+				for site in ("a", "b") for i in range(6)]
+		running, peak, done = Counter(), Counter(), []
+		lock = threading.Lock()
+
+		def work(device):
+			site = device.split("-")[0]
+			with lock:
+				running[site] += 1
+				peak[site] = max(peak[site], running[site])
+			time.sleep(0.01)
+			with lock:
+				running[site] -= 1
+				done.append(device)
+
+		BackupScheduler(jobs, workers=6, site_cap=2).run(work)
+
+		self.assertEqual(sorted(done), sorted(j.device for j in jobs))
+		self.assertLessEqual(max(peak.values()), 2)
+
+	def test_failures_do_not_stop_other_jobs(self):
+		jobs = [BackupJob(device=i, priority=0, expected_seconds=0, site_id=None) for i in range(5)]
+		done = []
+
+		def work(device):
+			if device == 2:
+				raise RuntimeError("boom")
+			done.append(device)
+
+		with self.assertLogs("core.network_util.scheduler", "ERROR"):
+			BackupScheduler(jobs, workers=2).run(work)
+		self.assertEqual(sorted(done), [0, 1, 3, 4])
+
+
+@override_settings(
+	BACKUP_RETRY_ATTEMPTS=2, BACKUP_RETRY_BASE_DELAY=2.0, BACKUP_RETRY_MAX_DELAY=30.0,
+	BACKUP_CIRCUIT_THRESHOLD=3, BACKUP_CIRCUIT_BASE_HOURS=24.0, BACKUP_CIRCUIT_MAX_HOURS=72.0,
+)
+class RetryAndCircuitTests(TestCase):
+	def setUp(self):
+		self.device = _device()
+
+	def _connection(self):
+		conn = MagicMock()
+		conn.send_command.side_effect = ["hostname dev0", "1 default active"]
+		handler = MagicMock()
+		handler.__enter__.return_value = conn
+		return handler
+
+	def test_backoff_is_jittered_and_capped(self):
+		with patch("core.network_util.resilience.random.uniform", side_effect=lambda a, b: b):
+			self.assertEqual([backoff_delay(i) for i in range(6)], [2.0, 4.0, 8.0, 16.0, 30.0, 30.0])
+
+	@patch("core.network_util.backup.time.sleep")
+	@patch("core.network_util.backup.ConnectHandler")
+	def test_transient_errors_are_retried(self, mock_handler, mock_sleep):
+		mock_handler.side_effect = [NetmikoTimeoutException("t1"), ConnectionResetError("reset"), self._connection()]
+
+		result = backupDevice(self.device)
+
+		self.assertTrue(result["success"])
+		self.assertEqual(mock_handler.call_count, 3)
+		self.assertEqual(mock_sleep.call_count, 2)
+		self.assertEqual(BackupTiming.objects.filter(device=self.device).count(), 1)
+
+	@patch("core.network_util.backup.time.sleep")
+	@patch("core.network_util.backup.ConnectHandler")
+	def test_retries_are_bounded_and_auth_errors_not_retried(self, mock_handler, mock_sleep):
+		mock_handler.side_effect = NetmikoTimeoutException("down")
+		self.assertFalse(backupDevice(self.device)["success"])
+		self.assertEqual(mock_handler.call_count, 3)
+
+		mock_handler.reset_mock()
+		mock_handler.side_effect = NetmikoAuthenticationException("bad password")
+		self.assertFalse(backupDevice(self.device)["success"])
+		self.assertEqual(mock_handler.call_count, 1)
+
+	def test_circuit_opens_after_threshold_and_backs_off(self):
+		for _ in range(2):
+			tracker = mark_backup_error(self.device)
+		self.assertIsNone(tracker.circuit_open_until)
+
+		windows = []
+		for _ in range(4):
+			before = timezone.now()
+			tracker = mark_backup_error(self.device)
+			windows.append(round((tracker.circuit_open_until - before).total_seconds() / 3600))
+		self.assertEqual(windows, [24, 48, 72, 72])
+
+	@patch("core.network_util.backup.ConnectHandler")
+	def test_success_closes_the_circuit(self, mock_handler):
+		for _ in range(3):
+			mark_backup_error(self.device)
+		mock_handler.return_value = self._connection()
+
+		self.assertTrue(backupDevice(self.device)["success"])
+
+		tracker = BackupStatusTracker.objects.get(device=self.device)
+		self.assertIsNone(tracker.circuit_open_until)
+		self.assertEqual(tracker.error_count, 0)
+
+
+@override_settings(BACKUP_CHANGE_MARKER=True, BACKUP_CHANGE_MARKER_MAX_AGE_HOURS=24.0)
+class ChangeMarkerTests(TestCase):
+	def setUp(self):
+		self.device = _device()
+		Manufacturer.objects.filter(name="M").update(get_change_marker="show marker")
+		self.device.refresh_from_db()
+
+	def _connection(self, marker, config="hostname dev0"):
+		conn = MagicMock()
+		outputs = {"show marker": marker, "r": config, "v": "1 default active"}
+		conn.send_command.side_effect = lambda command, **kwargs: outputs[command]
+		handler = MagicMock()
+		handler.__enter__.return_value = conn
+		return handler, conn
+
+	def _sent(self, conn):
+		return [call.args[0] for call in conn.send_command.call_args_list]
+
+	@patch("core.network_util.backup.ConnectHandler")
+	def test_unchanged_marker_skips_the_download(self, mock_handler):
+		handler, conn = self._connection("! Last configuration change at 10:00")
+		mock_handler.return_value = handler
+		self.assertIn("backupId", backupDevice(self.device))
+		self.assertEqual(self._sent(conn), ["show marker", "r", "v"])
+
+		handler, conn = self._connection("! Last configuration change at 10:00")
+		mock_handler.return_value = handler
+		result = backupDevice(self.device)
+
+		self.assertTrue(result["success"])
+		self.assertEqual(self._sent(conn), ["show marker"])
+		tracker = BackupStatusTracker.objects.get(device=self.device)
+		self.assertEqual((tracker.last_status, tracker.no_change_count), ("unchanged", 1))
+		self.assertEqual(Backup.objects.filter(device=self.device).count(), 1)
+		# Solo la descarga completa alimenta los timeouts adaptativos
+		self.assertEqual(BackupTiming.objects.filter(device=self.device).count(), 1)
+
+	@patch("core.network_util.backup.ConnectHandler")
+	def test_changed_stale_or_unusable_marker_downloads(self, mock_handler):
+		handler, _ = self._connection("change 1")
+		mock_handler.return_value = handler
+		backupDevice(self.device)
+
+		handler, conn = self._connection("change 2", config="hostname dev0-new")
+		mock_handler.return_value = handler
+		self.assertIn("backupId", backupDevice(self.device))
+		self.assertEqual(self._sent(conn), ["show marker", "r", "v"])
+
+		BackupStatusTracker.objects.filter(device=self.device).update(
+			change_marker_at=timezone.now() - timedelta(hours=25)
+		)
+		handler, conn = self._connection("change 2", config="hostname dev0-new")
+		mock_handler.return_value = handler
+		backupDevice(self.device)
+		self.assertEqual(self._sent(conn), ["show marker", "r", "v"])
+
+		for output in ("% Invalid input detected at '^' marker.", ""):
+			handler, conn = self._connection(output)
+			mock_handler.return_value = handler
+			backupDevice(self.device)
+			handler, conn = self._connection(output)
+			mock_handler.return_value = handler
+			backupDevice(self.device)
+			self.assertEqual(self._sent(conn), ["show marker", "r", "v"])
+
+	@patch("core.network_util.backup.ConnectHandler")
+	def test_manual_backup_and_disabled_setting_ignore_marker(self, mock_handler):
+		handler, _ = self._connection("m")
+		mock_handler.return_value = handler
+		backupDevice(self.device)
+
+		handler, conn = self._connection("m")
+		mock_handler.return_value = handler
+		backupDevice(self.device, use_change_marker=False)
+		self.assertEqual(self._sent(conn), ["r", "v"])
+
+		with self.settings(BACKUP_CHANGE_MARKER=False):
+			handler, conn = self._connection("m")
+			mock_handler.return_value = handler
+			backupDevice(self.device)
+			self.assertEqual(self._sent(conn), ["r", "v"])
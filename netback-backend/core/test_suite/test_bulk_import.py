@@ -0,0 +1,139 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.bulk_import import bulk_ingest_hosts
+from core.models import (
+	Area, Country, DeviceType, Manufacturer, NetworkDevice, Site, UserSystem, VaultCredential
+)
+from core.views import bulk_save_classified_hosts
+
+
+class BulkIngestTests(TestCase):
+	def setUp(self):
+		self.m = Manufacturer.objects.create(name="MB", get_running_config="r", get_vlan_info="v")
+		self.dt = DeviceType.objects.create(name="DTB")
+		c = Country.objects.create(name="CB")
+		s = Site.objects.create(name="SB", country=c)
+		self.area = Area.objects.create(name="AB", site=s)
+		self.vault = VaultCredential.objects.create(nick="vb", username="u", password="p")
+
+	def _host(self, i, **extra):
+		host = {
+			"hostname": f"bulk-{i}",
+			"ipAddress": f"10.1.{i // 250}.{i % 250 + 1}",
+			"model": "m",
+			"manufacturer": str(self.m.id),
+			"deviceType": str(self.dt.id),
+			"area": str(self.area.id),
+			"vaultCredential": None,
+			"customUser": "admin",
+			"customPass": "secret",
+		}
+		host.update(extra)
+		return host
+
+	def test_inserts_with_constant_number_of_queries(self):
+		hosts = [self._host(i) for i in range(300)]
+
+		with CaptureQueriesContext(connection) as ctx:
+			created, errors = bulk_ingest_hosts(hosts)
+
+		# prefetch + unicidad + inserts por lotes; nunca una consulta por host
+		self.assertLess(len(ctx.captured_queries), 15)
+
+		self.assertEqual((created, errors), (300, []))
+		device = NetworkDevice.objects.get(hostname="bulk-7")
+		self.assertEqual(device.customPass, "secret")
+		self.assertTrue(device.status)
+		self.assertIsNotNone(device.createdAt)
+
+	def test_reports_per_row_errors(self):
+		NetworkDevice.objects.create(
+			hostname="taken", ipAddress="10.9.9.9", manufacturer=self.m, deviceType=self.dt,
+			customUser="u", customPass="p",
+		)
+		hosts = [
+			self._host(0),
+			self._host(1, hostname="taken"),
+			self._host(2, ipAddress="10.1.0.1"),  # duplicada dentro del lote
+			self._host(3, manufacturer="not-a-uuid"),
+			self._host(4, ipAddress="999.1.1.1"),
+			self._host(5, vaultCredential=str(self.vault.id)),
+			self._host(6, customPass=None),
+			self._host(7, vaultCredential=str(self.vault.id), customUser=None, customPass=None),
+		]
+
+		created, errors = bulk_ingest_hosts(hosts)
+
+		self.assertEqual(created, 2)
+		by_index = {e["index"]: e["errors"] for e in errors}
+		self.assertEqual(sorted(by_index), [1, 2, 3, 4, 5, 6])
+		self.assertIn("hostname", by_index[1])
+		self.assertIn("ipAddress", by_index[2])
+		self.assertIn("manufacturer", by_index[3])
+		self.assertIn("ipAddress", by_index[4])
+		self.assertIn("non_field_errors", by_index[5])
+		self.assertIn("non_field_errors", by_index[6])
+		self.assertIsNone(NetworkDevice.objects.get(hostname="bulk-7").customUser)
+
+	def test_view_uses_bulk_mode_on_request(self):
+		admin = UserSystem.objects.create_user(username="adm", email="adm@a", password="p")
+		admin.role = "admin"
+		admin.save()
+		factory = APIRequestFactory()
+
+		req = factory.post(
+			"/api/networkdevice/bulk/save/",
+			{"hosts": [self._host(0), self._host(1, hostname=None)], "bulk": True},
+			format="json",
+		)
+		force_authenticate(req, user=admin)
+		resp = bulk_save_classified_hosts(req)
+
+		self.assertEqual(resp.status_code, 201)
+		self.assertEqual(resp.data["created"], 1)
+		self.assertEqual(resp.data["errors"][0]["index"], 1)
+		self.assertIn("hostname", resp.data["errors"][0]["errors"])
+
+	def test_strips_strings_and_rejects_non_string_passwords(self):
+		hosts = [
+			self._host(0, hostname="  edge-1 ", customUser=" admin "),
+			self._host(1, hostname="edge-1"),  # duplicado una vez recortado
+			self._host(2, customPass=1234),
+			self._host(3, customPass=["a"]),
+			self._host(4, hostname="   "),
+			self._host(5, customPass="   "),
+		]
+
+		created, errors = bulk_ingest_hosts(hosts)
+
+		self.assertEqual(created, 1)
+		by_index = {e["index"]: e["errors"] for e in errors}
+		self.assertEqual(sorted(by_index), [1, 2, 3, 4, 5])
+		self.assertIn("hostname", by_index[1])
+		self.assertEqual(by_index[2], {"customPass": ["Not a valid string."]})
+		self.assertEqual(by_index[3], {"customPass": ["Not a valid string."]})
+		self.assertEqual(by_index[4], {"hostname": ["This field may not be blank."]})
+		self.assertIn("non_field_errors", by_index[5])
+		device = NetworkDevice.objects.get(hostname="edge-1")
+		self.assertEqual(device.customUser, "admin")
+
+	def test_view_parses_bulk_flag(self):
+		admin = UserSystem.objects.create_user(username="adm", email="adm@a", password="p")
+		admin.role = "admin"
+		admin.save()
+		factory = APIRequestFactory()
+
+		def post(flag):
+			req = factory.post("/api/networkdevice/bulk/save/", {"hosts": [self._host(0)], "bulk": flag}, format="json")
+			force_authenticate(req, user=admin)
+			return bulk_save_classified_hosts(req)
+
+		with patch("core.views.bulk_ingest_hosts") as ingest:
+			self.assertEqual(post("false").status_code, 201)
+			ingest.assert_not_called()
+			self.assertEqual(post("tal vez").status_code, 400)
@@ -0,0 +1,122 @@
+import io
+import json
+import zipfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.change_report import changed_devices, iter_change_report
+from core.models import Backup, BackupDiff, DeviceType, Manufacturer, NetworkDevice, UserSystem
+from core.network_util.comparison import compareSpecificBackups
+from core.views import change_report_view
+
+
+def _config(vlan, extra=""):
+	return (
+		f"hostname sw\n!\ninterface Gi1/0/1\n switchport access vlan {vlan}\n!\n"
+		f"interface Gi1/0/2\n switchport access vlan 10\n!\n{extra}"
+	)
+
+
+class ChangeReportTests(TestCase):
+	def setUp(self):
+		m = Manufacturer.objects.create(name="Cisco", get_running_config="r", get_vlan_info="v", netmiko_type="cisco_ios")
+		dt = DeviceType.objects.create(name="Switch")
+		self.now = timezone.now()
+		self.since = self.now - timedelta(hours=2)
+		self.devices = {}
+		self.backups = {}
+		# sw1 cambia dos veces en la ventana, sw2 no cambia, sw3 aparece en la ventana
+		plan = {
+			"sw1": [(-48, _config(10)), (-1.5, _config(20)), (-1, _config(30, "ntp server 10.0.0.9\n"))],
+			"sw2": [(-48, _config(10))],
+			"sw3": [(-1, _config(10))],
+		}
+		for hostname, backups in plan.items():
+			device = NetworkDevice.objects.create(
+				hostname=hostname, ipAddress=f"10.0.0.{len(self.devices) + 1}", manufacturer=m, deviceType=dt,
+				customUser="u", customPass="p",
+			)
+			self.devices[hostname] = device
+			self.backups[hostname] = []
+			for index, (hours, config) in enumerate(backups):
+				backup = Backup.objects.create(device=device, runningConfig=config, vlanBrief="", checksum=str(index))
+				Backup.objects.filter(pk=backup.pk).update(backupTime=self.now + timedelta(hours=hours))
+				backup.refresh_from_db()
+				self.backups[hostname].append(backup)
+		self.user = UserSystem.objects.create_user(username="v", email="v@a", password="p")
+
+	def _get(self, **params):
+		req = APIRequestFactory().get("/api/backups/changes/", params)
+		force_authenticate(req, user=self.user)
+		return change_report_view(req)
+
+	def test_changed_devices_in_one_query(self):
+		with self.assertNumQueries(1):
+			rows = list(changed_devices(self.since))
+
+		self.assertEqual([row.device.hostname for row in rows], ["sw1", "sw3"])
+		self.assertEqual(rows[0].pk, self.backups["sw1"][-1].pk)
+		self.assertEqual(rows[0].baseline_id, self.backups["sw1"][0].pk)
+		self.assertIsNone(rows[1].baseline_id)
+
+		until = self.now - timedelta(hours=1.25)
+		self.assertEqual([row.pk for row in changed_devices(self.since, until)], [self.backups["sw1"][1].pk])
+
+	def test_report_matches_pairwise_comparison_and_is_cached(self):
+		reports = list(iter_change_report(self.since))
+
+		self.assertEqual([(r["device"]["hostname"], r["status"]) for r in reports], [("sw1", "changed"), ("sw3", "new")])
+		self.assertIsNone(reports[1]["changes"])
+		baseline, newest = self.backups["sw1"][0], self.backups["sw1"][-1]
+		self.assertEqual(reports[0]["backupOld"]["id"], str(baseline.pk))
+		self.assertEqual(BackupDiff.objects.count(), 1)
+		expected = compareSpecificBackups(baseline, newest)
+		self.assertEqual(expected["backupDiffId"], reports[0]["backupDiffId"])
+		self.assertEqual(reports[0]["changes"], expected["changes"])
+
+		with patch("core.network_util.comparison.difflib.ndiff") as ndiff:
+			self.assertEqual(list(iter_change_report(self.since)), reports)
+			ndiff.assert_not_called()
+		self.assertEqual(BackupDiff.objects.count(), 1)
+
+	def test_process_pool_matches_serial(self):
+		serial = list(iter_change_report(self.since, workers=0))
+		BackupDiff.objects.all().delete()
+
+		pooled = list(iter_change_report(self.since, workers=2, chunk_size=1))
+		for report in serial + pooled:
+			report.pop("backupDiffId")
+		self.assertEqual(pooled, serial)
+
+	def test_endpoint_outputs(self):
+		self.assertEqual(self._get().status_code, 400)
+		self.assertEqual(self._get(since="ayer").status_code, 400)
+		self.assertEqual(self._get(since=self.since.isoformat(), output="pdf").status_code, 400)
+
+		response = self._get(since=self.since.isoformat())
+		data = json.loads(b"".join(response.streaming_content))
+		self.assertEqual([d["device"]["hostname"] for d in data["devices"]], ["sw1", "sw3"])
+		self.assertEqual(data["errors"], [])
+
+		response = self._get(since=self.since.isoformat(), output="ndjson", device=str(self.devices["sw3"].id))
+		lines = b"".join(response.streaming_content).decode().splitlines()
+		self.assertEqual([json.loads(line)["status"] for line in lines], ["new"])
+
+		response = self._get(since=self.since.isoformat(), output="html")
+		html = b"".join(response.streaming_content).decode()
+		self.assertIn('<span class="add">++  switchport access vlan 30</span>', html)
+		self.assertIn("2 equipo(s) con cambios", html)
+
+		response = self._get(since=self.since.isoformat(), output="zip")
+		self.assertIn("attachment", response["Content-Disposition"])
+		archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+		self.assertEqual(sorted(archive.namelist()), ["devices/sw1.diff", "devices/sw3.diff", "report.json"])
+		diff = archive.read("devices/sw1.diff").decode()
+		self.assertIn("## interface Gi1/0/1 (modificada)", diff)
+		self.assertIn("++ ntp server 10.0.0.9", diff)
+		summary = json.loads(archive.read("report.json"))
+		self.assertEqual(summary["devices"][0]["sections"], {"added": 1, "removed": 0, "modified": 1})
@@ -0,0 +1,212 @@
+import json
+import random
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, SimpleTestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import (
+	Area, ClassificationRuleSet, Country, DeviceType, Manufacturer, Site, UserSystem
+)
+from core.views import from_csv_bulk_view
+from utils.classification_engine import (
+	HostClassifier, build_catalog_cache, get_area_cache, invalidate_area_cache, resolve_catalog_refs
+)
+from utils.rule_matcher import AhoCorasick, CompiledRuleSet, match_rules_linear
+
+
+def _sources(hostname="", tags="", groups=None, model=""):
+	return {"hostname": hostname, "tags": tags, "groups": groups or [], "model": model}
+
+
+class RuleMatcherTests(SimpleTestCase):
+	def test_aho_corasick_finds_overlapping_patterns(self):
+		ac = AhoCorasick(["he", "she", "his", "hers"])
+		found = set(ac.search("ushers"))
+		self.assertEqual(found, {0, 1, 3})
+
+	def test_first_rule_wins_regardless_of_position_in_text(self):
+		rules = {
+			"site": [
+				{"value": "lim", "assign": "Lima", "searchIn": ["hostname"]},
+				{"value": "sw", "assign": "Switch site", "searchIn": ["hostname"]},
+			]
+		}
+		sources = _sources(hostname="sw-core-lim01")
+		self.assertEqual(CompiledRuleSet(rules).match(sources), {"site": "Lima"})
+		self.assertEqual(match_rules_linear(rules, sources), {"site": "Lima"})
+
+	def test_edge_cases_match_linear_implementation(self):
+		rules = {
+			"country": [
+				{"value": "pe", "assign": "", "searchIn": ["hostname"]},
+				{"value": "", "assign": "Vacio", "searchIn": ["groups"]},
+				{"value": "per", "assign": "Perú", "searchIn": ["unknown", "tags"]},
+			],
+			"deviceType": [
+				{"value": "SW", "assign": "Switch", "searchIn": ["model", "hostname"]},
+			],
+		}
+		cases = [
+			_sources(hostname="pe-sw1"),
+			_sources(hostname="pe-sw1", groups=["core"]),
+			_sources(tags="peru"),
+			_sources(model="ws-c2960"),
+			_sources(),
+		]
+		matcher = CompiledRuleSet(rules)
+		for sources in cases:
+			self.assertEqual(matcher.match(sources), match_rules_linear(rules, sources), sources)
+
+	def test_random_rule_sets_match_linear_implementation(self):
+		rng = random.Random(7)
+		alphabet = "abcd"
+		for _ in range(50):
+			rules = {
+				field: [
+					{
+						"value": "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 3))),
+						"assign": rng.choice([f"{field}{i}", f"{field}{i}", None]),
+						"searchIn": rng.sample(["hostname", "tags", "groups", "model"], rng.randint(0, 3)),
+					}
+					for i in range(rng.randint(1, 8))
+				]
+				for field in ("country", "site", "model")
+			}
+			matcher = CompiledRuleSet(rules)
+			for _ in range(20):
+				word = lambda: "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6)))
+				sources = _sources(
+					hostname=word(),
+					tags=word(),
+					groups=[word() for _ in range(rng.randint(0, 2))],
+					model=word(),
+				)
+				self.assertEqual(matcher.match(sources), match_rules_linear(rules, sources))
+
+
+class HostClassifierTests(TestCase):
+	def setUp(self):
+		# La caché es de proceso: no arrastrar datos de tests anteriores (rollback no emite señales)
+		invalidate_area_cache()
+
+	def test_classify_host_resolves_fields_and_area(self):
+		c = Country.objects.create(name="Perú")
+		s = Site.objects.create(name="Lima", country=c)
+		a = Area.objects.create(name="Core", site=s)
+		rules = {
+			"country": [{"value": "lim", "assign": "Perú", "searchIn": ["hostname"]}],
+			"site": [{"value": "lim", "assign": "Lima", "searchIn": ["hostname"]}],
+			"area": [{"value": "core", "assign": "Core", "searchIn": ["groups"]}],
+			"manufacturer": [{"value": "cisco", "assign": "Cisco", "searchIn": ["tags"]}],
+		}
+
+		result = HostClassifier(rules).classify_host(
+			{"hostname": "SW-LIM-01", "ip": "10.0.0.1", "groups": {"Core LAN"}, "tags": "HP"}
+		)
+
+		self.assertEqual(result["classification"]["site"], "Lima")
+		self.assertEqual(result["manufacturer"], "Desconocido")
+		self.assertEqual(result["missing"], ["manufacturer"])
+		self.assertEqual(result["area"]["id"], str(a.id))
+
+	def test_classify_all_in_process_pool_keeps_order_and_results(self):
+		c = Country.objects.create(name="Chile")
+		s = Site.objects.create(name="Santiago", country=c)
+		Area.objects.create(name="Desconocido", site=s)
+		rules = {
+			"country": [{"value": "scl", "assign": "Chile", "searchIn": ["hostname"]}],
+			"site": [{"value": "scl", "assign": "Santiago", "searchIn": ["hostname"]}],
+		}
+		hosts = [{"hostname": f"sw-{'scl' if i % 2 else 'x'}-{i}", "ip": f"10.0.0.{i}"} for i in range(9)]
+		classifier = HostClassifier(rules)
+
+		serial = classifier.classify_all(hosts)
+		parallel = classifier.classify_all(hosts, workers=2, chunk_size=2)
+
+		self.assertEqual(parallel, serial)
+		self.assertEqual([h["hostname"] for h in parallel], [h["hostname"] for h in hosts])
+		self.assertEqual(parallel[1]["area"]["name"], "(Chile) Santiago - Desconocido ")
+		self.assertEqual(classifier.classify_all(hosts, workers=2, chunk_size=0), serial)
+
+	def test_resolve_catalog_refs_uses_preloaded_case_insensitive_map(self):
+		m = Manufacturer.objects.create(name="Cisco", get_running_config="r", get_vlan_info="v")
+		dt = DeviceType.objects.create(name="Switch")
+		classified = [
+			{"hostname": f"h{i}", "manufacturer": "cisco" if i % 2 else "Juniper", "deviceType": "SWITCH"}
+			for i in range(50)
+		]
+
+		with self.assertNumQueries(2):
+			resolve_catalog_refs(classified, build_catalog_cache(), "vault-id")
+
+		self.assertEqual(classified[1]["manufacturer"], {"id": str(m.id), "name": "cisco"})
+		self.assertEqual(classified[0]["manufacturer"], {"id": None, "name": "Juniper"})
+		self.assertEqual(classified[0]["deviceType"]["id"], str(dt.id))
+		self.assertEqual(classified[0]["vaultCredential"], "vault-id")
+
+	def test_area_cache_is_reused_and_invalidated_by_signals(self):
+		c = Country.objects.create(name="Colombia")
+		s = Site.objects.create(name="Bogota", country=c)
+		first = get_area_cache()
+
+		with self.assertNumQueries(0):
+			self.assertIs(get_area_cache(), first)
+
+		a = Area.objects.create(name="Core", site=s)
+		reloaded = get_area_cache()
+		self.assertIsNot(reloaded, first)
+		self.assertEqual(
+			reloaded["areas"][("core", s.id)],
+			(str(a.id), "(Colombia) Bogota - Core "),
+		)
+
+
+class CsvStreamingTests(TestCase):
+	def setUp(self):
+		invalidate_area_cache()
+		self.admin = UserSystem.objects.create_user(username="adm", email="adm@a", password="p")
+		self.admin.role = "admin"
+		self.admin.save()
+		self.rule_set = ClassificationRuleSet.objects.create(
+			name="csv",
+			rules={"manufacturer": [{"value": "cisco", "assign": "Cisco", "searchIn": ["tags"]}]},
+		)
+		Manufacturer.objects.create(name="Cisco", get_running_config="r", get_vlan_info="v")
+
+	def _post(self, csv_text, **extra):
+		upload = SimpleUploadedFile("hosts.csv", csv_text.encode(), content_type="text/csv")
+		req = APIRequestFactory().post(
+			"/api/networkdevice/bulk/from-csv/",
+			{"ruleSetId": str(self.rule_set.id), "file": upload},
+			format="multipart",
+			**extra,
+		)
+		force_authenticate(req, user=self.admin)
+		return from_csv_bulk_view(req)
+
+	def test_ndjson_stream_matches_json_response(self):
+		rows = "\n".join(f"sw{i},10.0.0.{i},g1;g2,{'cisco' if i % 2 else ''},m" for i in range(7))
+		csv_text = "hostname,ip,groups,tags,model\n" + rows + "\n"
+
+		expected = self._post(csv_text).data
+		resp = self._post(csv_text, HTTP_ACCEPT="application/x-ndjson")
+
+		self.assertEqual(resp["Content-Type"], "application/x-ndjson")
+		lines = b"".join(resp.streaming_content).decode().splitlines()
+		self.assertEqual([json.loads(line) for line in lines], expected)
+		self.assertEqual(expected[1]["manufacturer"]["name"], "Cisco")
+		self.assertIsNotNone(expected[1]["manufacturer"]["id"])
+
+	def test_ndjson_stream_reports_decoding_errors_inline(self):
+		upload = SimpleUploadedFile("hosts.csv", b"hostname,ip\nok,10.0.0.1\n\xff\xfe\n")
+		req = APIRequestFactory().post(
+			"/api/networkdevice/bulk/from-csv/?stream=1",
+			{"ruleSetId": str(self.rule_set.id), "file": upload},
+			format="multipart",
+		)
+		force_authenticate(req, user=self.admin)
+		resp = from_csv_bulk_view(req)
+
+		lines = [json.loads(line) for line in b"".join(resp.streaming_content).decode().splitlines()]
+		self.assertIn("error", lines[-1])
@@ -0,0 +1,159 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.compliance import evaluate_devices, stale_device_ids
+from core.models import (
+	Backup, ComplianceResult, ComplianceRule, DeviceType, Manufacturer, NetworkDevice, UserSystem
+)
+from core.serializers import ComplianceRuleSerializer
+from core.tasks import evaluateCompliance, evaluateComplianceChunk
+from core.views import compliance_results, compliance_run
+
+SECURE = """hostname sw1
+snmp-server community s3cr3t RO
+line vty 0 4
+ transport input ssh
+line vty 5 15
+ transport input ssh
+end"""
+
+INSECURE = """hostname sw2
+snmp-server community public RO
+line vty 0 4
+ transport input telnet ssh
+line vty 5 15
+ transport input ssh
+end"""
+
+
+class ComplianceTests(TestCase):
+	def setUp(self):
+		self.cisco = Manufacturer.objects.create(name="Cisco", get_running_config="r", get_vlan_info="v", netmiko_type="cisco_ios")
+		self.huawei = Manufacturer.objects.create(name="Huawei", get_running_config="r", get_vlan_info="v", netmiko_type="huawei")
+		dt = DeviceType.objects.create(name="Switch")
+		self.sw1, self.sw2, self.hw = [
+			NetworkDevice.objects.create(
+				hostname=name, ipAddress=f"10.0.0.{i}", manufacturer=m, deviceType=dt, customUser="u", customPass="p",
+			)
+			for i, (name, m) in enumerate((("sw1", self.cisco), ("sw2", self.cisco), ("hw1", self.huawei)), start=1)
+		]
+		Backup.objects.create(device=self.sw1, runningConfig=SECURE, vlanBrief="", checksum="a")
+		Backup.objects.create(device=self.sw2, runningConfig=INSECURE, vlanBrief="", checksum="b")
+		Backup.objects.create(device=self.hw, runningConfig="sysname hw1\nuser-interface vty 0 4", vlanBrief="", checksum="c")
+		self.public = ComplianceRule.objects.create(
+			name="Sin community public", kind="must_not_contain", pattern=r"^snmp-server community public\b"
+		)
+		self.vty = ComplianceRule.objects.create(
+			name="VTY solo SSH", kind="must_contain", section=r"^line vty", pattern=r"^\s+transport input ssh$",
+			manufacturer=self.cisco, severity="high",
+		)
+
+	def _results(self):
+		return {
+			(r.device.hostname, r.rule.name): (r.passed, r.details)
+			for r in ComplianceResult.objects.select_related("device", "rule")
+		}
+
+	def test_rules_are_scoped_to_sections_and_manufacturers(self):
+		evaluate_devices([self.sw1.id, self.sw2.id, self.hw.id])
+
+		results = self._results()
+		self.assertEqual(results[("sw1", "Sin community public")], (True, []))
+		self.assertEqual(
+			results[("sw2", "Sin community public")],
+			(False, [{"section": "", "text": "snmp-server community public RO"}]),
+		)
+		self.assertEqual(results[("sw1", "VTY solo SSH")], (True, []))
+		self.assertEqual(results[("sw2", "VTY solo SSH")], (False, [{"section": "line vty 0 4", "text": None}]))
+		# La regla de Cisco no se evalúa en Huawei
+		self.assertEqual(results[("hw1", "Sin community public")], (True, []))
+		self.assertNotIn(("hw1", "VTY solo SSH"), results)
+
+	def test_only_changed_devices_or_edited_rules_are_reevaluated(self):
+		self.assertEqual(set(stale_device_ids()), {self.sw1.id, self.sw2.id, self.hw.id})
+		evaluate_devices(stale_device_ids())
+		self.assertEqual(stale_device_ids(), [])
+
+		Backup.objects.create(device=self.sw2, runningConfig=SECURE.replace("sw1", "sw2"), vlanBrief="", checksum="d")
+		self.assertEqual(stale_device_ids(), [self.sw2.id])
+		evaluate_devices([self.sw2.id])
+		self.assertTrue(self._results()[("sw2", "VTY solo SSH")][0])
+
+		self.vty.pattern = r"^\s+transport input none$"
+		self.vty.save()
+		self.assertEqual(set(stale_device_ids()), {self.sw1.id, self.sw2.id})
+
+		self.vty.manufacturer = None
+		self.vty.save()
+		self.assertEqual(set(stale_device_ids()), {self.sw1.id, self.sw2.id, self.hw.id})
+
+	@override_settings(COMPLIANCE_CHUNK_SIZE=2)
+	def test_task_fans_out_stale_devices_in_chunks(self):
+		ComplianceRule.objects.create(name="Apagada", kind="must_contain", pattern="x", enabled=False)
+
+		with patch("core.tasks.group") as group:
+			self.assertEqual(evaluateCompliance(), {"pending": 3, "chunks": 2})
+		chunks = [sig.args[0] for sig in group.call_args.args[0]]
+		self.assertEqual(sorted(len(c) for c in chunks), [1, 2])
+		for chunk in chunks:
+			evaluateComplianceChunk(chunk)
+		self.assertEqual(ComplianceResult.objects.count(), 5)
+
+		with patch("core.tasks.group") as group:
+			self.assertEqual(evaluateCompliance(), {"pending": 0, "chunks": 0})
+			self.assertEqual(evaluateCompliance([str(self.sw1.id)], force=True), {"pending": 1, "chunks": 1})
+		self.assertEqual(group.call_count, 1)
+
+	def test_views_read_stored_results(self):
+		evaluate_devices([self.sw1.id, self.sw2.id, self.hw.id])
+		user = UserSystem.objects.create_user(username="v", email="v@a", password="p")
+		factory = APIRequestFactory()
+
+		def get(**params):
+			req = factory.get("/api/compliance/", params)
+			force_authenticate(req, user=user)
+			return compliance_results(req)
+
+		summary = get().data
+		self.assertEqual(
+			[(r["name"], r["passed"], r["failed"]) for r in summary["rules"]],
+			[("Sin community public", 2, 1), ("VTY solo SSH", 1, 1)],
+		)
+		self.assertEqual(summary["devices"], {"evaluated": 3, "noncompliant": 1})
+		self.assertEqual([r["rule"]["name"] for r in get(device=str(self.sw2.id), passed="0").data], [
+			"Sin community public", "VTY solo SSH",
+		])
+		self.assertEqual([r["device"]["hostname"] for r in get(rule=str(self.vty.id)).data], ["sw1", "sw2"])
+		self.assertEqual(get(device="nope").status_code, 400)
+
+		user.role = "operator"
+		user.save()
+		req = factory.post("/api/compliance/run/", {"force": True}, format="json")
+		force_authenticate(req, user=user)
+		with patch("core.views.evaluateCompliance.delay") as delay:
+			delay.return_value.id = "task-1"
+			resp = compliance_run(req)
+		self.assertEqual((resp.status_code, resp.data), (202, {"taskId": "task-1"}))
+		delay.assert_called_once_with(None, True)
+
+		def run(data):
+			req = factory.post("/api/compliance/run/", data, format="json")
+			force_authenticate(req, user=user)
+			with patch("core.views.evaluateCompliance.delay") as delay:
+				delay.return_value.id = "task-2"
+				return compliance_run(req), delay
+
+		self.assertEqual(run({"devices": ["x"]})[0].status_code, 400)
+		self.assertEqual(run({"force": "quizá"})[0].status_code, 400)
+		resp, delay = run({"devices": [str(self.sw1.id)], "force": "false"})
+		self.assertEqual(resp.status_code, 202)
+		delay.assert_called_once_with([str(self.sw1.id)], False)
+
+	def test_serializer_rejects_invalid_regex(self):
+		serializer = ComplianceRuleSerializer(data={
+			"name": "rota", "kind": "must_contain", "pattern": "(abierto", "section": "[",
+		})
+		self.assertFalse(serializer.is_valid())
+		self.assertEqual(set(serializer.errors), {"pattern", "section"})
@@ -0,0 +1,125 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.config_search import _db_lookup, candidate_backups, portable_regex, search_configs
+from core.models import Area, Backup, Country, DeviceType, Manufacturer, NetworkDevice, Site, UserSystem
+from core.views import search_configs_view
+
+OLD = """hostname sw1
+snmp-server community public RO
+!
+end"""
+
+NEW = """hostname sw1
+interface Gi1/0/1
+ description SNMP-server uplink
+snmp-server community private RW
+!
+end"""
+
+OTHER = """hostname sw2
+snmp-server community public RO
+snmp-server community Public RW
+end"""
+
+
+class ConfigSearchTests(TestCase):
+	def setUp(self):
+		m = Manufacturer.objects.create(name="Cisco", get_running_config="r", get_vlan_info="v", netmiko_type="cisco_ios")
+		dt = DeviceType.objects.create(name="Switch")
+		country = Country.objects.create(name="Perú")
+		lima = Area.objects.create(name="Core", site=Site.objects.create(name="Lima", country=country))
+		cusco = Area.objects.create(name="Core", site=Site.objects.create(name="Cusco", country=country))
+		self.sw1, self.sw2 = [
+			NetworkDevice.objects.create(
+				hostname=f"sw{i}", ipAddress=f"10.0.0.{i}", manufacturer=m, deviceType=dt, area=area,
+				customUser="u", customPass="p",
+			)
+			for i, area in ((1, lima), (2, cusco))
+		]
+		self.lima = lima
+		self.old = Backup.objects.create(device=self.sw1, runningConfig=OLD, vlanBrief="", checksum="a")
+		self.new = Backup.objects.create(device=self.sw1, runningConfig=NEW, vlanBrief="", checksum="b")
+		Backup.objects.create(device=self.sw2, runningConfig=OTHER, vlanBrief="", checksum="c")
+		self.user = UserSystem.objects.create_user(username="v", email="v@a", password="p")
+
+	def _hits(self, query, **kwargs):
+		return [
+			(r["device"]["hostname"], [m["line"] for m in r["matches"]])
+			for r in search_configs(query, **kwargs)
+		]
+
+	def test_substring_searches_latest_backups_unless_all(self):
+		self.assertEqual(self._hits("snmp-server community public"), [("sw2", [2])])
+		self.assertEqual(
+			self._hits("snmp-server community public", all_backups=True),
+			[("sw1", [2]), ("sw2", [2])],
+		)
+		self.assertEqual(
+			self._hits("snmp-server community public", ignore_case=True),
+			[("sw2", [2, 3])],
+		)
+
+	def test_regex_is_anchored_per_line_and_filtered_in_database(self):
+		self.assertEqual(self._hits(r"^snmp-server community \w+ RW$", regex=True), [("sw1", [4]), ("sw2", [3])])
+		self.assertEqual(self._hits(r"^snmp-server", regex=True, ignore_case=True), [("sw1", [4]), ("sw2", [2, 3])])
+		# Solo los candidatos salen de la base de datos
+		self.assertEqual(list(candidate_backups("uplink")), [self.new])
+
+	def test_python_only_regex_skips_database_prefilter_on_postgresql(self):
+		for query in (
+			r"community (?P<c>\w+)", r"\bpublic\b", "(?i)public", "(?<=community )public", "a*+", "a{2}+",
+			# PostgreSQL: "invalid repetition count(s)" por encima de 255
+			"a{256}", r"\d{1,300}", "x{300,}",
+		):
+			self.assertFalse(portable_regex(query), query)
+		for query in (
+			r"^snmp-server community \w+ RW$", r"(?:public|private) R[OW]", r"\(\?P", r"\\b",
+			r"\d{1,255}", r"\{300\}",
+		):
+			self.assertTrue(portable_regex(query), query)
+
+		with patch("core.config_search.connection") as connection:
+			connection.vendor = "postgresql"
+			self.assertIsNone(_db_lookup(r"community (?P<c>\w+)", regex=True, ignore_case=False))
+			self.assertEqual(
+				_db_lookup("public RO", regex=True, ignore_case=True), {"runningConfig__iregex": "(?n)public RO"}
+			)
+
+		# Sin prefiltro el resultado es el mismo: las líneas se filtran en Python
+		self.assertEqual(self._hits(r"community (?P<c>[a-z]+) RW$", regex=True), [("sw1", [4])])
+		self.assertEqual(self._hits(r"(?i)^SNMP-server community public", regex=True), [("sw2", [2, 3])])
+
+	def test_truncates_lines_per_backup(self):
+		result = list(search_configs("snmp", ignore_case=True, max_lines=1))
+		self.assertEqual([r["truncated"] for r in result], [True, True])
+		self.assertEqual(result[0]["matches"], [{"line": 3, "text": " description SNMP-server uplink"}])
+
+	def _get(self, **params):
+		req = APIRequestFactory().get("/api/backups/search/", params)
+		force_authenticate(req, user=self.user)
+		return search_configs_view(req)
+
+	def test_view_streams_ndjson_and_validates_input(self):
+		resp = self._get(q="community", site=str(self.lima.site_id))
+		self.assertEqual(resp["Content-Type"], "application/x-ndjson")
+		lines = [json.loads(line) for line in b"".join(resp.streaming_content).decode().splitlines()]
+		self.assertEqual(len(lines), 1)
+		self.assertEqual(lines[0]["backupId"], str(self.new.id))
+		self.assertEqual(lines[0]["matches"], [{"line": 4, "text": "snmp-server community private RW"}])
+
+		self.assertEqual(self._get(q="").status_code, 400)
+		self.assertEqual(self._get(q="(unclosed", regex="1").status_code, 400)
+		self.assertEqual(self._get(q="x", device="not-a-uuid").status_code, 400)
+		with override_settings(CONFIG_SEARCH_MAX_PATTERN=10):
+			self.assertEqual(self._get(q="(a+)+" * 3, regex="1").status_code, 400)
+
+	def test_index_command_is_a_no_op_outside_postgresql(self):
+		out = StringIO()
+		call_command("create_config_search_index", stdout=out)
+		self.assertIn("solo existe en PostgreSQL", out.getvalue())
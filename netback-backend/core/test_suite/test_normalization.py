@@ -0,0 +1,115 @@
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.models import Backup, DeviceType, Manufacturer, NetworkDevice
+from core.network_util.backup import backupDevice
+from core.network_util.normalization import backup_checksum, normalize_config
+
+IOS_CONFIG = """Building configuration...\r
+\r
+Current configuration : 1234 bytes\r
+!\r
+! Last configuration change at 10:01:02 UTC Mon Jan 6 2025 by admin\r
+! NVRAM config last updated at 10:05:00 UTC Mon Jan 6 2025 by admin\r
+!\r
+hostname sw1   \r
+ntp clock-period 36028797\r
+interface Gi0/1\r
+ description uplink\r
+end\r
+"""
+
+
+def _backup_connection(config, vlans="1 default active"):
+	conn = MagicMock()
+	conn.send_command.side_effect = [config, vlans]
+	handler = MagicMock()
+	handler.__enter__.return_value = conn
+	return handler
+
+
+class NormalizationTests(SimpleTestCase):
+	def test_volatile_ios_lines_are_removed(self):
+		self.assertEqual(
+			normalize_config(IOS_CONFIG, "cisco_ios"),
+			"!\n!\nhostname sw1\ninterface Gi0/1\n description uplink\nend",
+		)
+
+	def test_volatile_lines_do_not_change_checksum(self):
+		later = IOS_CONFIG.replace("10:01:02", "23:59:59").replace("36028797", "36028801")
+		self.assertEqual(
+			backup_checksum(IOS_CONFIG, "vlans", "cisco_ios"),
+			backup_checksum(later.replace("\r\n", "\n"), "vlans\n", "cisco_ios"),
+		)
+		changed = IOS_CONFIG.replace("uplink", "downlink")
+		self.assertNotEqual(
+			backup_checksum(IOS_CONFIG, "vlans", "cisco_ios"),
+			backup_checksum(changed, "vlans", "cisco_ios"),
+		)
+
+	def test_vendor_filters_and_fallback(self):
+		junos = "## Last commit: 2025-01-06 10:00:00 UTC by admin\nversion 20.4R3;\nsystem { host-name r1; }"
+		self.assertEqual(normalize_config(junos, "juniper"), "version 20.4R3;\nsystem { host-name r1; }")
+		# Un filtro de otro fabricante no se aplica...
+		self.assertIn("## Last commit", normalize_config(junos, "cisco_ios"))
+		# ...salvo cuando el fabricante es desconocido
+		self.assertNotIn("## Last commit", normalize_config(junos, None))
+
+		routeros = "# jan/06/2025 10:00:00 by RouterOS 6.49.7\n# software id = ABCD-1234\n/interface bridge"
+		self.assertEqual(
+			normalize_config(routeros, "mikrotik_routeros"), "# software id = ABCD-1234\n/interface bridge"
+		)
+
+	@override_settings(BACKUP_VOLATILE_PATTERNS={"huawei": [r"!Uptime: .*", "(unclosed"], "*": [r"# generated .*"]})
+	def test_custom_patterns_from_settings(self):
+		text = "# generated now\n!Uptime: 5 days\n!Last configuration was updated at 2025-01-06\nsysname sw"
+		self.assertEqual(normalize_config(text, "huawei"), "sysname sw")
+		self.assertEqual(normalize_config(text, "juniper"), "!Uptime: 5 days\n!Last configuration was updated at 2025-01-06\nsysname sw")
+
+
+class NormalizedChecksumBackupTests(TestCase):
+	def setUp(self):
+		m = Manufacturer.objects.create(name="Cisco", get_running_config="r", get_vlan_info="v", netmiko_type="cisco_ios")
+		dt = DeviceType.objects.create(name="Switch")
+		self.device = NetworkDevice.objects.create(
+			hostname="sw1", ipAddress="10.0.0.1", manufacturer=m, deviceType=dt, customUser="u", customPass="p"
+		)
+
+	@patch("core.network_util.backup.ConnectHandler")
+	def test_backup_ignores_volatile_changes(self, mock_handler):
+		mock_handler.return_value = _backup_connection(IOS_CONFIG)
+		self.assertIn("backupId", backupDevice(self.device))
+
+		mock_handler.return_value = _backup_connection(IOS_CONFIG.replace("10:01:02", "11:00:00"))
+		result = backupDevice(self.device)
+
+		self.assertNotIn("backupId", result)
+		self.assertEqual(Backup.objects.filter(device=self.device).count(), 1)
+		# Se guarda la salida original; solo el checksum usa la forma canónica
+		self.assertIn("Last configuration change", Backup.objects.get().runningConfig)
+
+	def test_rehash_command_updates_and_reports_duplicates(self):
+		configs = [
+			IOS_CONFIG,
+			IOS_CONFIG.replace("10:01:02", "11:00:00"),
+			IOS_CONFIG.replace("uplink", "downlink"),
+		]
+		for i, config in enumerate(configs):
+			Backup.objects.create(device=self.device, runningConfig=config, vlanBrief="v", checksum=f"raw{i}")
+
+		out = StringIO()
+		call_command("rehash_backups", "--dry-run", stdout=out)
+		self.assertIn("recalculados: 2 | duplicados: 1", out.getvalue())
+		self.assertEqual(sorted(Backup.objects.values_list("checksum", flat=True)), ["raw0", "raw1", "raw2"])
+
+		call_command("rehash_backups", stdout=StringIO())
+		checksums = dict(Backup.objects.values_list("runningConfig", "checksum"))
+		self.assertEqual(checksums[configs[0]], backup_checksum(configs[0], "v", "cisco_ios"))
+		self.assertEqual(checksums[configs[1]], "raw1")
+
+		call_command("rehash_backups", "--delete-duplicates", stdout=StringIO())
+		self.assertEqual(Backup.objects.count(), 2)
+		self.assertFalse(Backup.objects.filter(checksum="raw1").exists())
@@ -1,12 +1,15 @@
 from unittest.mock import patch, Mock
+import asyncio
+import socket
 import subprocess
 
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from rest_framework.test import APIRequestFactory, force_authenticate
 
 from utils.ping import ping_ip
-from core.models import UserSystem
-from core.views import ping_device
+from utils.reachability import _checksum, _echo_request, sweep
+from core.models import Area, Country, DeviceType, Manufacturer, NetworkDevice, Site, UserSystem
+from core.views import ping_bulk, ping_device
 
 
 class PingUtilsTests(TestCase):
@@ -72,3 +75,85 @@ class PingViewTests(TestCase):
 		self.assertEqual(resp.status_code, 200)
 		self.assertEqual(resp.data.get("status"), "error")
 		self.assertFalse(resp.data.get("data")["reachable"]) 
+
+
+class ReachabilitySweepTests(SimpleTestCase):
+	def test_echo_request_checksum_is_valid(self):
+		self.assertEqual(_checksum(_echo_request(0x1234, 7)), 0)
+
+	def test_tcp_listening_and_refused_ports_are_reachable(self):
+		server = socket.socket()
+		server.bind(("127.0.0.1", 0))
+		server.listen()
+		self.addCleanup(server.close)
+		open_port = server.getsockname()[1]
+
+		closed = socket.socket()
+		closed.bind(("127.0.0.1", 0))
+		closed_port = closed.getsockname()[1]
+		closed.close()
+
+		listening = sweep(["127.0.0.1"], port=open_port, timeout=1, use_icmp=False)[0]
+		refused = sweep(["127.0.0.1"], port=closed_port, timeout=1, use_icmp=False)[0]
+
+		for res in (listening, refused):
+			self.assertTrue(res["reachable"])
+			self.assertEqual(res["stats"]["method"], "tcp")
+			self.assertEqual(res["stats"]["received"], 1)
+			self.assertIsNone(res["error"])
+
+	def test_timeouts_and_invalid_ips_keep_order(self):
+		async def never_connects(*args, **kwargs):
+			await asyncio.sleep(10)
+
+		with patch("utils.reachability.asyncio.open_connection", never_connects):
+			results = sweep(["10.0.0.1", "not-an-ip", "10.0.0.2"], timeout=0.05, use_icmp=False)
+
+		self.assertEqual([r["ip"] for r in results], ["10.0.0.1", "not-an-ip", "10.0.0.2"])
+		self.assertEqual([r["error"] for r in results], ["timeout", "invalid_ip", "timeout"])
+		self.assertEqual(results[0]["stats"]["loss_percentage"], 100.0)
+		self.assertFalse(any(r["reachable"] for r in results))
+
+
+class PingBulkViewTests(TestCase):
+	def setUp(self):
+		self.user = UserSystem.objects.create_user(username="tuser", email="t@t.t", password="pwd")
+		self.factory = APIRequestFactory()
+		m = Manufacturer.objects.create(name="M", get_running_config="r", get_vlan_info="v")
+		dt = DeviceType.objects.create(name="DT")
+		c = Country.objects.create(name="C")
+		self.site = Site.objects.create(name="S", country=c)
+		other = Site.objects.create(name="S2", country=c)
+		for i, site in enumerate([self.site, self.site, other]):
+			NetworkDevice.objects.create(
+				hostname=f"dev{i}", ipAddress=f"10.0.0.{i + 1}", manufacturer=m, deviceType=dt,
+				area=Area.objects.create(name=f"A{i}", site=site), customUser="u", customPass="p",
+			)
+
+	def _post(self, data):
+		req = self.factory.post("/api/ping/bulk/", data, format="json")
+		force_authenticate(req, user=self.user)
+		return ping_bulk(req)
+
+	@staticmethod
+	def _fake_sweep(ips, **kwargs):
+		return [{"ip": ip, "reachable": ip.endswith(".1"), "raw_output": "", "stats": {}, "error": None} for ip in ips]
+
+	@patch("core.views.sweep")
+	def test_ping_bulk_by_site_filter(self, mock_sweep):
+		mock_sweep.side_effect = self._fake_sweep
+		resp = self._post({"site": str(self.site.id)})
+
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(sorted(r["hostname"] for r in resp.data["data"]), ["dev0", "dev1"])
+		self.assertEqual(resp.data["summary"], {"total": 2, "reachable": 1, "unreachable": 1})
+
+	@patch("core.views.sweep")
+	def test_ping_bulk_by_ip_list_and_validation(self, mock_sweep):
+		mock_sweep.side_effect = self._fake_sweep
+		resp = self._post({"ips": ["192.168.1.1", "192.168.1.2"]})
+		self.assertEqual([r["ip"] for r in resp.data["data"]], ["192.168.1.1", "192.168.1.2"])
+
+		self.assertEqual(self._post({}).status_code, 400)
+		self.assertEqual(self._post({"ips": "10.0.0.1"}).status_code, 400)
+		self.assertEqual(self._post({"site": "not-a-uuid"}).status_code, 400)
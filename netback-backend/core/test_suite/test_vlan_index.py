@@ -0,0 +1,106 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import (
+	Area, Backup, Country, DeviceType, Manufacturer, NetworkDevice, Site, UserSystem, VlanMembership
+)
+from core.views import vlan_index
+
+HEADER = """VLAN Name                             Status    Ports
+---- -------------------------------- --------- -------------------------------
+"""
+
+
+def _vlan_brief(*rows):
+	return HEADER + "\n".join(f"{vlan:<4} {name:<32} active    {', '.join(ports)}" for vlan, name, ports in rows)
+
+
+class VlanIndexTests(TestCase):
+	def setUp(self):
+		m = Manufacturer.objects.create(name="Cisco", get_running_config="r", get_vlan_info="v", netmiko_type="cisco_ios")
+		dt = DeviceType.objects.create(name="Switch")
+		country = Country.objects.create(name="Perú")
+		self.lima = Area.objects.create(name="Core", site=Site.objects.create(name="Lima", country=country))
+		self.cusco = Area.objects.create(name="Core", site=Site.objects.create(name="Cusco", country=country))
+		self.sw1, self.sw2 = [
+			NetworkDevice.objects.create(
+				hostname=f"sw{i}", ipAddress=f"10.0.0.{i}", manufacturer=m, deviceType=dt, area=area,
+				customUser="u", customPass="p",
+			)
+			for i, area in ((1, self.lima), (2, self.cusco))
+		]
+		self.user = UserSystem.objects.create_user(username="v", email="v@a", password="p")
+
+	def _backup(self, device, *rows):
+		return Backup.objects.create(
+			device=device, runningConfig=str(rows), vlanBrief=_vlan_brief(*rows), checksum=str(hash(str(rows)))
+		)
+
+	def _get(self, **params):
+		req = APIRequestFactory().get("/api/vlans/", params)
+		force_authenticate(req, user=self.user)
+		return vlan_index(req)
+
+	def test_index_follows_latest_backup_per_device(self):
+		old = self._backup(self.sw1, (120, "Voz", ["Gi1/0/24"]))
+		new = self._backup(self.sw1, (130, "Datos", ["Gi1/0/24", "Gi1/0/1"]), (999, "Vacia", []))
+
+		rows = set(VlanMembership.objects.values_list("backup_id", "vlanId", "port"))
+		self.assertEqual(rows, {(new.id, 130, "Gi1/0/24"), (new.id, 130, "Gi1/0/1"), (new.id, 999, "")})
+
+		new.delete()
+		self.assertEqual(set(VlanMembership.objects.values_list("backup_id", "vlanId")), {(old.id, 120)})
+
+		self.sw1.delete()
+		self.assertFalse(VlanMembership.objects.exists())
+
+	def test_unparseable_latest_backup_clears_stale_rows(self):
+		self._backup(self.sw1, (120, "Voz", ["Gi1/0/24"]))
+		self.assertTrue(VlanMembership.objects.filter(device=self.sw1).exists())
+
+		Manufacturer.objects.filter(pk=self.sw1.manufacturer_id).update(name="Desconocido", netmiko_type="desconocido")
+		with self.assertLogs("core.vlan_index", level="WARNING"):
+			Backup.objects.create(
+				device=NetworkDevice.objects.get(pk=self.sw1.pk), runningConfig="x", vlanBrief="% Invalid input", checksum="x"
+			)
+
+		self.assertFalse(VlanMembership.objects.filter(device=self.sw1).exists())
+		self.assertEqual(self._get(vlan="120").data, [])
+
+	def test_lookups_by_vlan_port_device_and_site(self):
+		self._backup(self.sw1, (120, "Voz", ["Gi1/0/24", "Gi1/0/2"]), (1, "default", ["Gi1/0/3"]))
+		self._backup(self.sw2, (120, "Voz", []), (130, "Datos", ["Gi1/0/24"]))
+
+		with self.assertNumQueries(1):
+			by_vlan = self._get(vlan="120").data
+		self.assertEqual([e["device"]["hostname"] for e in by_vlan], ["sw1", "sw2"])
+		self.assertEqual(by_vlan[0]["ports"], ["Gi1/0/2", "Gi1/0/24"])
+		self.assertEqual(by_vlan[1]["ports"], [])
+
+		by_port = self._get(port="Gi1/0/24").data
+		self.assertEqual({(e["device"]["hostname"], e["vlanId"]) for e in by_port}, {("sw1", 120), ("sw2", 130)})
+
+		by_device = self._get(device=str(self.sw2.id)).data
+		self.assertEqual([e["vlanId"] for e in by_device], [120, 130])
+
+		summary = self._get(site=str(self.lima.site_id)).data
+		self.assertEqual([(e["vlanId"], e["devices"]) for e in summary], [(1, 1), (120, 1)])
+		summary = self._get().data
+		self.assertEqual({e["vlanId"]: e["devices"] for e in summary}, {1: 1, 120: 2, 130: 1})
+
+	def test_invalid_filters_and_rebuild(self):
+		self.assertEqual(self._get(vlan="abc").status_code, 400)
+		self.assertEqual(self._get(device="not-a-uuid").status_code, 400)
+
+		self._backup(self.sw1, (120, "Voz", ["Gi1/0/24"]))
+		self._backup(self.sw2, (130, "Datos", ["Gi1/0/1"]))
+		VlanMembership.objects.all().delete()
+
+		out = StringIO()
+		call_command("rebuild_vlan_index", stdout=out)
+
+		self.assertIn("2 equipos, 2 filas", out.getvalue())
+		self.assertEqual(VlanMembership.objects.count(), 2)
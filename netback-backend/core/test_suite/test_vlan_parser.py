@@ -0,0 +1,136 @@
+import json
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Backup, DeviceType, Manufacturer, NetworkDevice, UserSystem
+from core.network_util import vlan_parser
+from core.network_util.backup import backupDevice
+from core.network_util.comparison import compareBackups
+from core.network_util.vlan_parser import get_vlan_parser, parse_vlan_brief, register_vlan_parser
+from core.views import BackupViewSet, getDeviceVlans
+
+FIXTURES = Path(__file__).parent / "fixtures" / "vlan"
+
+
+class VlanParserGoldenTests(SimpleTestCase):
+	def test_golden_corpus(self):
+		cases = sorted(FIXTURES.glob("*.json"))
+		self.assertGreaterEqual(len(cases), 7)
+		for case_file in cases:
+			case = json.loads(case_file.read_text())
+			text = (FIXTURES / case["input"]).read_text()
+			with self.subTest(case=case_file.stem):
+				self.assertEqual(parse_vlan_brief(text, None, case["netmiko_type"]), case["expected"])
+
+	def test_bundled_cisco_keeps_wrapped_ports_and_empty_vlans(self):
+		text = (FIXTURES / "../../../network_util/config-cisco.txt").read_text()
+		parsed = parse_vlan_brief(text, "Cisco")
+
+		self.assertEqual(parsed["ports_vlan"]["1"], ["Gi1/0/23", "Gi1/0/25", "Gi1/0/26", "Gi1/0/27", "Gi1/0/28"])
+		self.assertEqual(parsed["ports_vlan"]["150"], [])
+		self.assertNotIn("1002", parsed["vlans"])
+
+
+class VlanParserRegistryTests(SimpleTestCase):
+	def test_netmiko_type_wins_over_legacy_name(self):
+		self.assertIs(get_vlan_parser("Cisco", "huawei"), vlan_parser.parse_vlan_huawei)
+		self.assertIs(get_vlan_parser("HP", None), vlan_parser.parse_vlan_generic)
+		self.assertIs(get_vlan_parser("huawei", "autodetect"), vlan_parser.parse_vlan_huawei)
+		self.assertIs(get_vlan_parser(None, "juniper"), vlan_parser.parse_vlan_juniper)
+		self.assertIs(get_vlan_parser(None, "mikrotik_routeros"), vlan_parser.parse_vlan_mikrotik)
+
+	def test_unknown_vendor_reports_error(self):
+		parsed = parse_vlan_brief("1 default", "Acme", "autodetect")
+		self.assertEqual(parsed["vlans"], {})
+		self.assertIn("autodetect", parsed["error"])
+
+	@override_settings(VLAN_PARSER_PLUGINS=["acme_vlans"])
+	def test_plugins_are_imported_once_and_can_register(self):
+		def fake_import(module):
+			register_vlan_parser("acme_os", names=["Acme"])(lambda text: {"vlans": {"1": text}, "ports_vlan": {}})
+
+		with patch.object(vlan_parser, "_plugins_loaded", False), \
+			patch.dict(vlan_parser._PARSERS), patch.dict(vlan_parser._ALIASES), \
+			patch.object(vlan_parser, "import_module", side_effect=fake_import) as mock_import:
+			self.assertEqual(parse_vlan_brief("x", "Acme")["vlans"], {"1": "x"})
+			self.assertEqual(parse_vlan_brief("y", None, "acme_os")["vlans"], {"1": "y"})
+			mock_import.assert_called_once_with("acme_vlans")
+
+		self.assertIsNone(get_vlan_parser("Acme"))
+
+
+CISCO_OLD = """VLAN Name                             Status    Ports
+---- -------------------------------- --------- -------------------------------
+1    default                          active    Gi1/0/1, Gi1/0/2
+30   Users                            active    Gi1/0/3
+"""
+CISCO_NEW = CISCO_OLD.replace("Gi1/0/1, Gi1/0/2", "Gi1/0/1").replace("Gi1/0/3", "Gi1/0/2, Gi1/0/3")
+
+
+class ParsedVlanStorageTests(TestCase):
+	def setUp(self):
+		m = Manufacturer.objects.create(name="Cisco", get_running_config="r", get_vlan_info="v", netmiko_type="cisco_ios")
+		dt = DeviceType.objects.create(name="Switch")
+		self.device = NetworkDevice.objects.create(
+			hostname="sw1", ipAddress="10.0.0.1", manufacturer=m, deviceType=dt, customUser="u", customPass="p"
+		)
+		self.viewer = UserSystem.objects.create_user(username="v", email="v@a", password="p")
+		self.viewer.role = "viewer"
+		self.viewer.save()
+
+	@patch("core.network_util.backup.ConnectHandler")
+	def test_vlans_parsed_once_at_ingest_and_reused_by_diffs(self, mock_handler):
+		for config, vlans in (("hostname a", CISCO_OLD), ("hostname b", CISCO_NEW)):
+			conn = MagicMock()
+			conn.send_command.side_effect = [config, vlans]
+			mock_handler.return_value.__enter__.return_value = conn
+			backupDevice(self.device)
+
+		stored = Backup.objects.order_by("backupTime").last().parsedVlan
+		self.assertEqual(stored["ports_vlan"]["30"], ["Gi1/0/2", "Gi1/0/3"])
+
+		with patch("core.network_util.backup.parse_vlan_brief") as parse:
+			result = compareBackups(self.device)
+			parse.assert_not_called()
+		self.assertEqual(result["changes"]["vlanInfo"]["ports_vlan"]["30"], {"assigned": ["Gi1/0/2"], "removed": []})
+
+	def test_legacy_backups_are_parsed_lazily_and_saved(self):
+		old = Backup.objects.create(device=self.device, runningConfig="a", vlanBrief=CISCO_OLD, checksum="1")
+		new = Backup.objects.create(device=self.device, runningConfig="b", vlanBrief=CISCO_NEW, checksum="2")
+		Backup.objects.filter(pk=new.pk).update(backupTime=old.backupTime.replace(year=old.backupTime.year + 1))
+
+		compareBackups(self.device)
+
+		self.assertEqual(Backup.objects.get(pk=old.pk).parsedVlan["ports_vlan"]["1"], ["Gi1/0/1", "Gi1/0/2"])
+		with patch("core.network_util.backup.parse_vlan_brief") as parse:
+			compareBackups(self.device)
+			parse.assert_not_called()
+
+	def test_vlan_endpoints_filter_by_vlan_and_port(self):
+		Backup.objects.create(device=self.device, runningConfig="a", vlanBrief=CISCO_NEW, checksum="1")
+		backup = Backup.objects.create(device=self.device, runningConfig="b", vlanBrief=CISCO_OLD, checksum="2")
+		Backup.objects.filter(pk=backup.pk).update(backupTime=backup.backupTime.replace(year=backup.backupTime.year + 1))
+		factory = APIRequestFactory()
+
+		req = factory.get(f"/api/networkdevice/{self.device.id}/vlans/", {"port": "Gi1/0/2"})
+		force_authenticate(req, user=self.viewer)
+		resp = getDeviceVlans(req, pk=self.device.id)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.data["backupId"], str(backup.id))
+		self.assertEqual(resp.data["ports_vlan"], {"1": ["Gi1/0/1", "Gi1/0/2"]})
+
+		req = factory.get(f"/api/backup/{backup.id}/vlans/", {"vlan": "30"})
+		force_authenticate(req, user=self.viewer)
+		resp = BackupViewSet.as_view({"get": "vlans"})(req, pk=backup.id)
+		self.assertEqual(resp.data["vlans"], {"30": "Users"})
+
+		req = factory.get("/api/networkdevice/x/vlans/")
+		force_authenticate(req, user=self.viewer)
+		other = NetworkDevice.objects.create(
+			hostname="sw2", ipAddress="10.0.0.2", manufacturer=self.device.manufacturer,
+			deviceType=self.device.deviceType, customUser="u", customPass="p",
+		)
+		self.assertEqual(getDeviceVlans(req, pk=other.id).status_code, 404)
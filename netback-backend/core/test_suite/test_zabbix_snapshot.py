@@ -0,0 +1,104 @@
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django_celery_beat.models import PeriodicTask
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import ClassificationRuleSet, UserSystem, ZabbixHostSnapshot
+from core.tasks import refreshZabbixSnapshot
+from core.views import from_zabbix_bulk_view
+from utils.classification_engine import invalidate_area_cache
+
+from .zabbix_stub import ZabbixStub
+
+
+class ZabbixSnapshotTests(TestCase):
+	def setUp(self):
+		invalidate_area_cache()
+		self.stub = ZabbixStub().start()
+		self.addCleanup(self.stub.stop)
+		for hostid in range(1, 6):
+			self.stub.add_host(hostid, clock=1000 + hostid)
+		self.settings_override = override_settings(
+			ZABBIX_URL=self.stub.url, ZABBIX_TOKEN="token", ZABBIX_HOST_CHUNK_SIZE=2
+		)
+		self.settings_override.enable()
+		self.addCleanup(self.settings_override.disable)
+
+		self.admin = UserSystem.objects.create_user(username="adm", email="adm@a", password="p")
+		self.admin.role = "admin"
+		self.admin.save()
+
+	def _classify(self, rules, **data):
+		rule_set = ClassificationRuleSet.objects.create(name=f"rs{ClassificationRuleSet.objects.count()}", rules=rules)
+		req = APIRequestFactory().post(
+			"/api/networkdevice/bulk/from-zabbix/", {"ruleSetId": str(rule_set.id), **data}, format="json"
+		)
+		force_authenticate(req, user=self.admin)
+		return from_zabbix_bulk_view(req)
+
+	def test_refresh_is_full_first_then_incremental(self):
+		result = refreshZabbixSnapshot()
+		self.assertEqual(result, {"full": True, "upserted": 5, "removed": 0})
+		self.assertEqual(ZabbixHostSnapshot.objects.count(), 5)
+
+		self.stub.update_host(2, clock=2000, ip="192.168.0.2", groups=("edge", "core"))
+		self.stub.delete_host(4, clock=2001)
+		self.stub.calls.clear()
+
+		result = refreshZabbixSnapshot()
+
+		# El host 5 se repite: su alta cae en el segundo de la marca de agua (inclusivo)
+		self.assertEqual(result, {"full": False, "upserted": 2, "removed": 1})
+		host = ZabbixHostSnapshot.objects.get(hostid="2")
+		self.assertEqual((host.ip, host.groups), ("192.168.0.2", ["core", "edge"]))
+		self.assertFalse(ZabbixHostSnapshot.objects.filter(hostid="4").exists())
+		self.assertEqual(
+			[sorted(c["params"].get("hostids")) for c in self.stub.calls if c["method"] == "host.get"],
+			[["2", "5"]],
+		)
+
+	def test_failed_single_request_refresh_keeps_snapshot(self):
+		refreshZabbixSnapshot()
+		self.stub.failing.add("host.get")
+
+		with override_settings(ZABBIX_HOST_CHUNK_SIZE=0):
+			result = refreshZabbixSnapshot(full=True)
+
+		self.assertIn("error", result)
+
+		self.assertEqual(ZabbixHostSnapshot.objects.count(), 5)
+
+	def test_classification_reads_snapshot_without_contacting_zabbix(self):
+		refreshZabbixSnapshot()
+		live = self._classify({}, source="zabbix").data
+		self.stub.calls.clear()
+
+		by_group = self._classify({"site": [{"value": "core", "assign": "Core", "searchIn": ["groups"]}]})
+		by_tag = self._classify({"manufacturer": [{"value": "cisco", "assign": "Cisco", "searchIn": ["tags"]}]})
+		from_snapshot = self._classify({}).data
+
+		self.assertEqual(self.stub.calls, [])
+		self.assertEqual(
+			sorted(live, key=lambda h: h["hostname"]), sorted(from_snapshot, key=lambda h: h["hostname"])
+		)
+		self.assertEqual({h["classification"]["site"] for h in by_group.data}, {"Core"})
+		self.assertEqual({h["manufacturer"]["name"] for h in by_tag.data}, {"Cisco"})
+
+	def test_incremental_flag_is_parsed_as_boolean(self):
+		refreshZabbixSnapshot()
+		self.stub.calls.clear()
+
+		self.assertEqual(len(self._classify({}, incremental="false").data), 5)
+		self.assertEqual(self.stub.calls, [])
+		self.assertEqual(self._classify({}, incremental="quizás").status_code, 400)
+
+	def test_snapshot_source_requires_data(self):
+		resp = self._classify({}, source="snapshot")
+		self.assertEqual(resp.status_code, 404)
+
+	def test_command_creates_interval_periodic_task(self):
+		call_command("create_zabbix_snapshot_periodic", minutes=5, stdout=None)
+		task = PeriodicTask.objects.get(name="refreshZabbixSnapshot")
+		self.assertEqual(task.task, "core.tasks.refreshZabbixSnapshot")
+		self.assertEqual(task.interval.every, 5)
+		self.assertTrue(task.enabled)
@@ -0,0 +1,152 @@
+import threading
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.models import ZabbixSyncState
+from utils.classification_engine import get_hosts_from_zabbix
+from utils.zabbix_manager import ZabbixManager
+
+
+def _host(hostid):
+	return {
+		"hostid": hostid,
+		"host": f"h{hostid}",
+		"name": f"H{hostid}",
+		"interfaces": [{"interfaceid": "1", "ip": f"10.0.0.{hostid}"}],
+		"groups": [{"name": "core"}],
+		"tags": [{"tag": "marca", "value": "cisco"}],
+	}
+
+
+class _FakeMethod:
+	def __init__(self, handler):
+		self.handler = handler
+		self.calls = []
+		self.lock = threading.Lock()
+
+	def get(self, **params):
+		with self.lock:
+			self.calls.append(params)
+		return self.handler(params)
+
+
+class FakeZabbixAPI:
+	def __init__(self, host_ids, audit=None):
+		self.hosts = {str(i): _host(str(i)) for i in host_ids}
+		self.audit = audit or []
+
+		def host_get(params):
+			ids = params.get("hostids") or list(self.hosts)
+			if params["output"] == ["hostid"]:
+				return [{"hostid": i} for i in ids]
+			return [self.hosts[i] for i in ids if i in self.hosts]
+
+		def audit_get(params):
+			records = [r for r in self.audit if r["clock"] >= params.get("time_from", 0)]
+			records.sort(key=lambda r: r["clock"], reverse=params.get("sortorder") == "DESC")
+			return records[: params["limit"]] if "limit" in params else records
+
+		self.host = _FakeMethod(host_get)
+		self.auditlog = _FakeMethod(audit_get)
+
+
+class ZabbixManagerChunkingTests(SimpleTestCase):
+	def test_chunked_fetch_returns_same_hosts_as_single_request(self):
+		zm = ZabbixManager(url="http://zbx", token="t")
+		zm.zapi = FakeZabbixAPI(range(1, 26))
+
+		single = zm.get_processed_hosts()
+		chunked = zm.get_processed_hosts(chunk_size=10, workers=3)
+
+		self.assertEqual(chunked, single)
+		detail_calls = [c for c in zm.zapi.host.calls if "hostids" in c]
+		self.assertEqual(sorted(len(c["hostids"]) for c in detail_calls), [5, 10, 10])
+
+	def test_host_changes_split_updates_and_deletes(self):
+		zm = ZabbixManager(url="http://zbx", token="t")
+		zm.zapi = FakeZabbixAPI([], audit=[
+			{"resourceid": "1", "action": "1", "clock": 100},
+			{"resourceid": "2", "action": "0", "clock": 110},
+			{"resourceid": "3", "action": "1", "clock": 120},
+			{"resourceid": "3", "action": "2", "clock": 130},
+			{"resourceid": "9", "action": "1", "clock": 50},
+		])
+
+		changed, deleted, clock = zm.get_host_changes(100)
+
+		self.assertEqual(sorted(changed), ["1", "2"])
+		self.assertEqual(deleted, ["3"])
+		self.assertEqual(clock, 130)
+
+
+@override_settings(ZABBIX_URL="http://zbx", ZABBIX_TOKEN="t", ZABBIX_HOST_CHUNK_SIZE=2)
+class IncrementalSyncTests(TestCase):
+	def test_first_sync_is_full_then_only_changed_hosts(self):
+		fake = FakeZabbixAPI(range(1, 6), audit=[{"resourceid": "1", "action": "0", "clock": 1000}])
+
+		def connect(zm):
+			zm.zapi = fake
+
+		with patch.object(ZabbixManager, "connect", connect):
+			full = get_hosts_from_zabbix(incremental=True)
+			state = ZabbixSyncState.objects.get(name="hosts")
+			self.assertEqual(len(full), 5)
+			self.assertEqual(state.lastSync, datetime.fromtimestamp(1000, tz=timezone.utc))
+
+			fake.audit.append({"resourceid": "4", "action": "1", "clock": 1010})
+			changed = get_hosts_from_zabbix(incremental=True)
+			# time_from es inclusivo: el segundo de la marca de agua se repite
+			self.assertEqual(sorted(h["hostid"] for h in changed), ["1", "4"])
+
+			fake.audit.clear()
+			self.assertEqual(get_hosts_from_zabbix(incremental=True), [])
+			# 1 (ids) + 3 bloques en la completa, 1 bloque en la incremental, ninguno sin cambios
+			self.assertEqual(len(fake.host.calls), 5)
+
+		state.refresh_from_db()
+		self.assertEqual(state.lastSync, datetime.fromtimestamp(1010, tz=timezone.utc))
+
+	@override_settings(ZABBIX_HOST_CHUNK_SIZE=0)
+	def test_failed_incremental_fetch_keeps_watermark(self):
+		fake = FakeZabbixAPI(range(1, 4), audit=[{"resourceid": "1", "action": "0", "clock": 1000}])
+
+		def connect(zm):
+			zm.zapi = fake
+
+		with patch.object(ZabbixManager, "connect", connect):
+			get_hosts_from_zabbix(incremental=True)
+			fake.audit.append({"resourceid": "2", "action": "1", "clock": 1010})
+
+			def unavailable(params):
+				raise Exception("Connection reset by peer")
+
+			fake.host = _FakeMethod(unavailable)
+			with self.assertRaises(ValueError):
+				get_hosts_from_zabbix(incremental=True)
+
+		# El host 2 no se descargó: la siguiente incremental debe volver a pedirlo
+		state = ZabbixSyncState.objects.get(name="hosts")
+		self.assertEqual(state.lastSync, datetime.fromtimestamp(1000, tz=timezone.utc))
+
+	def test_full_import_works_without_auditlog_access(self):
+		fake = FakeZabbixAPI(range(1, 4))
+
+		def denied(params):
+			raise Exception("No permissions to referred object or it does not exist!")
+
+		fake.auditlog = _FakeMethod(denied)
+
+		def connect(zm):
+			zm.zapi = fake
+
+		with patch.object(ZabbixManager, "connect", connect):
+			with self.assertLogs("utils.classification_engine", level="WARNING"):
+				hosts = get_hosts_from_zabbix(incremental=True)
+			self.assertEqual(len(hosts), 3)
+			self.assertIsNone(ZabbixSyncState.objects.get(name="hosts").lastSync)
+
+			# Sin marca de agua, la siguiente incremental vuelve a ser completa
+			with self.assertLogs("utils.classification_engine", level="WARNING"):
+				self.assertEqual(len(get_hosts_from_zabbix(incremental=True)), 3)
@@ -0,0 +1,109 @@
+"""Servidor HTTP mínimo que imita la API JSON-RPC de Zabbix para los tests.
+
+Implementa solo lo que usa ZabbixManager: apiinfo.version, host.get y
+auditlog.get. Los hosts y el auditlog son editables durante el test.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_host(hostid, ip=None, groups=("core",), tag="cisco"):
+	return {
+		"hostid": str(hostid),
+		"host": f"host-{hostid}",
+		"name": f"Host {hostid}",
+		"interfaces": [{"interfaceid": "1", "ip": ip or f"10.0.0.{hostid}"}],
+		"groups": [{"name": g} for g in groups],
+		"tags": [{"tag": "marca", "value": tag}],
+	}
+
+
+class ZabbixStub:
+	def __init__(self, version="7.0.0"):
+		self.version = version
+		self.hosts = {}
+		self.audit = []
+		self.calls = []
+		# Métodos que responden con error JSON-RPC (p. ej. {"host.get"})
+		self.failing = set()
+		self._server = None
+
+	# -- datos -----------------------------------------------------------
+	def add_host(self, hostid, clock=None, **kwargs):
+		self.hosts[str(hostid)] = make_host(hostid, **kwargs)
+		if clock is not None:
+			self.audit.append({"resourceid": str(hostid), "action": "0", "clock": str(clock)})
+
+	def update_host(self, hostid, clock, **kwargs):
+		self.hosts[str(hostid)] = make_host(hostid, **kwargs)
+		self.audit.append({"resourceid": str(hostid), "action": "1", "clock": str(clock)})
+
+	def delete_host(self, hostid, clock):
+		self.hosts.pop(str(hostid), None)
+		self.audit.append({"resourceid": str(hostid), "action": "2", "clock": str(clock)})
+
+	def methods(self):
+		return [c["method"] for c in self.calls]
+
+	# -- JSON-RPC --------------------------------------------------------
+	def _host_get(self, params):
+		ids = params.get("hostids")
+		hosts = [self.hosts[i] for i in ids if i in self.hosts] if ids else list(self.hosts.values())
+		if params.get("output") == ["hostid"]:
+			return [{"hostid": h["hostid"]} for h in hosts]
+		return hosts
+
+	def _auditlog_get(self, params):
+		resource = params.get("filter", {}).get("resourcetype")
+		records = [
+			r for r in self.audit
+			if int(r["clock"]) >= int(params.get("time_from", 0))
+			and (resource is None or resource == 4)
+		]
+		records.sort(key=lambda r: int(r["clock"]), reverse=params.get("sortorder") == "DESC")
+		return records[: params["limit"]] if "limit" in params else records
+
+	def dispatch(self, payload):
+		method, params = payload["method"], payload.get("params") or {}
+		self.calls.append({"method": method, "params": params})
+		handlers = {
+			"apiinfo.version": lambda p: self.version,
+			"host.get": self._host_get,
+			"auditlog.get": self._auditlog_get,
+		}
+		if method in self.failing:
+			return {"jsonrpc": "2.0", "error": {"code": -32500, "message": "Application error.", "data": method}, "id": payload.get("id")}
+		if method not in handlers:
+			return {"jsonrpc": "2.0", "error": {"code": -32601, "message": "Method not found.", "data": method}, "id": payload.get("id")}
+		return {"jsonrpc": "2.0", "result": handlers[method](params), "id": payload.get("id")}
+
+	# -- servidor --------------------------------------------------------
+	def start(self):
+		stub = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def log_message(self, *args):
+				pass
+
+			def do_POST(self):
+				length = int(self.headers.get("Content-Length", 0))
+				body = json.dumps(stub.dispatch(json.loads(self.rfile.read(length)))).encode()
+				self.send_response(200)
+				self.send_header("Content-Type", "application/json-rpc")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+		self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+		threading.Thread(target=self._server.serve_forever, daemon=True).start()
+		return self
+
+	def stop(self):
+		if self._server:
+			self._server.shutdown()
+			self._server.server_close()
+
+	@property
+	def url(self):
+		return f"http://127.0.0.1:{self._server.server_port}"
@@ -1,37 +1,56 @@
+import json
 import re
 import shutil
 import subprocess
 from datetime import time
 
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from django.db import IntegrityError
-from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, IntegrityError
+from django.db.models import Count, Max, Q
 
-from rest_framework import status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
-from utils.classification_engine import (HostClassifier, get_hosts_from_csv, get_hosts_from_zabbix)
+from utils.classification_engine import (HostClassifier, build_catalog_cache, get_hosts_from_csv,
+                                         get_hosts_from_zabbix, iter_hosts_from_csv,
+                                         resolve_catalog_refs)
 from utils.env import get_zabbix_token, get_zabbix_url
 from utils.zabbix_manager import ZabbixManager
 
+from .bulk_import import bulk_ingest_hosts
+from .change_report import (OUTPUT_FORMATS, changed_devices, iter_change_report, stream_html,
+                            stream_json, stream_ndjson, stream_zip)
+from .config_search import candidate_backups, compile_query, search_configs
 from .models import (Area, Backup, BackupDiff, BackupSchedule, BackupStatus,
-                     ClassificationRuleSet, Country, DeviceType, Manufacturer,
-                     NetworkDevice, Site, UserSystem, VaultCredential)
-from .network_util.backup import backupDevice
+                     ClassificationRuleSet, ComplianceResult, ComplianceRule,
+                     Country, DeviceType, Manufacturer,
+                     NetworkDevice, Site, UserSystem, VaultCredential, VlanMembership)
+from .network_util.backup import backupDevice, get_parsed_vlan
 from .network_util.comparison import compareBackups
 from .network_util.comparison import compareSpecificBackups as specificCompareBackups
 from .network_util.executor import executeCommandOnDevice
+from .network_util.timeline import build_timeline
 from .permissions import IsAdmin, IsOperator, IsViewer
+from .renderers import NDJSONRenderer
 from .serializers import (AreaSerializer, BackupDiffSerializer,
                           BackupSerializer, ClassificationRuleSetSerializer,
+                          ComplianceRuleSerializer,
                           CountrySerializer, DeviceTypeSerializer,
                           ManufacturerSerializer, NetworkDeviceSerializer,
                           SiteSerializer, UserSystemSerializer,
                           VaultCredentialSerializer)
+from .tasks import evaluateCompliance
+from .zabbix_snapshot import get_hosts_from_snapshot, snapshot_available
 from utils.ping import ping_ip
+from utils.reachability import sweep
 
 
 # **********************************************************
@@ -173,7 +192,7 @@ class BackupViewSet(viewsets.ModelViewSet):
     serializer_class = BackupSerializer
 
     def get_permissions(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "vlans"]:
             return [IsViewer()]
         elif self.action in ["create"]:
             return [IsOperator()]
@@ -181,9 +200,39 @@ class BackupViewSet(viewsets.ModelViewSet):
             return [IsAdmin()]
         return super().get_permissions()
 
+    @action(detail=True, methods=["get"])
+    def vlans(self, request, pk=None):
+        """VLANs del respaldo (parseadas al ingerir). Filtros: ?vlan=10,20 y ?port=Gi1/0/1"""
+        return Response(_vlan_payload(self.get_object(), request))
+
+
+def _vlan_payload(backup, request):
+    parsed = get_parsed_vlan(backup)
+    names = parsed.get("vlans", {})
+    ports = parsed.get("ports_vlan", {})
+
+    wanted = {v.strip() for v in request.query_params.get("vlan", "").split(",") if v.strip()}
+    port = request.query_params.get("port")
+    ids = [
+        vlan_id
+        for vlan_id in sorted(set(names) | set(ports), key=lambda v: (len(v), v))
+        if (not wanted or vlan_id in wanted) and (not port or port in ports.get(vlan_id, []))
+    ]
+
+    payload = {
+        "backupId": str(backup.id),
+        "device": backup.device.hostname,
+        "backupTime": backup.backupTime,
+        "vlans": {vlan_id: names.get(vlan_id) for vlan_id in ids},
+        "ports_vlan": {vlan_id: ports.get(vlan_id, []) for vlan_id in ids},
+    }
+    if "error" in parsed:
+        payload["error"] = parsed["error"]
+    return payload
+
 
 class BackupDiffViewSet(viewsets.ModelViewSet):
-    queryset = BackupDiff.objects.all()
+    queryset = BackupDiff.objects.select_related("backupOld", "backupNew")
     serializer_class = BackupDiffSerializer
     permission_classes = [IsAuthenticated]
 
@@ -196,6 +245,100 @@ class ClassificationRuleSetViewSet(viewsets.ModelViewSet):
     serializer_class = ClassificationRuleSetSerializer
     permission_classes = [IsAdmin]
 
+
+# **********************************************************
+# ✅ Cumplimiento de configuración
+# **********************************************************
+class ComplianceRuleViewSet(viewsets.ModelViewSet):
+    queryset = ComplianceRule.objects.select_related("manufacturer").order_by("name")
+    serializer_class = ComplianceRuleSerializer
+
+    def get_permissions(self):
+        if self.action in ["list", "retrieve"]:
+            return [IsViewer()]
+        return [IsAdmin()]
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def compliance_results(request):
+    """
+    Resultados guardados (sin evaluar nada): ?device=<uuid> -> reglas del equipo;
+    ?rule=<uuid> -> equipos evaluados por la regla (?passed=0 solo los que fallan);
+    sin filtros, un resumen por regla para el tablero.
+    """
+    params = request.query_params
+    results = ComplianceResult.objects.filter(rule__enabled=True)
+    if params.get("passed") in ("0", "false"):
+        results = results.filter(passed=False)
+    elif params.get("passed") in ("1", "true"):
+        results = results.filter(passed=True)
+
+    try:
+        if params.get("device"):
+            rows = results.filter(device_id=params["device"]).select_related("rule").order_by("rule__name")
+            return Response([
+                {
+                    "rule": {"id": str(r.rule_id), "name": r.rule.name, "kind": r.rule.kind, "severity": r.rule.severity},
+                    "passed": r.passed,
+                    "details": r.details,
+                    "backupId": str(r.backup_id),
+                    "evaluatedAt": r.evaluatedAt,
+                }
+                for r in rows
+            ])
+        if params.get("rule"):
+            rows = results.filter(rule_id=params["rule"]).select_related("device").order_by("device__hostname")
+            return Response([
+                {
+                    "device": {"id": str(r.device_id), "hostname": r.device.hostname, "ipAddress": r.device.ipAddress},
+                    "passed": r.passed,
+                    "details": r.details,
+                    "backupId": str(r.backup_id),
+                    "evaluatedAt": r.evaluatedAt,
+                }
+                for r in rows
+            ])
+    except ValidationError:
+        return Response({"error": "Identificador inválido en los filtros."}, status=400)
+
+    rules = (
+        ComplianceRule.objects.filter(enabled=True)
+        .annotate(
+            passed=Count("results", filter=Q(results__passed=True)),
+            failed=Count("results", filter=Q(results__passed=False)),
+        )
+        .values("id", "name", "kind", "severity", "passed", "failed")
+        .order_by("name")
+    )
+    devices = results.values("device_id").annotate(failed=Count("id", filter=Q(passed=False)))
+    return Response({
+        "rules": list(rules),
+        "devices": {
+            "evaluated": devices.count(),
+            "noncompliant": devices.filter(failed__gt=0).count(),
+        },
+    })
+
+
+@api_view(["POST"])
+@permission_classes([IsOperator])
+def compliance_run(request):
+    """Encola la evaluación: {"devices": [uuid, ...] (opcional), "force": false}. Sin force solo equipos con cambios."""
+    device_ids = request.data.get("devices")
+    if device_ids is not None:
+        try:
+            device_ids = [str(i) for i in serializers.ListField(child=serializers.UUIDField()).to_internal_value(device_ids)]
+        except serializers.ValidationError:
+            return Response({"error": "'devices' debe ser una lista de UUID."}, status=400)
+    try:
+        force = serializers.BooleanField().to_internal_value(request.data.get("force", False))
+    except serializers.ValidationError:
+        return Response({"error": "'force' debe ser un booleano."}, status=400)
+    task = evaluateCompliance.delay(device_ids, force)
+    return Response({"taskId": task.id}, status=status.HTTP_202_ACCEPTED)
+
+
 # **********************************************************
 # 🏥 Vista de Salud del Backend
 # **********************************************************
@@ -289,6 +432,237 @@ def getBackupHistory(request, pk):
         return Response({"error": "Device not found"}, status=404)
 
 
+# **********************************************************
+# 🕒 Línea de tiempo de cambios
+# **********************************************************
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def getDeviceTimeline(request, pk):
+    """
+    Cambios por sección y por línea entre respaldos consecutivos del dispositivo.
+    Rango: ?since= / ?until= (ISO 8601); como máximo los últimos ?limit= (TIMELINE_MAX_BACKUPS).
+    """
+    if not NetworkDevice.objects.filter(pk=pk).exists():
+        return Response({"error": "Device not found"}, status=404)
+
+    params = request.query_params
+    backups = Backup.objects.filter(device_id=pk)
+    for key, lookup in (("since", "backupTime__gte"), ("until", "backupTime__lte")):
+        if params.get(key):
+            value = _query_datetime(params[key])
+            if value is None:
+                return Response({"error": f"'{key}' debe ser una fecha ISO 8601."}, status=400)
+            backups = backups.filter(**{lookup: value})
+    try:
+        limit = min(int(params.get("limit", settings.TIMELINE_MAX_BACKUPS)), settings.TIMELINE_MAX_BACKUPS)
+    except ValueError:
+        return Response({"error": "'limit' debe ser un número."}, status=400)
+
+    # Los más recientes dentro del rango, en orden cronológico
+    recent = list(backups.order_by("-backupTime")[:max(limit, 1)])
+    return Response(build_timeline(reversed(recent)))
+
+
+def _query_datetime(value):
+    """Fecha ISO 8601 de un parámetro (las ingenuas, en la zona horaria del proyecto); None si no es válida."""
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+# **********************************************************
+# 🔌 VLANs del último respaldo
+# **********************************************************
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def getDeviceVlans(request, pk):
+    """VLANs del último respaldo de un dispositivo. Filtros: ?vlan=10,20 y ?port=Gi1/0/1"""
+    backup = (
+        Backup.objects.select_related("device__manufacturer")
+        .filter(device_id=pk)
+        .order_by("-backupTime")
+        .first()
+    )
+    if backup is None:
+        if not NetworkDevice.objects.filter(pk=pk).exists():
+            return Response({"error": "Device not found"}, status=404)
+        return Response({"error": "No backups for this device"}, status=404)
+    return Response(_vlan_payload(backup, request))
+
+
+# **********************************************************
+# 🔌 Índice de VLANs de la red
+# **********************************************************
+# Filtros de ubicación (?device=, ?area=, ...) -> lookup válido sobre VlanMembership y Backup
+LOCATION_FILTERS = {
+    "device": "device_id",
+    "area": "device__area_id",
+    "site": "device__area__site_id",
+    "country": "device__area__site__country_id",
+}
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def vlan_index(request):
+    """
+    Consulta el índice de VLANs (último respaldo de cada equipo):
+    ?vlan=120 (o 10,20) -> equipos y puertos; ?port=Gi1/0/24 -> dónde está asignado;
+    ?device=<uuid> -> VLANs del equipo. Sin vlan/port/device devuelve cuántos equipos llevan cada VLAN.
+    """
+    params = request.query_params
+    try:
+        vlans = [int(v) for v in params.get("vlan", "").split(",") if v.strip()]
+    except ValueError:
+        return Response({"error": "'vlan' debe ser un número o una lista separada por comas."}, status=400)
+    port = params.get("port", "").strip()
+
+    memberships = VlanMembership.objects.all()
+    if vlans:
+        memberships = memberships.filter(vlanId__in=vlans)
+    if port:
+        memberships = memberships.filter(port=port)
+
+    try:
+        memberships = memberships.filter(
+            **{lookup: params[key] for key, lookup in LOCATION_FILTERS.items() if params.get(key)}
+        )
+        if not (vlans or port or params.get("device")):
+            summary = (
+                memberships.values("vlanId")
+                .annotate(vlanName=Max("vlanName"), devices=Count("device", distinct=True))
+                .order_by("vlanId")
+            )
+            return Response(list(summary))
+
+        rows = memberships.values(
+            "device_id", "device__hostname", "device__ipAddress", "vlanId", "vlanName", "port",
+            "backup_id", "backup__backupTime",
+        ).order_by("device__hostname", "vlanId", "port")
+        grouped = {}
+        for row in rows:
+            entry = grouped.setdefault((row["device_id"], row["vlanId"]), {
+                "device": {
+                    "id": str(row["device_id"]),
+                    "hostname": row["device__hostname"],
+                    "ipAddress": row["device__ipAddress"],
+                },
+                "vlanId": row["vlanId"],
+                "vlanName": row["vlanName"],
+                "ports": [],
+                "backupId": str(row["backup_id"]),
+                "backupTime": row["backup__backupTime"],
+            })
+            if row["port"]:
+                entry["ports"].append(row["port"])
+    except ValidationError:
+        return Response({"error": "Identificador inválido en los filtros."}, status=400)
+
+    return Response(list(grouped.values()))
+
+
+# **********************************************************
+# 🔎 Búsqueda en configuraciones
+# **********************************************************
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def search_configs_view(request):
+    """
+    Busca ?q= en el último respaldo de cada equipo (?all=1: en todos los respaldos).
+    ?regex=1 trata q como expresión regular, ?ignore_case=1 ignora mayúsculas; admite los
+    filtros de ubicación de vlan_index. Responde en NDJSON: una línea por respaldo con coincidencias.
+    """
+    params = request.query_params
+    query = params.get("q", "")
+    regex = params.get("regex") in ("1", "true")
+    ignore_case = params.get("ignore_case") in ("1", "true")
+    all_backups = params.get("all") in ("1", "true")
+
+    try:
+        compile_query(query, regex, ignore_case)
+        filters = {lookup: params[key] for key, lookup in LOCATION_FILTERS.items() if params.get(key)}
+        # Se construye aquí para validar los filtros antes de empezar a responder
+        candidate_backups(query, regex, ignore_case, all_backups, filters)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+    except ValidationError:
+        return Response({"error": "Identificador inválido en los filtros."}, status=400)
+
+    return StreamingHttpResponse(
+        _stream_search(query, regex, ignore_case, all_backups, filters),
+        content_type="application/x-ndjson",
+    )
+
+
+def _stream_search(query, regex, ignore_case, all_backups, filters):
+    """Una línea JSON por respaldo; un error de la base de datos a mitad se emite como {"error": ...}."""
+    try:
+        for result in search_configs(query, regex, ignore_case, all_backups, filters):
+            yield json.dumps(result) + "\n"
+    except DatabaseError as e:
+        yield json.dumps({"error": f"Error en la búsqueda: {str(e)}"}) + "\n"
+
+
+# **********************************************************
+# 🗞️ Informe de cambios de la red
+# **********************************************************
+REPORT_CONTENT_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "html": "text/html; charset=utf-8",
+    "zip": "application/zip",
+}
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def change_report_view(request):
+    """
+    Equipos cuya configuración cambió desde ?since= (hasta ?until=, ISO 8601) con el diff
+    entre el último respaldo anterior a since y el último del rango. Admite los filtros de
+    ubicación de vlan_index. ?output=json (por defecto), ndjson, html o zip; siempre en streaming.
+    """
+    params = request.query_params
+    if not params.get("since"):
+        return Response({"error": "'since' es obligatorio."}, status=400)
+    since = _query_datetime(params["since"])
+    until = _query_datetime(params["until"]) if params.get("until") else None
+    if since is None or (params.get("until") and until is None):
+        return Response({"error": "'since' y 'until' deben ser fechas ISO 8601."}, status=400)
+    output = params.get("output", "json")
+    if output not in OUTPUT_FORMATS:
+        return Response({"error": f"'output' debe ser uno de: {', '.join(OUTPUT_FORMATS)}."}, status=400)
+
+    try:
+        filters = {lookup: params[key] for key, lookup in LOCATION_FILTERS.items() if params.get(key)}
+        # Se evalúa aquí para validar los filtros antes de empezar a responder
+        changed_devices(since, until, filters).exists()
+    except ValidationError:
+        return Response({"error": "Identificador inválido en los filtros."}, status=400)
+
+    reports = _guarded_reports(since, until, filters)
+    if output == "ndjson":
+        body = stream_ndjson(reports)
+    else:
+        body = {"json": stream_json, "html": stream_html, "zip": stream_zip}[output](reports, since, until)
+    response = StreamingHttpResponse(body, content_type=REPORT_CONTENT_TYPES[output])
+    if output == "zip":
+        response["Content-Disposition"] = f'attachment; filename="cambios-{since:%Y%m%d-%H%M}.zip"'
+    return response
+
+
+def _guarded_reports(since, until, filters):
+    """Un error de la base de datos a mitad del informe llega a la salida como {"error": ...}."""
+    try:
+        yield from iter_change_report(since, until, filters)
+    except DatabaseError as e:
+        yield {"error": f"Error al generar el informe: {str(e)}"}
+
+
 # **********************************************************
 # 📂 Respaldo de Dispositivos
 # **********************************************************
@@ -298,7 +672,8 @@ def backupDeviceView(request, pk):
     """Realizar un respaldo de un dispositivo."""
     try:
         device = NetworkDevice.objects.get(pk=pk)
-        result = backupDevice(device)
+        # El respaldo manual siempre descarga la configuración completa
+        result = backupDevice(device, use_change_marker=False)
         return Response(result)
     except NetworkDevice.DoesNotExist:
         return Response({"error": "Device not found"}, status=404)
@@ -463,6 +838,69 @@ def ping_device(request):
         return Response({"status": "error", "message": f"⚠ Error al ejecutar ping: {str(e)}"}, status=500)
 
 
+# Filtros aceptados por ping_bulk -> lookup sobre NetworkDevice
+PING_BULK_FILTERS = {
+    "devices": "id__in",
+    "area": "area_id",
+    "site": "area__site_id",
+    "country": "area__site__country_id",
+    "manufacturer": "manufacturer_id",
+    "deviceType": "deviceType_id",
+}
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def ping_bulk(request):
+    """
+    Verifica la alcanzabilidad de muchos equipos a la vez (TCP al puerto SSH + ICMP).
+    Recibe una lista "ips" o un filtro de equipos (devices, area, site, country, ...).
+    """
+    ips = request.data.get("ips")
+    filters = {
+        lookup: request.data[key] for key, lookup in PING_BULK_FILTERS.items() if request.data.get(key)
+    }
+
+    if ips is not None:
+        if not isinstance(ips, list) or not all(isinstance(ip, str) for ip in ips):
+            return Response({"status": "error", "message": "'ips' debe ser una lista de direcciones."}, status=400)
+        targets = [{"ip": ip} for ip in ips]
+    elif filters:
+        try:
+            devices = NetworkDevice.objects.filter(**filters).values("id", "hostname", "ipAddress")
+            targets = [
+                {"ip": d["ipAddress"], "device": str(d["id"]), "hostname": d["hostname"]} for d in devices
+            ]
+        except (ValidationError, ValueError, TypeError):
+            return Response({"status": "error", "message": "Filtro de equipos inválido."}, status=400)
+    else:
+        return Response(
+            {"status": "error", "message": "Debes proporcionar 'ips' o un filtro de equipos."}, status=400
+        )
+
+    if len(targets) > settings.REACHABILITY_MAX_TARGETS:
+        return Response(
+            {"status": "error", "message": f"Máximo {settings.REACHABILITY_MAX_TARGETS} direcciones por solicitud."},
+            status=400,
+        )
+
+    results = sweep(
+        [t["ip"] for t in targets],
+        port=settings.REACHABILITY_PORT,
+        timeout=settings.REACHABILITY_TIMEOUT,
+        concurrency=settings.REACHABILITY_CONCURRENCY,
+    )
+    for target, result in zip(targets, results):
+        result.update({k: v for k, v in target.items() if k != "ip"})
+
+    reachable = sum(1 for r in results if r["reachable"])
+    return Response({
+        "status": "success",
+        "data": results,
+        "summary": {"total": len(results), "reachable": reachable, "unreachable": len(results) - reachable},
+    })
+
+
 # **********************************************************
 # 💻 Gestion de Celery (Automatisacion de respaldos)
 # **********************************************************
@@ -573,6 +1011,8 @@ def from_zabbix_bulk_view(request):
     """
     Clasifica hosts directamente obtenidos desde Zabbix usando un conjunto de reglas.
     Agrega el ID de area, vaultCredential, manufacturer y deviceType con estructura ordenada.
+    Por defecto usa la copia local (ZabbixHostSnapshot) si existe; "source": "zabbix"
+    consulta en vivo y "incremental": true solo trae los hosts cambiados desde la última sincronización.
     """
     rule_set_id = request.data.get("ruleSetId")
     if not rule_set_id:
@@ -589,39 +1029,45 @@ def from_zabbix_bulk_view(request):
             status=status.HTTP_404_NOT_FOUND,
         )
 
+    # Como el flag "bulk": "false"/"0" no activan el modo incremental (devolvería solo los cambios)
     try:
-        hosts = get_hosts_from_zabbix()
-    except ValueError as e:
-        return Response({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-
-    classifier = HostClassifier(rule_set.rules)
-    classified = classifier.classify_all(hosts)
-
-    for host in classified:
-        # Vault Credential
-        host["vaultCredential"] = (
-            str(rule_set.vaultCredential.id) if rule_set.vaultCredential else None
+        incremental = serializers.BooleanField().to_internal_value(request.data.get("incremental", False))
+    except serializers.ValidationError:
+        return Response(
+            {"detail": "'incremental' debe ser un booleano."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    source = request.data.get("source")
+    if source not in (None, "snapshot", "zabbix"):
+        return Response(
+            {"detail": "'source' debe ser 'snapshot' o 'zabbix'."},
+            status=status.HTTP_400_BAD_REQUEST,
         )
+    if source is None:
+        source = "snapshot" if not incremental and snapshot_available() else "zabbix"
 
-        # Manufacturer
-        name_manufacturer = host.get("manufacturer", "Desconocido")
-        manufacturer_obj = Manufacturer.objects.filter(
-            name__iexact=name_manufacturer
-        ).first()
-        host["manufacturer"] = {
-            "id": str(manufacturer_obj.id) if manufacturer_obj else None,
-            "name": name_manufacturer,
-        }
+    if source == "snapshot":
+        hosts = get_hosts_from_snapshot()
+        if not hosts:
+            return Response(
+                {"detail": "La copia local de Zabbix está vacía; use 'source': 'zabbix'."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+    else:
+        try:
+            hosts = get_hosts_from_zabbix(incremental=incremental)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-        # Device Type
-        name_device_type = host.get("deviceType", "Desconocido")
-        device_type_obj = DeviceType.objects.filter(
-            name__iexact=name_device_type
-        ).first()
-        host["deviceType"] = {
-            "id": str(device_type_obj.id) if device_type_obj else None,
-            "name": name_device_type,
-        }
+    classifier = HostClassifier(rule_set.rules)
+    classified = classifier.classify_all(
+        hosts,
+        workers=settings.CLASSIFIER_WORKERS,
+        chunk_size=settings.CLASSIFIER_CHUNK_SIZE,
+    )
+
+    vault_id = str(rule_set.vaultCredential.id) if rule_set.vaultCredential else None
+    resolve_catalog_refs(classified, build_catalog_cache(), vault_id)
 
     return Response(classified, status=status.HTTP_200_OK)
 
@@ -631,9 +1077,11 @@ def from_zabbix_bulk_view(request):
 # **********************************************************
 @api_view(["POST"])
 @permission_classes([IsAdmin])
+@renderer_classes([*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer])
 def from_csv_bulk_view(request):
     """
     Clasifica hosts subidos vía archivo CSV usando un conjunto de reglas.
+    Igual que la vista de Zabbix, resuelve manufacturer/deviceType y vaultCredential.
     """
     rule_set_id = request.data.get("ruleSetId")
     csv_file = request.FILES.get("file")
@@ -657,6 +1105,17 @@ def from_csv_bulk_view(request):
             status=status.HTTP_404_NOT_FOUND,
         )
 
+    vault_id = str(rule_set.vaultCredential.id) if rule_set.vaultCredential else None
+
+    if _wants_ndjson(request):
+        # Cachés cargadas aquí: el generador corre después de devolver la respuesta
+        classifier = HostClassifier(rule_set.rules)
+        catalog = build_catalog_cache()
+        return StreamingHttpResponse(
+            _stream_classified_csv(csv_file, classifier, catalog, vault_id),
+            content_type="application/x-ndjson",
+        )
+
     try:
         hosts = get_hosts_from_csv(csv_file)
     except Exception as e:
@@ -666,11 +1125,39 @@ def from_csv_bulk_view(request):
         )
 
     classifier = HostClassifier(rule_set.rules)
-    classified = classifier.classify_all(hosts)
+    classified = classifier.classify_all(
+        hosts,
+        workers=settings.CLASSIFIER_WORKERS,
+        chunk_size=settings.CLASSIFIER_CHUNK_SIZE,
+    )
+
+    resolve_catalog_refs(classified, build_catalog_cache(), vault_id)
 
     return Response(classified, status=status.HTTP_200_OK)
 
 
+def _wants_ndjson(request):
+    """`?stream=1` o `Accept: application/x-ndjson` piden la respuesta en streaming."""
+    if request.query_params.get("stream") in ("1", "true"):
+        return True
+    return "application/x-ndjson" in request.headers.get("Accept", "")
+
+
+def _stream_classified_csv(csv_file, classifier, catalog, vault_id):
+    """
+    Lee, clasifica y emite el CSV por bloques: una línea JSON por host.
+    Un error de lectura a mitad del archivo se emite como línea {"error": ...}.
+    """
+    try:
+        for chunk in classifier.iter_classify(
+            iter_hosts_from_csv(csv_file), chunk_size=settings.CLASSIFIER_CHUNK_SIZE
+        ):
+            resolve_catalog_refs(chunk, catalog, vault_id)
+            yield "".join(json.dumps(host) + "\n" for host in chunk)
+    except Exception as e:
+        yield json.dumps({"error": f"Error procesando CSV: {str(e)}"}) + "\n"
+
+
 # **********************************************************
 # Salvar Host clasificados
 # **********************************************************
@@ -679,8 +1166,29 @@ def from_csv_bulk_view(request):
 def bulk_save_classified_hosts(request):
     """
     Guarda múltiples hosts clasificados como NetworkDevice en la base de datos.
+
+    Con `"bulk": true` (o automáticamente a partir de BULK_INGEST_THRESHOLD hosts)
+    usa la ingesta por lotes de `core.bulk_import`, que informa los errores por
+    fila con la misma estructura.
     """
     hosts_data = request.data.get("hosts", [])
+    bulk = request.data.get("bulk")
+    if bulk is None:
+        bulk = len(hosts_data) >= settings.BULK_INGEST_THRESHOLD
+    else:
+        # Misma interpretación que un BooleanField de DRF: "false", "0", "no"... son falsos
+        try:
+            bulk = serializers.BooleanField().to_internal_value(bulk)
+        except serializers.ValidationError:
+            return Response({"error": "'bulk' debe ser un booleano."}, status=400)
+
+    if bulk:
+        created, errors = bulk_ingest_hosts(hosts_data, chunk_size=settings.BULK_INGEST_CHUNK_SIZE)
+        return Response(
+            {"created": created, "errors": errors},
+            status=status.HTTP_201_CREATED if created > 0 else status.HTTP_400_BAD_REQUEST,
+        )
+
     created = 0
     errors = []
 
@@ -0,0 +1,78 @@
+"""
+Índice de VLANs y puertos de toda la red (VlanMembership).
+
+Se construye a partir del `parsedVlan` del último respaldo de cada equipo y se
+actualiza por dispositivo cada vez que llega un respaldo nuevo (señales de
+Backup), así "¿qué equipos llevan la VLAN 120?" o "¿dónde está Gi1/0/24?" son
+consultas indexadas en vez de parsear todos los respaldos.
+"""
+import logging
+
+from django.db import transaction
+
+from .models import Backup, VlanMembership
+from .network_util.backup import get_parsed_vlan, latest_backups
+
+logger = logging.getLogger(__name__)
+
+
+def _rows(backup, parsed):
+    names = parsed.get("vlans", {})
+    ports = parsed.get("ports_vlan", {})
+    rows = {}
+    for vlan in set(names) | set(ports):
+        try:
+            vlan_id = int(vlan)
+        except (TypeError, ValueError):
+            continue
+        name = (names.get(vlan) or "")[:128]
+        for port in ports.get(vlan) or [""]:
+            key = (vlan_id, port[:64])
+            rows[key] = VlanMembership(
+                device_id=backup.device_id, backup=backup, vlanId=vlan_id, vlanName=name, port=key[1]
+            )
+    return list(rows.values())
+
+
+def index_backup(backup):
+    """Reemplaza las filas del equipo con las VLANs de `backup`. Devuelve cuántas quedaron."""
+    parsed = get_parsed_vlan(backup)
+    if "error" in parsed:
+        # Salida de VLANs ilegible o fabricante sin parser: las filas de un respaldo anterior
+        # ya no describen el equipo, se quitan en lugar de mostrarlas como vigentes
+        logger.warning(f"⚠️ VLANs no indexadas para el respaldo {backup.pk}: {parsed['error']}")
+        VlanMembership.objects.filter(device_id=backup.device_id).delete()
+        return 0
+    rows = _rows(backup, parsed)
+    with transaction.atomic():
+        VlanMembership.objects.filter(device_id=backup.device_id).delete()
+        VlanMembership.objects.bulk_create(rows)
+    return len(rows)
+
+
+def latest_backup(device_id):
+    return (
+        Backup.objects.select_related("device__manufacturer")
+        .filter(device_id=device_id)
+        .order_by("-backupTime")
+        .first()
+    )
+
+
+def reindex_device(device_id):
+    """Vuelve a indexar el equipo desde su último respaldo (o lo vacía si no tiene)."""
+    backup = latest_backup(device_id)
+    if backup is None:
+        VlanMembership.objects.filter(device_id=device_id).delete()
+        return 0
+    return index_backup(backup)
+
+
+def rebuild_vlan_index():
+    """Reconstruye el índice completo. Devuelve (equipos, filas)."""
+    devices = rows = 0
+    VlanMembership.objects.exclude(backup__in=latest_backups()).delete()
+    for backup in latest_backups().select_related("device__manufacturer").iterator():
+        rows += index_backup(backup)
+        devices += 1
+    return devices, rows
@@ -0,0 +1,83 @@
+"""
+Copia local del inventario de Zabbix (ZabbixHostSnapshot).
+
+La tarea periódica `refreshZabbixSnapshot` la mantiene al día de forma
+incremental (auditlog) y la clasificación la lee sin conectarse a Zabbix.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from utils.classification_engine import fetch_zabbix_hosts
+
+from .models import ZabbixHostSnapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SYNC_NAME = "snapshot"
+
+_FIELDS = ["hostname", "name", "ip", "groups", "tags"]
+
+
+def _to_row(host):
+    return ZabbixHostSnapshot(
+        hostid=host["hostid"],
+        hostname=host["hostname"],
+        name=host.get("name") or "",
+        ip=host.get("ip") or "",
+        groups=sorted(host.get("groups") or []),
+        tags=host.get("tags"),
+        updatedAt=timezone.now(),
+    )
+
+
+def refresh_zabbix_snapshot(full: bool = False, batch_size: int = 1000) -> dict:
+    """
+    Actualiza la copia local. Sin `full` solo pide a Zabbix los hosts cambiados
+    desde el último refresco; la primera vez (o con `full`) reemplaza todo.
+    """
+    hosts, deleted, was_full = fetch_zabbix_hosts(
+        incremental=not full, sync_name=SNAPSHOT_SYNC_NAME
+    )
+
+    with transaction.atomic():
+        if was_full:
+            current = {h["hostid"] for h in hosts}
+            stale = ZabbixHostSnapshot.objects.exclude(hostid__in=current)
+        else:
+            stale = ZabbixHostSnapshot.objects.filter(hostid__in=deleted)
+        removed, _ = stale.delete()
+
+        ZabbixHostSnapshot.objects.bulk_create(
+            [_to_row(h) for h in hosts],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["hostid"],
+            update_fields=_FIELDS + ["updatedAt"],
+        )
+
+    result = {"full": was_full, "upserted": len(hosts), "removed": removed}
+    logger.info(f"📦 Snapshot de Zabbix actualizado: {result}")
+    return result
+
+
+def get_hosts_from_snapshot() -> list:
+    """Hosts de la copia local con la misma forma que ZabbixManager.get_processed_hosts."""
+    return [
+        {
+            "hostid": row["hostid"],
+            "hostname": row["hostname"],
+            "name": row["name"],
+            "ip": row["ip"],
+            "groups": set(row["groups"]),
+            "tags": row["tags"],
+        }
+        for row in ZabbixHostSnapshot.objects.order_by("hostid").values(
+            "hostid", *_FIELDS
+        ).iterator()
+    ]
+
+
+def snapshot_available() -> bool:
+    return ZabbixHostSnapshot.objects.exists()
@@ -84,6 +84,9 @@ elif [ "$db_check_result" = "NO_DATA" ]; then
   log_info "📦 Aplicando migraciones a la base de datos..."
   python manage.py migrate --noinput
 
+  log_info "🔎 Creando índice de búsqueda de configuraciones..."
+  python manage.py create_config_search_index
+
   log_info "✅ Migraciones aplicadas correctamente."
 
   # Inicializar datos
@@ -95,6 +98,10 @@ elif [ "$db_check_result" = "NO_DATA" ]; then
   TZ_ENV=${TIME_ZONE:-UTC}
   log_info "🕛 Configurando tarea periódica autoBackup a 00:00 (${TZ_ENV})"
   python manage.py create_autobackup_periodic --hour 0 --minute 0 --timezone "${TZ_ENV}"
+
+  # Refresco periódico de la copia local de hosts de Zabbix
+  log_info "📦 Configurando tarea periódica refreshZabbixSnapshot"
+  python manage.py create_zabbix_snapshot_periodic
 else
   log_error "❌ Error al verificar el estado de la base de datos: $db_check_result"
   exit 1
@@ -1,12 +1,23 @@
 import csv
+import logging
+import multiprocessing
+import threading
+import time
 import unicodedata
+import uuid
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
 from io import TextIOWrapper
 
 from django.conf import settings
+from django.core.cache import cache
 
-from core.models import Area, Country, Site
+from core.models import Area, Country, DeviceType, Manufacturer, Site, ZabbixSyncState
+from utils.rule_matcher import CompiledRuleSet
 from utils.zabbix_manager import ZabbixManager
 
+logger = logging.getLogger(__name__)
+
 count_none_country = 0
 count_none_site = 0
 count_none_area = 0
@@ -22,11 +33,23 @@ def normalize_text(text):
 
 
 def build_area_cache():
-    """Carga todos los países, sitios y áreas en caché para búsquedas rápidas."""
+    """
+    Carga todos los países, sitios y áreas en caché para búsquedas rápidas.
+
+    Solo guarda ids y la etiqueta `str(area)` ya calculada, de modo que resolver el
+    área de un host no vuelve a tocar la BD y la caché se puede compartir entre
+    peticiones (y enviar a los workers del pool) sin arrastrar instancias ORM.
+    """
 
-    countries = {normalize_text(c.name): c for c in Country.objects.all()}
-    sites = {(normalize_text(s.name), s.country_id): s for s in Site.objects.all()}
-    areas = {(normalize_text(a.name), a.site_id): a for a in Area.objects.all()}
+    countries = {normalize_text(name): country_id for country_id, name in Country.objects.values_list("id", "name")}
+    sites = {
+        (normalize_text(name), country_id): site_id
+        for site_id, name, country_id in Site.objects.values_list("id", "name", "country_id")
+    }
+    areas = {
+        (normalize_text(a.name), a.site_id): (str(a.id), str(a))
+        for a in Area.objects.select_related("site__country")
+    }
 
     return {
         "countries": countries,
@@ -35,9 +58,87 @@ def build_area_cache():
     }
 
 
+# **********************************************************
+# Caché de jerarquía de ubicaciones a nivel de proceso
+# **********************************************************
+AREA_CACHE_VERSION_KEY = "classification:area-cache-version"
+
+_area_cache = None
+_area_cache_loaded_at = 0.0
+_area_cache_version = None
+_area_cache_lock = threading.Lock()
+
+
+def get_area_cache():
+    """
+    Devuelve la jerarquía normalizada, recargándola solo si fue invalidada
+    (señales de Country/Site/Area), si otro proceso publicó una nueva versión en la
+    caché compartida, o si superó AREA_CACHE_TTL segundos.
+    """
+    global _area_cache, _area_cache_loaded_at, _area_cache_version
+
+    try:
+        version = cache.get(AREA_CACHE_VERSION_KEY)
+    except Exception:
+        logger.debug("No se pudo leer la versión de la caché de áreas", exc_info=True)
+        version = _area_cache_version
+
+    ttl = getattr(settings, "AREA_CACHE_TTL", 300)
+    with _area_cache_lock:
+        expired = time.monotonic() - _area_cache_loaded_at > ttl
+        if _area_cache is None or expired or version != _area_cache_version:
+            _area_cache = build_area_cache()
+            _area_cache_loaded_at = time.monotonic()
+            _area_cache_version = version
+        return _area_cache
+
+
+def invalidate_area_cache():
+    """Descarta la caché local y publica una nueva versión para el resto de procesos."""
+    global _area_cache
+
+    with _area_cache_lock:
+        _area_cache = None
+    try:
+        cache.set(AREA_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+    except Exception:
+        logger.warning("No se pudo publicar la invalidación de la caché de áreas", exc_info=True)
+
+
+def build_catalog_cache():
+    """
+    Precarga fabricantes y tipos de equipo indexados por nombre sin distinguir
+    mayúsculas, para resolver todo un lote con dos consultas en vez de 2 por host.
+    """
+    catalog = {"manufacturers": {}, "deviceTypes": {}}
+    for key, model in (("manufacturers", Manufacturer), ("deviceTypes", DeviceType)):
+        for obj_id, name in model.objects.order_by("name").values_list("id", "name"):
+            catalog[key].setdefault(name.lower(), str(obj_id))
+    return catalog
+
+
+def resolve_catalog_refs(classified: list, catalog: dict, vault_credential_id=None) -> list:
+    """
+    Completa cada host clasificado con {id, name} de manufacturer/deviceType y el
+    vaultCredential del conjunto de reglas. Modifica y devuelve la misma lista.
+    """
+    for host in classified:
+        host["vaultCredential"] = vault_credential_id
+
+        for field, key in (("manufacturer", "manufacturers"), ("deviceType", "deviceTypes")):
+            name = host.get(field, "Desconocido")
+            host[field] = {
+                "id": catalog[key].get(name.lower()) if name else None,
+                "name": name,
+            }
+
+    return classified
+
+
 def resolve_area_id_cached(classified_fields: dict, cache: dict):
     """
     Determina el área más específica posible usando datos precargados y jerarquía coherente.
+    Devuelve la tupla (id, etiqueta) del área o None.
     """
     country_name = (classified_fields.get("country") or "").lower().strip()
     site_name = (classified_fields.get("site") or "").lower().strip()
@@ -48,33 +149,48 @@ def resolve_area_id_cached(classified_fields: dict, cache: dict):
     areas = cache["areas"]
 
     # Buscar país (exacto o "Desconocido")
-    country = countries.get(country_name)
-    if not country:
-        country = countries.get("desconocido")
-        if not country:
+    country_id = countries.get(country_name)
+    if not country_id:
+        country_id = countries.get("desconocido")
+        if not country_id:
             return None  # No hay ni siquiera país desconocido
 
     # Buscar sitio (exacto o "Desconocido" del país)
-    site = sites.get((site_name, country.id))
-    if not site:
-        site = sites.get(("desconocido", country.id))
+    site_id = sites.get((site_name, country_id))
+    if not site_id:
+        site_id = sites.get(("desconocido", country_id))
 
-        if not site:
+        if not site_id:
             return None  # No hay sitio válido
 
     # Buscar área (exacta o "Desconocido" del sitio)
-    area = areas.get((area_name, site.id))
+    area = areas.get((area_name, site_id))
 
     if not area:
-        area = areas.get(("desconocido", site.id))
+        area = areas.get(("desconocido", site_id))
 
     return area
 
 
+# Clasificador del proceso worker, recibido una sola vez en el initializer del pool
+_worker_classifier = None
+
+
+def _init_classifier_worker(classifier):
+    global _worker_classifier
+    _worker_classifier = classifier
+
+
+def _classify_chunk(hosts: list) -> list:
+    return [_worker_classifier.classify_host(host) for host in hosts]
+
+
 class HostClassifier:
     def __init__(self, rules: dict):
         self.rules = rules
-        self.area_cache = build_area_cache()
+        # Las reglas se compilan una sola vez por clasificación (no por host)
+        self.matcher = CompiledRuleSet(rules)
+        self.area_cache = get_area_cache()
 
     def classify_host(self, host: dict) -> dict:
         classification = {}
@@ -87,31 +203,7 @@ class HostClassifier:
             "model": host.get("model", "").lower(),
         }
 
-        for field, field_rules in self.rules.items():
-            matched = None
-            for rule in field_rules:
-                value = rule.get("value", "").lower()
-                assign = rule.get("assign")
-                search_in = rule.get("searchIn", [])
-
-                for source in search_in:
-                    if source == "groups" and any(
-                        value in g for g in sources["groups"]
-                    ):
-                        matched = assign
-                        break
-                    elif source == "tags" and value in sources["tags"]:
-                        matched = assign
-                        break
-                    elif source == "hostname" and value in sources["hostname"]:
-                        matched = assign
-                        break
-                    elif source == "model" and value in sources["model"]:
-                        matched = assign
-                        break
-                if matched:
-                    break
-
+        for field, matched in self.matcher.match(sources).items():
             if matched:
                 classification[field] = matched
             else:
@@ -119,7 +211,7 @@ class HostClassifier:
                 missing.append(field)
 
         # ✅ Añadir resolución de área directamente
-        area_obj = resolve_area_id_cached(classification, self.area_cache)
+        area = resolve_area_id_cached(classification, self.area_cache)
 
         return {
             "hostname": host.get("hostname"),
@@ -129,51 +221,148 @@ class HostClassifier:
             "deviceType": classification.get("deviceType"),
             "classification": classification,
             "area": {
-                "id": str(area_obj.id) if area_obj else None,
-                "name": str(area_obj) if area_obj else None,
+                "id": area[0] if area else None,
+                "name": area[1] if area else None,
             },
             "missing": missing,
         }
 
-    def classify_all(self, hosts: list) -> list:
-        return [self.classify_host(host) for host in hosts]
+    def iter_classify(self, hosts, chunk_size: int = 500):
+        """
+        Clasifica un flujo de hosts y va entregando bloques de resultados, para
+        procesar entradas muy grandes con memoria acotada.
+        """
+        for chunk in iter_chunks(hosts, chunk_size):
+            yield [self.classify_host(host) for host in chunk]
+
+    def classify_all(self, hosts: list, workers: int = 0, chunk_size: int = 500) -> list:
+        """
+        Clasifica todos los hosts conservando el orden de entrada.
+
+        Con `workers` > 1 y más de un bloque de `chunk_size` hosts, los bloques se
+        reparten en un pool de procesos. Las reglas compiladas y la caché de áreas
+        viajan una sola vez a cada worker (initializer), no con cada bloque.
+        """
+        # Un CLASSIFIER_CHUNK_SIZE de 0 o negativo no debe romper el reparto en bloques
+        chunk_size = max(1, chunk_size)
+        if not workers or workers < 2 or len(hosts) <= chunk_size:
+            return [self.classify_host(host) for host in hosts]
+
+        chunks = [hosts[i:i + chunk_size] for i in range(0, len(hosts), chunk_size)]
+        # fork: los workers heredan Django ya configurado; no consultan la BD
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            mp_context=context,
+            initializer=_init_classifier_worker,
+            initargs=(self,),
+        ) as pool:
+            classified = []
+            for chunk_result in pool.map(_classify_chunk, chunks):
+                classified.extend(chunk_result)
+        return classified
+
+
+def iter_chunks(iterable, size: int):
+    """Agrupa un iterable en listas de hasta `size` elementos."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
 
 # # Zabbix Integration
-def get_hosts_from_zabbix() -> list:
+ZABBIX_SYNC_NAME = "hosts"
+
 
+def _audit_clock(zm):
+    """
+    Marca de agua para el modo incremental. Zabbix suele limitar el auditlog a tokens
+    Super admin: sin acceso, la descarga completa sigue y no se guarda marca (la
+    siguiente sincronización incremental vuelve a ser completa).
+    """
+    try:
+        return zm.get_audit_clock()
+    except Exception as e:
+        logger.warning("Zabbix: sin acceso al auditlog (%s); el modo incremental no estará disponible", e)
+        return None
+
+
+def fetch_zabbix_hosts(incremental: bool = False, sync_name: str = ZABBIX_SYNC_NAME):
+    """
+    Descarga los hosts de Zabbix por bloques concurrentes. Con `incremental`, solo
+    los creados/modificados desde la última sincronización (auditlog); la primera
+    vez descarga todo. La marca de agua se guarda en ZabbixSyncState(`sync_name`).
+
+    Devuelve (hosts, ids_eliminados, descarga_completa).
+    """
     zabbix_url = settings.ZABBIX_URL
     zabbix_token = settings.ZABBIX_TOKEN
 
     if not zabbix_url or not zabbix_token:
         raise ValueError("Faltan variables de entorno ZABBIX_URL o ZABBIX_TOKEN.")
 
+    fetch = {
+        "chunk_size": settings.ZABBIX_HOST_CHUNK_SIZE,
+        "workers": settings.ZABBIX_FETCH_WORKERS,
+    }
+    state, _ = ZabbixSyncState.objects.get_or_create(name=sync_name)
+    full = not (incremental and state.lastSync)
+
     try:
         zm = ZabbixManager(url=zabbix_url, token=zabbix_token)
         zm.connect()
-        hosts = zm.get_processed_hosts()
+        if full:
+            # El clock se toma antes de descargar: lo que cambie durante la descarga se repite
+            clock = _audit_clock(zm)
+            hosts = zm.get_processed_hosts(**fetch)
+            deleted = []
+        else:
+            changed, deleted, clock = zm.get_host_changes(int(state.lastSync.timestamp()))
+            logger.info("Zabbix incremental: %s cambiados, %s eliminados", len(changed), len(deleted))
+            hosts = zm.get_processed_hosts(host_ids=changed, **fetch) if changed else []
     except Exception as e:
         raise ValueError(f"No se pudo conectar con Zabbix: {str(e)}")
 
+    # Solo se llega aquí si los hosts se descargaron: un fallo no adelanta la marca de agua
+    if clock:
+        state.lastSync = datetime.fromtimestamp(clock, tz=timezone.utc)
+        state.save(update_fields=["lastSync", "updatedAt"])
+
+    return hosts, deleted, full
+
+
+def get_hosts_from_zabbix(incremental: bool = False) -> list:
+    hosts, _, _ = fetch_zabbix_hosts(incremental)
     return hosts
+
+
 # # CSV Integration
-def get_hosts_from_csv(file) -> list:
+def iter_hosts_from_csv(file):
     """
-    Parsea un archivo CSV con hosts y devuelve una lista de diccionarios estandarizados.
+    Recorre un archivo CSV con hosts fila a fila, generando diccionarios estandarizados.
+    No mantiene el archivo completo en memoria.
     """
-    hosts = []
     reader = csv.DictReader(TextIOWrapper(file, encoding="utf-8"))
 
     for row in reader:
-        hosts.append(
-            {
-                "hostname": row.get("hostname", "").strip(),
-                "ip": row.get("ip", "").strip(),
-                "groups": set(
-                    g.strip().lower() for g in row.get("groups", "").split(";") if g
-                ),
-                "tags": row.get("tags", "").strip().lower(),
-                "model": row.get("model", "").strip(),
-            }
-        )
+        yield {
+            "hostname": row.get("hostname", "").strip(),
+            "ip": row.get("ip", "").strip(),
+            "groups": set(
+                g.strip().lower() for g in row.get("groups", "").split(";") if g
+            ),
+            "tags": row.get("tags", "").strip().lower(),
+            "model": row.get("model", "").strip(),
+        }
 
-    return hosts
+
+def get_hosts_from_csv(file) -> list:
+    """
+    Parsea un archivo CSV con hosts y devuelve una lista de diccionarios estandarizados.
+    """
+    return list(iter_hosts_from_csv(file))
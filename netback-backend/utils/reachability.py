@@ -0,0 +1,240 @@
+"""
+Barrido de alcanzabilidad concurrente sin procesos `ping`.
+
+Cada dirección se sondea a la vez por:
+
+- TCP connect al puerto SSH (22): un SYN/ACK o un RST (conexión rechazada)
+  prueban que el host está vivo;
+- ICMP echo, si el proceso puede abrir un socket ICMP (DGRAM sin privilegios
+  según `net.ipv4.ping_group_range`, o RAW como root / CAP_NET_RAW).
+
+Todos los ICMP comparten un único socket y las respuestas se despachan por
+número de secuencia, así que un barrido de cientos de equipos usa un solo
+descriptor ICMP y un bucle asyncio. El resultado por IP tiene la misma forma
+que `utils.ping.ping_ip`.
+"""
+import asyncio
+import errno
+import ipaddress
+import logging
+import os
+import socket
+import struct
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 22
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_CONCURRENCY = 256
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _echo_request(ident: int, seq: int) -> bytes:
+    payload = b"netback-reachability"
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = _checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + payload
+
+
+def _open_icmp_socket():
+    """Devuelve (socket, es_raw) o (None, False) si no hay permisos para ICMP."""
+    for sock_type, raw in ((socket.SOCK_DGRAM, False), (socket.SOCK_RAW, True)):
+        try:
+            sock = socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+        except (PermissionError, OSError):
+            continue
+        sock.setblocking(False)
+        return sock, raw
+    return None, False
+
+
+def icmp_available() -> bool:
+    sock, _ = _open_icmp_socket()
+    if sock is None:
+        return False
+    sock.close()
+    return True
+
+
+class _IcmpProber:
+    """Un socket ICMP compartido; cada sonda espera su respuesta por secuencia."""
+
+    def __init__(self, loop, sock, raw):
+        self.loop = loop
+        self.sock = sock
+        self.raw = raw
+        self.ident = os.getpid() & 0xFFFF
+        self._next_seq = 0
+        self._pending = {}  # seq -> (ip, future)
+        loop.add_reader(sock.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                logger.debug("Error leyendo el socket ICMP", exc_info=True)
+                return
+            if self.raw:
+                # RAW entrega la cabecera IP; DGRAM solo el mensaje ICMP
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8 or data[0] != ICMP_ECHO_REPLY:
+                continue
+            ident, seq = struct.unpack("!HH", data[4:8])
+            # En DGRAM el kernel reescribe el identificador y filtra por socket
+            if self.raw and ident != self.ident:
+                continue
+            waiting = self._pending.get(seq)
+            if waiting and waiting[0] == addr[0] and not waiting[1].done():
+                waiting[1].set_result(time.perf_counter())
+
+    def _allocate_seq(self):
+        for _ in range(0x10000):
+            seq = self._next_seq
+            self._next_seq = (self._next_seq + 1) & 0xFFFF
+            if seq not in self._pending:
+                return seq
+        raise RuntimeError("Sin números de secuencia ICMP libres")
+
+    async def probe(self, ip: str, timeout: float) -> Optional[float]:
+        """RTT en ms o None si no hubo respuesta."""
+        seq = self._allocate_seq()
+        future = self.loop.create_future()
+        self._pending[seq] = (ip, future)
+        start = time.perf_counter()
+        try:
+            self.sock.sendto(_echo_request(self.ident, seq), (ip, 0))
+            received_at = await asyncio.wait_for(future, timeout)
+            return (received_at - start) * 1000
+        except (asyncio.TimeoutError, OSError):
+            return None
+        finally:
+            self._pending.pop(seq, None)
+
+    def close(self):
+        self.loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+
+async def _tcp_probe(ip: str, port: int, timeout: float):
+    """Devuelve (rtt_ms, error). Una conexión rechazada también cuenta como alcanzable."""
+    start = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return (time.perf_counter() - start) * 1000, None
+    except ConnectionRefusedError:
+        return (time.perf_counter() - start) * 1000, None
+    except asyncio.TimeoutError:
+        return None, "timeout"
+    except OSError as e:
+        if e.errno == errno.ENETUNREACH:
+            return None, "network_unreachable"
+        return None, "unreachable"
+
+
+def _empty_result(ip: str) -> Dict[str, Any]:
+    return {"ip": ip, "reachable": False, "raw_output": "", "stats": {}, "error": None}
+
+
+async def _probe(ip, port, timeout, icmp, semaphore) -> Dict[str, Any]:
+    result = _empty_result(ip)
+    try:
+        version = ipaddress.ip_address(ip).version
+    except ValueError:
+        result["error"] = "invalid_ip"
+        return result
+
+    async with semaphore:
+        probes = {asyncio.ensure_future(_tcp_probe(ip, port, timeout)): "tcp"}
+        if icmp and version == 4:
+            probes[asyncio.ensure_future(icmp.probe(ip, timeout))] = "icmp"
+
+        rtt, method, tcp_error = None, None, None
+        pending = set(probes)
+        # La primera sonda que responde decide; no se espera el timeout de la otra
+        while pending and rtt is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                value = task.result()
+                if probes[task] == "tcp":
+                    value, tcp_error = value
+                if value is not None and rtt is None:
+                    rtt, method = value, probes[task]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    # Las sondas TCP/ICMP son dos vías para un mismo intento: cuenta como un paquete
+    received = 1 if rtt is not None else 0
+    result["stats"] = {
+        "transmitted": 1,
+        "received": received,
+        "loss_percentage": 0.0 if received else 100.0,
+        "methods": sorted(probes.values()),
+    }
+    if rtt is None:
+        result["error"] = tcp_error or "unreachable"
+        result["raw_output"] = f"{ip}: sin respuesta ({', '.join(result['stats']['methods'])})"
+        return result
+
+    result["reachable"] = True
+    result["stats"].update(method=method, rtt_ms=round(rtt, 3))
+    result["raw_output"] = f"{ip}: respuesta {method} en {rtt:.1f} ms"
+    return result
+
+
+async def async_sweep(
+    ips: Iterable[str],
+    port: int = DEFAULT_PORT,
+    timeout: float = DEFAULT_TIMEOUT,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_icmp: bool = True,
+) -> List[Dict[str, Any]]:
+    ips = list(ips)
+    loop = asyncio.get_running_loop()
+    icmp = None
+    if use_icmp:
+        sock, raw = _open_icmp_socket()
+        if sock is not None:
+            icmp = _IcmpProber(loop, sock, raw)
+        else:
+            logger.debug("Sin permisos para ICMP; solo se usa TCP")
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    try:
+        return await asyncio.gather(*(_probe(ip, port, timeout, icmp, semaphore) for ip in ips))
+    finally:
+        if icmp:
+            icmp.close()
+
+
+def sweep(
+    ips: Iterable[str],
+    port: int = DEFAULT_PORT,
+    timeout: float = DEFAULT_TIMEOUT,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_icmp: bool = True,
+) -> List[Dict[str, Any]]:
+    """Sondea todas las IPs a la vez; devuelve un resultado por IP en el mismo orden."""
+    return asyncio.run(async_sweep(ips, port, timeout, concurrency, use_icmp))
@@ -0,0 +1,163 @@
+"""
+Compilación de reglas de clasificación en autómatas Aho-Corasick.
+
+Las reglas de un ClassificationRuleSet tienen la forma::
+
+    {"<campo>": [{"value": "...", "assign": "...", "searchIn": ["hostname", ...]}, ...]}
+
+y la semántica es "primera regla que coincide gana" por cada campo. En lugar de
+recorrer campo → regla → fuente por cada host, se construye un autómata por
+fuente con todos los valores de todas las reglas; cada texto del host se recorre
+una sola vez y se queda, por campo, el índice de regla más bajo encontrado.
+"""
+from collections import deque
+
+SOURCES = ("hostname", "tags", "groups", "model")
+
+
+class AhoCorasick:
+    """Autómata Aho-Corasick mínimo para búsqueda de subcadenas múltiples."""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(pattern_id)
+
+        # BFS: enlaces de fallo y salidas heredadas del sufijo más largo
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt].extend(self._out[self._fail[nxt]])
+
+    def search(self, text):
+        """Devuelve los ids de patrón que aparecen en `text` (puede repetir ids)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                yield from out[state]
+
+
+class CompiledRuleSet:
+    """Reglas compiladas una vez por conjunto; `match` es O(longitud de los textos)."""
+
+    def __init__(self, rules: dict):
+        self.fields = list(rules.keys())
+        self._assigns = []  # por campo: lista de assign por índice de regla
+
+        values_by_source = {source: {} for source in SOURCES}  # value -> [(campo, regla)]
+        self._empty_hits = {source: [] for source in SOURCES}
+
+        for field_idx, field in enumerate(self.fields):
+            assigns = []
+            for rule_idx, rule in enumerate(rules[field]):
+                value = rule.get("value", "").lower()
+                assign = rule.get("assign")
+                assigns.append(assign)
+                if not assign:
+                    # Una regla sin 'assign' nunca produce coincidencia
+                    continue
+                for source in set(rule.get("searchIn", [])):
+                    if source not in values_by_source:
+                        continue
+                    if value:
+                        values_by_source[source].setdefault(value, []).append((field_idx, rule_idx))
+                    else:
+                        self._empty_hits[source].append((field_idx, rule_idx))
+            self._assigns.append(assigns)
+
+        self._automata = {}
+        self._outputs = {}
+        for source, by_value in values_by_source.items():
+            if by_value:
+                self._automata[source] = AhoCorasick(by_value.keys())
+                self._outputs[source] = list(by_value.values())
+
+    def match(self, sources: dict) -> dict:
+        """Devuelve {campo: assign | None} respetando el orden de las reglas."""
+        best = [None] * len(self.fields)
+
+        def consider(hits):
+            for field_idx, rule_idx in hits:
+                current = best[field_idx]
+                if current is None or rule_idx < current:
+                    best[field_idx] = rule_idx
+
+        for source in SOURCES:
+            texts = sources.get(source)
+            if source == "groups":
+                texts = texts or []
+            else:
+                texts = [texts or ""]
+
+            # "" está contenido en cualquier texto, pero en grupos exige al menos uno
+            if texts and self._empty_hits[source]:
+                consider(self._empty_hits[source])
+
+            automaton = self._automata.get(source)
+            if automaton is None:
+                continue
+            outputs = self._outputs[source]
+            for text in texts:
+                for pattern_id in automaton.search(text):
+                    consider(outputs[pattern_id])
+
+        return {
+            field: (self._assigns[idx][best[idx]] if best[idx] is not None else None)
+            for idx, field in enumerate(self.fields)
+        }
+
+
+def match_rules_linear(rules: dict, sources: dict) -> dict:
+    """Implementación de referencia (recorrido campo → regla → fuente).
+
+    Se mantiene para validar que `CompiledRuleSet` produce el mismo resultado y
+    como línea base en el benchmark.
+    """
+    result = {}
+    for field, field_rules in rules.items():
+        matched = None
+        for rule in field_rules:
+            value = rule.get("value", "").lower()
+            assign = rule.get("assign")
+            search_in = rule.get("searchIn", [])
+
+            for source in search_in:
+                if source == "groups" and any(value in g for g in sources["groups"]):
+                    matched = assign
+                    break
+                elif source == "tags" and value in sources["tags"]:
+                    matched = assign
+                    break
+                elif source == "hostname" and value in sources["hostname"]:
+                    matched = assign
+                    break
+                elif source == "model" and value in sources["model"]:
+                    matched = assign
+                    break
+            if matched:
+                break
+        result[field] = matched or None
+    return result
@@ -1,6 +1,19 @@
 import csv
+from concurrent.futures import ThreadPoolExecutor
+
 from zabbix_utils import ZabbixAPI
 
+HOST_OUTPUT = {
+    "output": ["hostid", "host", "name"],
+    "selectInterfaces": ["interfaceid", "ip"],
+    "selectGroups": ["name"],
+    "selectTags": ["tag", "value"],
+}
+
+# auditlog: resourcetype 4 = host; action 0 = alta, 1 = modificación, 2 = baja
+AUDIT_RESOURCE_HOST = 4
+AUDIT_ACTION_DELETE = 2
+
 class ZabbixManager:
     def __init__(self, url, token):
 
@@ -31,26 +44,92 @@ class ZabbixManager:
             print(f"❌ Failed to get host groups: {e}")
             return []
 
-    def get_raw_hosts(self, group_ids=None):
-
+    def get_raw_hosts(self, group_ids=None, host_ids=None, raise_errors=False):
+        """
+        Detalle de hosts en una sola petición. Por defecto un fallo devuelve []; con
+        `raise_errors` se propaga, para que una lista vacía signifique "sin hosts".
+        """
         print("🔍 Fetching raw host data from Zabbix...")
         try:
-            params = {
-                "output": ["hostid", "host", "name"],
-                "selectInterfaces": ["interfaceid", "ip"],
-                "selectGroups": ["name"],
-                "selectTags": ["tag", "value"],
-            }
+            params = dict(HOST_OUTPUT)
             if group_ids:
                 params["groupids"] = group_ids
+            if host_ids:
+                params["hostids"] = host_ids
 
             return self.zapi.host.get(**params)
         except Exception as e:
             print(f"❌ Failed to get raw hosts: {e}")
+            if raise_errors:
+                raise
             return []
 
-    def get_processed_hosts(self, group_ids=None, tag_name="marca"):
-        hosts = self.get_raw_hosts(group_ids)
+    def get_host_ids(self, group_ids=None):
+        """Solo los hostid (respuesta liviana) para luego pedir el detalle por bloques."""
+        params = {"output": ["hostid"], "sortfield": "hostid"}
+        if group_ids:
+            params["groupids"] = group_ids
+        return [h["hostid"] for h in self.zapi.host.get(**params)]
+
+    def get_raw_hosts_chunked(self, group_ids=None, host_ids=None, chunk_size=500, workers=4):
+        """
+        Igual que get_raw_hosts, pero pide el detalle en bloques de `chunk_size`
+        hostids con hasta `workers` peticiones concurrentes. A diferencia de
+        get_raw_hosts, un bloque fallido propaga la excepción (no hay datos parciales).
+        """
+        if host_ids is None:
+            host_ids = self.get_host_ids(group_ids)
+        chunks = [host_ids[i:i + chunk_size] for i in range(0, len(host_ids), chunk_size)]
+        print(f"🔍 Fetching {len(host_ids)} hosts from Zabbix in {len(chunks)} chunks...")
+
+        def fetch(chunk):
+            return self.zapi.host.get(hostids=chunk, **HOST_OUTPUT)
+
+        hosts = []
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks) or 1))) as pool:
+            for result in pool.map(fetch, chunks):
+                hosts.extend(result)
+        return hosts
+
+    def get_audit_clock(self):
+        """Clock (epoch) del último registro de auditoría, según el reloj de Zabbix."""
+        last = self.zapi.auditlog.get(
+            output=["clock"], sortfield="clock", sortorder="DESC", limit=1
+        )
+        return int(last[0]["clock"]) if last else None
+
+    def get_host_changes(self, since):
+        """
+        Hosts creados/modificados y eliminados desde `since` (epoch, inclusive)
+        según el auditlog. Devuelve (ids_cambiados, ids_eliminados, último_clock).
+        """
+        records = self.zapi.auditlog.get(
+            output=["resourceid", "action", "clock"],
+            filter={"resourcetype": AUDIT_RESOURCE_HOST},
+            time_from=since,
+            sortfield="clock",
+            sortorder="ASC",
+        )
+        changed, deleted = {}, set()
+        last_clock = None
+        for record in records:
+            host_id = str(record["resourceid"])
+            if int(record["action"]) == AUDIT_ACTION_DELETE:
+                changed.pop(host_id, None)
+                deleted.add(host_id)
+            else:
+                changed[host_id] = True
+                deleted.discard(host_id)
+            last_clock = int(record["clock"])
+        return list(changed), sorted(deleted), last_clock
+
+    def get_processed_hosts(self, group_ids=None, tag_name="marca", host_ids=None,
+                            chunk_size=None, workers=4):
+        # Ambos caminos propagan los errores: quien sincroniza no debe confundir un fallo con "sin hosts"
+        if chunk_size:
+            hosts = self.get_raw_hosts_chunked(group_ids, host_ids, chunk_size, workers)
+        else:
+            hosts = self.get_raw_hosts(group_ids, host_ids, raise_errors=True)
         processed = []
 
         for host in hosts:
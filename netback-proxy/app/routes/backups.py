@@ -1,7 +1,10 @@
 import httpx
 from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from app.config import settings
 from app.dependencies import auth_required, admin_required
+from app.streaming import proxy_streaming
+from app.singleflight import request_key, single_flight
 
 router = APIRouter()
 
@@ -19,26 +22,118 @@ async def backup_device(device_id: str, request: Request):
 
     return response.json()
 
-@router.get("/backups_last/", dependencies=[Depends(auth_required)])
-async def get_last_backups(request: Request):
+@router.get("/backups_last/")
+async def get_last_backups(request: Request, user=Depends(auth_required)):
+    token = request.headers.get("Authorization")
+
+    async def fetch():
+        async with httpx.AsyncClient() as client:
+            return await client.get(
+                f"{settings.full_django_api_url}/backups/last/", 
+                headers={"Authorization": f"Bearer {token.split()[-1]}"},
+                timeout=30.0
+            )
+
+    # Varias pestañas del dashboard piden lo mismo a la vez: una sola consulta al backend
+    response = await single_flight.do(request_key(request, user), fetch)
+
+    return response.json()
+
+@router.get("/networkdevice/{device_id}/backups/", dependencies=[Depends(auth_required)])
+async def get_backup_history(device_id: str, request: Request):
     token = request.headers.get("Authorization")
 
     async with httpx.AsyncClient() as client:
         response = await client.get(
-            f"{settings.full_django_api_url}/backups/last/", 
+            f"{settings.full_django_api_url}/networkdevice/{device_id}/backups/", 
             headers={"Authorization": f"Bearer {token.split()[-1]}"},
             timeout=30.0
         )
 
     return response.json()
 
-@router.get("/networkdevice/{device_id}/backups/", dependencies=[Depends(auth_required)])
-async def get_backup_history(device_id: str, request: Request):
+@router.get("/networkdevice/{device_id}/vlans/", dependencies=[Depends(auth_required)])
+async def get_device_vlans(device_id: str, request: Request):
+    """VLANs del último respaldo del dispositivo (filtros ?vlan= y ?port=)."""
     token = request.headers.get("Authorization")
 
     async with httpx.AsyncClient() as client:
         response = await client.get(
-            f"{settings.full_django_api_url}/networkdevice/{device_id}/backups/", 
+            f"{settings.full_django_api_url}/networkdevice/{device_id}/vlans/",
+            params=request.query_params,
+            headers={"Authorization": f"Bearer {token.split()[-1]}"},
+            timeout=30.0
+        )
+
+    return response.json()
+
+@router.get("/networkdevice/{device_id}/timeline/", dependencies=[Depends(auth_required)])
+async def get_device_timeline(device_id: str, request: Request):
+    """Línea de tiempo de cambios entre respaldos consecutivos (?since=, ?until=, ?limit=)."""
+    token = request.headers.get("Authorization")
+
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            f"{settings.full_django_api_url}/networkdevice/{device_id}/timeline/",
+            params=request.query_params,
+            headers={"Authorization": f"Bearer {token.split()[-1]}"},
+            timeout=60.0
+        )
+
+    return JSONResponse(response.json(), status_code=response.status_code)
+
+@router.get("/vlans/", dependencies=[Depends(auth_required)])
+async def vlan_index(request: Request):
+    """Índice de VLANs de la red (filtros ?vlan=, ?port=, ?device=, ?area=, ?site=, ?country=)."""
+    token = request.headers.get("Authorization")
+
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            f"{settings.full_django_api_url}/vlans/",
+            params=request.query_params,
+            headers={"Authorization": f"Bearer {token.split()[-1]}"},
+            timeout=30.0
+        )
+
+    return response.json()
+
+@router.get("/backups/search/", dependencies=[Depends(auth_required)])
+async def search_configs(request: Request):
+    """Búsqueda en las configuraciones respaldadas (?q=, ?regex=, ?ignore_case=, ?all=). NDJSON en streaming."""
+    token = request.headers.get("Authorization")
+
+    # Errores de validación (400) llegan como JSON normal
+    return await proxy_streaming(
+        "GET",
+        f"{settings.full_django_api_url}/backups/search/",
+        params=request.query_params,
+        headers={"Authorization": f"Bearer {token.split()[-1]}"},
+    )
+
+@router.get("/backups/changes/", dependencies=[Depends(auth_required)])
+async def change_report(request: Request):
+    """Equipos cambiados desde ?since= con sus diffs (?until=, ?output=json|ndjson|html|zip). En streaming."""
+    token = request.headers.get("Authorization")
+
+    # Con 200 se reenvía el formato pedido tal cual; los errores de validación llegan como JSON
+    return await proxy_streaming(
+        "GET",
+        f"{settings.full_django_api_url}/backups/changes/",
+        stream_if=lambda response: response.status_code == 200,
+        read_timeout=600.0,
+        params=request.query_params,
+        headers={"Authorization": f"Bearer {token.split()[-1]}"},
+    )
+
+@router.get("/backup/{backup_id}/vlans/", dependencies=[Depends(auth_required)])
+async def get_backup_vlans(backup_id: str, request: Request):
+    """VLANs de un respaldo concreto (filtros ?vlan= y ?port=)."""
+    token = request.headers.get("Authorization")
+
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            f"{settings.full_django_api_url}/backup/{backup_id}/vlans/",
+            params=request.query_params,
             headers={"Authorization": f"Bearer {token.split()[-1]}"},
             timeout=30.0
         )
@@ -0,0 +1,94 @@
+import httpx
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import JSONResponse, Response
+from app.config import settings
+from app.dependencies import auth_required, admin_required
+
+router = APIRouter()
+
+@router.get("/compliance/", dependencies=[Depends(auth_required)])
+async def compliance_results(request: Request):
+    """Resultados de cumplimiento guardados (?device=, ?rule=, ?passed=) o resumen por regla."""
+    token = request.headers.get("Authorization")
+
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            f"{settings.full_django_api_url}/compliance/",
+            params=request.query_params,
+            headers={"Authorization": f"Bearer {token.split()[-1]}"},
+            timeout=30.0
+        )
+
+    return JSONResponse(response.json(), status_code=response.status_code)
+
+@router.post("/compliance/run/", dependencies=[Depends(auth_required)])
+async def compliance_run(request: Request):
+    """Encola la evaluación de cumplimiento (solo equipos con cambios salvo force)."""
+    token = request.headers.get("Authorization")
+    data = await request.json()
+
+    async with httpx.AsyncClient() as client:
+        response = await client.post(
+            f"{settings.full_django_api_url}/compliance/run/",
+            json=data,
+            headers={"Authorization": f"Bearer {token.split()[-1]}"},
+            timeout=30.0
+        )
+
+    return JSONResponse(response.json(), status_code=response.status_code)
+
+@router.get("/compliance/rules/", dependencies=[Depends(auth_required)])
+async def get_compliance_rules(request: Request):
+    token = request.headers.get("Authorization")
+
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            f"{settings.full_django_api_url}/compliance/rules/",
+            headers={"Authorization": f"Bearer {token.split()[-1]}"},
+            timeout=30.0
+        )
+
+    return response.json()
+
+@router.post("/compliance/rules/", dependencies=[Depends(admin_required)])
+async def create_compliance_rule(request: Request):
+    token = request.headers.get("Authorization")
+    data = await request.json()
+
+    async with httpx.AsyncClient() as client:
+        response = await client.post(
+            f"{settings.full_django_api_url}/compliance/rules/",
+            json=data,
+            headers={"Authorization": f"Bearer {token.split()[-1]}"},
+            timeout=30.0
+        )
+
+    return JSONResponse(response.json(), status_code=response.status_code)
+
+@router.patch("/compliance/rules/{rule_id}/", dependencies=[Depends(admin_required)])
+async def update_compliance_rule(rule_id: str, request: Request):
+    token = request.headers.get("Authorization")
+    data = await request.json()
+
+    async with httpx.AsyncClient() as client:
+        response = await client.patch(
+            f"{settings.full_django_api_url}/compliance/rules/{rule_id}/",
+            json=data,
+            headers={"Authorization": f"Bearer {token.split()[-1]}"},
+            timeout=30.0
+        )
+
+    return JSONResponse(response.json(), status_code=response.status_code)
+
+@router.delete("/compliance/rules/{rule_id}/", dependencies=[Depends(admin_required)])
+async def delete_compliance_rule(rule_id: str, request: Request):
+    token = request.headers.get("Authorization")
+
+    async with httpx.AsyncClient() as client:
+        response = await client.delete(
+            f"{settings.full_django_api_url}/compliance/rules/{rule_id}/",
+            headers={"Authorization": f"Bearer {token.split()[-1]}"},
+            timeout=30.0
+        )
+
+    return Response(status_code=response.status_code)
@@ -2,6 +2,8 @@ import httpx
 from fastapi import APIRouter, Request, Depends, HTTPException
 from app.config import settings
 from app.dependencies import auth_required
+from app.streaming import proxy_streaming
+from app.singleflight import request_key, single_flight
 
 router = APIRouter()
 
@@ -20,6 +22,21 @@ async def ping_device(request: Request):
 
     return response.json()
 
+@router.post("/ping/bulk/", dependencies=[Depends(auth_required)])
+async def ping_bulk(request: Request):
+    """Verificar la alcanzabilidad de muchos dispositivos a la vez"""
+    token = request.headers.get("Authorization")
+    data = await request.json()
+
+    async with httpx.AsyncClient() as client:
+        response = await client.post(
+            f"{settings.full_django_api_url}/ping/bulk/",
+            json=data,
+            headers={"Authorization": f"Bearer {token.split()[-1]}"},
+            timeout=60.0)
+
+    return response.json()
+
 @router.post("/classification-rules/", dependencies=[Depends(auth_required)])
 async def create_classification_rules(request: Request):
     token = request.headers.get("Authorization")
@@ -49,18 +66,27 @@ async def classify_from_zabbix(request: Request):
 
 @router.post("/networkdevice/bulk/from-csv/", dependencies=[Depends(auth_required)])
 async def classify_from_csv(request: Request):
+    """
+    Reenvía el multipart tal cual (sin leerlo en memoria) y, si el cliente pidió
+    NDJSON (?stream=1 o Accept: application/x-ndjson), devuelve la respuesta en streaming.
+    """
     token = request.headers.get("Authorization")
-    form = await request.form()
-    files = {"file": (form["file"].filename, await form["file"].read())}
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{settings.full_django_api_url}/networkdevice/bulk/from-csv/",
-            data={"ruleSetId": form["ruleSetId"]},
-            files=files,
-            headers={"Authorization": f"Bearer {token.split()[-1]}"}
-        )
-    return response.json()
+    headers = {
+        "Authorization": f"Bearer {token.split()[-1]}",
+        "Content-Type": request.headers.get("content-type", ""),
+        "Accept": request.headers.get("accept", "application/json"),
+    }
+    # Django necesita Content-Length: no acepta cuerpos chunked vía WSGI
+    if "content-length" in request.headers:
+        headers["Content-Length"] = request.headers["content-length"]
+
+    return await proxy_streaming(
+        "POST",
+        f"{settings.full_django_api_url}/networkdevice/bulk/from-csv/",
+        params=request.query_params,
+        content=request.stream(),
+        headers=headers,
+    )
 
 @router.post("/networkdevice/bulk/save/", dependencies=[Depends(auth_required)])
 async def save_classified_hosts(request: Request):
@@ -138,17 +164,21 @@ async def delete_classification_rules(rule_id: str, request: Request):
         return {"message": "Eliminado correctamente"}
     raise HTTPException(status_code=response.status_code, detail="Error eliminando regla")
 
-@router.get("/zabbix/status/", dependencies=[Depends(auth_required)])
-async def check_zabbix_status(request: Request):
+@router.get("/zabbix/status/")
+async def check_zabbix_status(request: Request, user=Depends(auth_required)):
     """Evaluar el estado de la conexión con Zabbix"""
     token = request.headers.get("Authorization")
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"{settings.full_django_api_url}/zabbix/status/",
-            headers={"Authorization": f"Bearer {token.split()[-1]}"},
-            timeout=30.0  
-        )
+
+    async def fetch():
+        async with httpx.AsyncClient() as client:
+            return await client.get(
+                f"{settings.full_django_api_url}/zabbix/status/",
+                headers={"Authorization": f"Bearer {token.split()[-1]}"},
+                timeout=30.0  
+            )
+
+    # El ping + conexión a Zabbix es costoso: agrupar las consultas concurrentes
+    response = await single_flight.do(request_key(request, user), fetch)
         
     if response.status_code == 200:
         return response.json()
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Agrupa llamadas concurrentes idénticas en una sola petición al backend.
+
+    La primera llamada para una clave lanza la petición; las que llegan mientras
+    sigue en vuelo esperan el mismo resultado (o la misma excepción). Al terminar,
+    la clave se libera y la siguiente llamada vuelve a consultar el backend.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            logger.debug("single-flight: reutilizando petición en vuelo para %s", key)
+
+        # shield: si un cliente cancela, la petición compartida sigue para el resto
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+
+def request_key(request, user) -> tuple:
+    """Clave de agrupación: (path, query, rol del usuario)."""
+    query = tuple(sorted(request.query_params.multi_items()))
+    return (request.url.path, query, user.get("role"))
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,56 @@
+from typing import Callable
+
+import httpx
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+
+def is_ndjson(response: httpx.Response) -> bool:
+    return response.headers.get("content-type", "").startswith("application/x-ndjson")
+
+
+async def proxy_streaming(
+    method: str,
+    url: str,
+    *,
+    stream_if: Callable[[httpx.Response], bool] = is_ndjson,
+    read_timeout: float = 300.0,
+    **request_kwargs,
+):
+    """Reenvía una petición al backend sin cargar la respuesta en memoria.
+
+    Si `stream_if(respuesta)` se cumple, el cuerpo se entrega por partes con el mismo
+    content-type (y Content-Disposition, para descargas); si no (p. ej. errores de
+    validación), se devuelve como JSON con el mismo status. El cliente httpx se cierra
+    siempre: al terminar el streaming, tras leer la respuesta o si el envío falla.
+    """
+    client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=read_timeout))
+    try:
+        response = await client.send(client.build_request(method, url, **request_kwargs), stream=True)
+    except BaseException:
+        # Backend caído o timeout de conexión: no dejar abierto el pool del cliente
+        await client.aclose()
+        raise
+
+    if stream_if(response):
+        async def close():
+            await response.aclose()
+            await client.aclose()
+
+        headers = {}
+        if "content-disposition" in response.headers:
+            headers["Content-Disposition"] = response.headers["content-disposition"]
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            media_type=response.headers.get("content-type"),
+            headers=headers,
+            background=BackgroundTask(close),
+        )
+
+    try:
+        await response.aread()
+    finally:
+        await response.aclose()
+        await client.aclose()
+    return JSONResponse(response.json(), status_code=response.status_code)
@@ -3,7 +3,7 @@ import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.routes import auth, users, devices, vault, locations, backups, utils
+from app.routes import auth, users, devices, vault, locations, backups, utils, compliance
 
 # Configurar logs
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -27,6 +27,7 @@ app.include_router(vault.router)
 app.include_router(locations.router)
 app.include_router(backups.router)
 app.include_router(utils.router)
+app.include_router(compliance.router)
 
 @app.get("/health/")
 def health_check():